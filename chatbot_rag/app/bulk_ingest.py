@@ -0,0 +1,364 @@
+#app/bulk_ingest.py
+"""
+Bulk corpus ingestion.
+
+Usage (from the chatbot_rag directory):
+    python -m app.bulk_ingest data/
+    python -m app.bulk_ingest s3://pdf-storage-bucket/papers/ --workers 8
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+from app.extraction_store import extract_pages_cached, file_sha256
+from app.utils import join_pages
+from app.index_manifest import IndexManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "ingest_checkpoint.jsonl"
+
+
+# --- SOURCE DISCOVERY ---
+def discover_local_sources(directory: str) -> List[str]:
+    """
+    Return every PDF under a local directory, sorted for a stable ingestion order
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        raise FileNotFoundError(f"Directory not found: {directory}")
+    return sorted(str(p) for p in root.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+def discover_s3_sources(uri: str) -> List[str]:
+    """
+    Return s3://bucket/key URIs for every PDF under an S3 prefix
+    """
+    from aws_service.s3_handler import iter_pdf_objects_in_s3
+
+    bucket, prefix = parse_s3_uri(uri)
+    return sorted(f"s3://{bucket}/{obj['filename']}" for obj in iter_pdf_objects_in_s3(bucket, prefix))
+
+
+def parse_s3_uri(uri: str) -> Tuple[str, str]:
+    """
+    Split an s3://bucket/prefix URI into (bucket, prefix)
+    """
+    if not uri.startswith("s3://"):
+        raise ValueError(f"Not an S3 URI: {uri}")
+    bucket, _, prefix = uri[len("s3://"):].partition("/")
+    if not bucket:
+        raise ValueError(f"Missing bucket in S3 URI: {uri}")
+    return bucket, prefix
+
+
+def document_name(source: str, root: Optional[str] = None) -> str:
+    """
+    Return the document name recorded in chunk metadata for a source
+    """
+    if source.startswith("s3://"):
+        return parse_s3_uri(source)[1]
+    if root and not root.startswith("s3://"):
+        return os.path.relpath(source, root)
+    return os.path.basename(source)
+
+
+# --- CHECKPOINTING ---
+class IngestCheckpoint:
+    """
+    Append-only JSONL record of finished sources, so an interrupted run resumes where it stopped
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, dict] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a killed run is expected; ignore it
+                        logger.warning(f"Skipping malformed checkpoint line in {path}")
+                        continue
+                    if record.get("status") in ("done", "empty"):
+                        self.done[record["source"]] = record
+
+    def is_done(self, source: str) -> bool:
+        return source in self.done
+
+    def mark(self, source: str, status: str, **fields) -> None:
+        """
+        Durably append a record for a source
+        """
+        record = {"source": source, "status": status, "timestamp": time.time(), **fields}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if status in ("done", "empty"):
+            self.done[source] = record
+
+
+# --- WORKER STAGE (runs in the process pool) ---
+def prepare_document(source: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> dict:
+    """
+    Extract and split a single source; returns its chunks and content hash
+    """
+    from app.rag_pipeline import split_text
+
+    temp_dir = None
+    try:
+        local_path = source
+        if source.startswith("s3://"):
+            from aws_service.s3_handler import download_pdf_from_s3
+
+            bucket, key = parse_s3_uri(source)
+            temp_dir = tempfile.mkdtemp(prefix="ingest-")
+            local_path = os.path.join(temp_dir, os.path.basename(key))
+            if not download_pdf_from_s3(key, bucket, local_path):
+                raise IOError(f"Failed to download {source}")
+
+        sha256 = file_sha256(local_path)
+        pages = extract_pages_cached(local_path, sha256=sha256)
+        try:
+            text = join_pages(pages)
+        except ValueError:
+            return {"source": source, "sha256": sha256, "pages": len(pages), "chunks": []}
+
+        chunks = split_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return {"source": source, "sha256": sha256, "pages": len(pages), "chunks": chunks}
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# --- EMBEDDING / INDEXING STAGE (runs in the parent) ---
+class _BatchIndexer:
+    """
+    Buffers chunks across documents so every embedding call carries a full batch
+    """
+
+    def __init__(self, persist_dir: str, batch_size: int, root: Optional[str]):
+        from app.rag_pipeline import get_embeddings
+
+        self.persist_dir = persist_dir
+        self.batch_size = batch_size
+        self.root = root
+        self.embeddings = get_embeddings()
+        self.stores: Dict[str, object] = {}
+        self.pending: List[Tuple[dict, int]] = []
+        self.remaining: Dict[str, int] = {}
+        self.chunks_indexed = 0
+
+    def _store_for(self, name: str):
+        from app.rag_pipeline import Chroma, collection_name_for
+
+        collection = collection_name_for(name)
+        if collection not in self.stores:
+            self.stores[collection] = Chroma(
+                collection_name=collection,
+                embedding_function=self.embeddings,
+                persist_directory=self.persist_dir,
+                collection_metadata={"source": name}
+            )
+        return self.stores[collection]
+
+    def add(self, doc: dict) -> List[dict]:
+        """
+        Queue a prepared document; returns documents that became fully indexed
+        """
+        name = document_name(doc["source"], self.root)
+        doc["name"] = name
+        # Drop chunks from an earlier ingestion or upload of this document (chunking may have changed)
+        from app.rag_pipeline import clear_collection
+        clear_collection(self._store_for(name))
+
+        self.remaining[doc["source"]] = len(doc["chunks"])
+        self.pending.extend((doc, i) for i in range(len(doc["chunks"])))
+
+        finished = []
+        while len(self.pending) >= self.batch_size:
+            finished.extend(self._flush(self.batch_size))
+        return finished
+
+    def flush(self) -> List[dict]:
+        finished = []
+        while self.pending:
+            finished.extend(self._flush(self.batch_size))
+        return finished
+
+    def _flush(self, size: int) -> List[dict]:
+        from app.rag_pipeline import chunk_ids, collection_name_for, embed_chunks_batched, index_embedded_chunks
+
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        texts = [doc["chunks"][i] for doc, i in batch]
+        vectors = embed_chunks_batched(texts, embeddings=self.embeddings, batch_size=size)
+
+        # Group the batch back into per-document upserts
+        grouped: Dict[str, Tuple[dict, List[int], List[List[float]]]] = {}
+        for (doc, i), vector in zip(batch, vectors):
+            entry = grouped.setdefault(doc["source"], (doc, [], []))
+            entry[1].append(i)
+            entry[2].append(vector)
+
+        finished = []
+        for source, (doc, indexes, doc_vectors) in grouped.items():
+            ids = chunk_ids(collection_name_for(doc["name"]), len(doc["chunks"]))
+            index_embedded_chunks(
+                self._store_for(doc["name"]),
+                chunks=[doc["chunks"][i] for i in indexes],
+                vectors=doc_vectors,
+                ids=[ids[i] for i in indexes],
+                metadatas=[
+                    {"source": doc["name"], "sha256": doc["sha256"], "chunk": i}
+                    for i in indexes
+                ]
+            )
+            self.chunks_indexed += len(indexes)
+            self.remaining[source] -= len(indexes)
+            if self.remaining[source] == 0:
+                del self.remaining[source]
+                finished.append(doc)
+        return finished
+
+
+def run_bulk_ingest(
+    sources: List[str],
+    persist_dir: str = "vectorstore",
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+    workers: Optional[int] = None,
+    batch_size: int = 100,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    root: Optional[str] = None,
+    progress_every: int = 50
+) -> dict:
+    """
+    Ingest sources with a process pool for extraction/splitting and batched embedding.
+    Returns a summary including docs/sec.
+    """
+    from app.rag_pipeline import collection_name_for
+
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    pending = [s for s in sources if not checkpoint.is_done(s)]
+    skipped = len(sources) - len(pending)
+    logger.info(f"{len(sources)} sources, {skipped} already done, {len(pending)} to ingest")
+
+    workers = workers or os.cpu_count() or 1
+    indexer = _BatchIndexer(persist_dir, batch_size, root)
+    manifest = IndexManifest(persist_dir)
+    stats = {"ingested": 0, "empty": 0, "failed": 0}
+    start = time.perf_counter()
+
+    def record_finished(docs: List[dict]) -> None:
+        for doc in docs:
+            manifest.record_document(
+                doc["name"], collection_name_for(doc["name"]), len(doc["chunks"]), sha256=doc["sha256"]
+            )
+            checkpoint.mark(doc["source"], "done", sha256=doc["sha256"], chunks=len(doc["chunks"]))
+            stats["ingested"] += 1
+            processed = stats["ingested"] + stats["empty"] + stats["failed"]
+            if processed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Progress: {processed}/{len(pending)} docs, "
+                    f"{processed / elapsed:.2f} docs/sec, {indexer.chunks_indexed} chunks"
+                )
+
+    # Keep a bounded window of in-flight work so 10k sources don't become 10k futures
+    queue = iter(pending)
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit_next() -> None:
+            source = next(queue, None)
+            if source is not None:
+                in_flight[pool.submit(prepare_document, source, chunk_size, chunk_overlap)] = source
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = in_flight.pop(future)
+                submit_next()
+                try:
+                    doc = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to prepare {source}: {e}")
+                    checkpoint.mark(source, "failed", error=str(e))
+                    stats["failed"] += 1
+                    continue
+
+                if not doc["chunks"]:
+                    logger.warning(f"No text extracted from {source}")
+                    checkpoint.mark(source, "empty", sha256=doc["sha256"])
+                    stats["empty"] += 1
+                    continue
+
+                record_finished(indexer.add(doc))
+
+        record_finished(indexer.flush())
+
+    elapsed = time.perf_counter() - start
+    processed = stats["ingested"] + stats["empty"] + stats["failed"]
+    summary = {
+        "sources": len(sources),
+        "already_done": skipped,
+        **stats,
+        "chunks_indexed": indexer.chunks_indexed,
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_sec": round(processed / elapsed, 3) if elapsed > 0 else 0.0
+    }
+    logger.info(f"Bulk ingest finished: {summary}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a PDF corpus into the vector store")
+    parser.add_argument("source", help="Local directory (e.g. data/) or s3://bucket/prefix")
+    parser.add_argument("--persist-dir", default="vectorstore")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Chunks per embedding call")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
+
+    if args.source.startswith("s3://"):
+        sources = discover_s3_sources(args.source)
+    else:
+        sources = discover_local_sources(args.source)
+
+    summary = run_bulk_ingest(
+        sources,
+        persist_dir=args.persist_dir,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        root=args.source
+    )
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#app/catalog.py
+import os
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import config
+from app.clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Where a document has been seen; an entry with none of them left is dropped
+SOURCES = ("local", "s3", "metadata")
+
+
+class DocumentCatalog:
+    """
+    In-memory index of every known PDF, merged by filename from the local data directory,
+    the S3 bucket and PDF_Metadata.
+
+    Requests only read memory: the sorted name list is kept up to date with bisect on every
+    change and the "available PDFs" preview is cached until the next change, so neither depends
+    on the size of the corpus. Uploads handled by this worker are recorded immediately; a
+    background refresh streams paginated S3 and DynamoDB listings to pick up everything else.
+    """
+
+    def __init__(self, data_dir: str = "data", response_limit: int = config.CATALOG_RESPONSE_LIMIT):
+        self.data_dir = data_dir
+        self.response_limit = response_limit
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._names: List[str] = []
+        self._preview: Optional[List[str]] = None
+        # (filename, source) -> monotonic time it was last recorded, so a refresh never unsets a newer upload
+        self._touched: Dict[tuple, float] = {}
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshed_at: Optional[float] = None
+        self.last_refresh: Dict[str, Any] = {}
+
+    # --- UPDATES ---
+    def _upsert(self, filename: str, source: str, **fields: Any) -> None:
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None:
+                entry = {"filename": filename, **{name: False for name in SOURCES}}
+                self._entries[filename] = entry
+                position = bisect.bisect_left(self._names, filename)
+                self._names.insert(position, filename)
+                if position < self.response_limit:
+                    self._preview = None
+            entry[source] = True
+            self._touched[(filename, source)] = time.monotonic()
+            entry.update({key: value for key, value in fields.items() if value is not None})
+
+    def _unset(self, filename: str, source: str) -> None:
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None:
+                return
+            entry[source] = False
+            self._touched.pop((filename, source), None)
+            if not any(entry[name] for name in SOURCES):
+                del self._entries[filename]
+                position = bisect.bisect_left(self._names, filename)
+                del self._names[position]
+                if position < self.response_limit:
+                    self._preview = None
+
+    def record_local(self, filename: str, size: Optional[int] = None) -> None:
+        self._upsert(filename, "local", size=size)
+
+    def record_s3(self, filename: str, size: Optional[int] = None, last_modified: Optional[str] = None) -> None:
+        self._upsert(filename, "s3", size=size, last_modified=last_modified)
+
+    def record_metadata(
+        self,
+        filename: str,
+        user_id: Optional[str] = None,
+        upload_timestamp: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> None:
+        self._upsert(filename, "metadata", user_id=user_id, upload_timestamp=upload_timestamp, status=status)
+
+    def remove_local(self, filename: str) -> None:
+        self._unset(filename, "local")
+
+    # --- READS ---
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._entries
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(filename)
+        return dict(entry) if entry else None
+
+    def available_pdfs(self) -> List[str]:
+        """
+        The first response_limit filenames in order (cached; rebuilt only after a change among them)
+        """
+        preview = self._preview
+        if preview is None:
+            with self._lock:
+                preview = self._preview = self._names[:self.response_limit]
+        return preview
+
+    def page(self, limit: int = 100, after: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Entries in filename order after a cursor: {"items", "next_cursor", "total"}
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        with self._lock:
+            start = bisect.bisect_right(self._names, after) if after else 0
+            names = self._names[start:start + limit]
+            items = [dict(self._entries[name]) for name in names]
+            more = start + limit < len(self._names)
+            return {
+                "items": items,
+                "next_cursor": names[-1] if more and names else None,
+                "total": len(self._names)
+            }
+
+    # --- REFRESH ---
+    def _reconcile(self, source: str, listing: Iterable[Dict[str, Any]], record: Callable[..., None]) -> int:
+        """
+        Merge a streamed listing entry by entry, then forget the source for names it no longer lists.
+        A listing that fails part-way leaves existing entries untouched.
+        """
+        started = time.monotonic()
+        seen = set()
+        for item in listing:
+            filename = item.get("filename")
+            if not filename:
+                continue
+            seen.add(filename)
+            record(filename, **{key: value for key, value in item.items() if key != "filename"})
+        with self._lock:
+            stale = [
+                name for name, entry in self._entries.items()
+                if entry[source] and name not in seen and self._touched.get((name, source), 0) < started
+            ]
+        for name in stale:
+            self._unset(name, source)
+        return len(seen)
+
+    def _local_listing(self) -> Iterable[Dict[str, Any]]:
+        if not os.path.isdir(self.data_dir):
+            return
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".pdf") and entry.is_file():
+                    yield {"filename": entry.name, "size": entry.stat().st_size}
+
+    def refresh(
+        self,
+        s3_listing: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None,
+        metadata_listing: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Rescan the data directory and, when given, stream the S3 and metadata listings.
+        One refresh runs at a time; a failed source is reported and skipped.
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            report: Dict[str, Any] = {}
+            sources = [("local", self._local_listing, self.record_local)]
+            if s3_listing is not None:
+                sources.append(("s3", s3_listing, self.record_s3))
+            if metadata_listing is not None:
+                sources.append(("metadata", metadata_listing, self.record_metadata))
+
+            for source, listing, record in sources:
+                try:
+                    report[source] = self._reconcile(source, listing(), record)
+                except Exception as e:
+                    logger.warning(f"Catalog refresh of {source} failed: {e}")
+                    report[source] = f"error: {e}"
+
+            report["documents"] = len(self)
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            self.refreshed_at = time.time()
+            self.last_refresh = report
+            logger.info(f"Document catalog refreshed: {report}")
+            return report
+
+    def start_refresher(self, interval: Optional[float] = None, aws: Optional[bool] = None) -> None:
+        """
+        Refresh now and then every interval seconds (CATALOG_REFRESH_SECONDS) in a background thread,
+        including the S3 and metadata listings when AWS is available
+        """
+        if self._thread is not None:
+            return
+        interval = config.CATALOG_REFRESH_SECONDS if interval is None else interval
+        s3_listing = metadata_listing = None
+        if config.AWS_AVAILABLE if aws is None else aws:
+            from aws_service.s3_handler import iter_pdf_objects_in_s3
+            from aws_service.dynamo_handler import iter_pdf_metadata
+            s3_listing = lambda: iter_pdf_objects_in_s3(config.S3_BUCKET_NAME)
+            metadata_listing = iter_pdf_metadata
+
+        def run() -> None:
+            while True:
+                self.refresh(s3_listing, metadata_listing)
+                if self._stop.wait(interval):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="catalog-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_refresher(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self),
+            "refreshed_at": self.refreshed_at,
+            "last_refresh": self.last_refresh
+        }
+
+
+def get_catalog(data_dir: str = "data") -> DocumentCatalog:
+    """
+    Return the process-wide catalog for a data directory
+    """
+    return get_client(("document_catalog", data_dir), lambda: DocumentCatalog(data_dir))
@@ -0,0 +1,71 @@
+#app/clients.py
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    Process-wide cache of long-lived clients (embeddings, chat models, index readers).
+
+    Clients are built once per key by their factory and then shared by every request
+    thread, so connection pools and channels stay warm instead of being rebuilt per call.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Hashable, Any] = {}
+        # Reentrant: a factory may itself fetch another client from the registry
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+                    logger.debug(f"Created client {key!r}")
+        return client
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            return self._clients.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._clients)
+
+
+_registry = ClientRegistry()
+
+
+def get_client(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    Return the shared client for key, building it with factory on first use
+    """
+    return _registry.get(key, factory)
+
+
+def clear_registry() -> None:
+    """
+    Drop every cached client (tests, or after credentials change)
+    """
+    _registry.clear()
+
+
+def registry_summary() -> Dict[str, int]:
+    """
+    Number of live clients per kind, for status reporting
+    """
+    summary: Dict[str, int] = {}
+    for key in _registry.keys():
+        kind = key[0] if isinstance(key, tuple) else key
+        summary[str(kind)] = summary.get(str(kind), 0) + 1
+    return summary
@@ -0,0 +1,165 @@
+#app/context_packing.py
+import re
+import math
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by does do for from how in is it of on or that the this "
+    "to was were what when where which who why with".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token for English text)
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _overlap_length(left: str, right: str, min_overlap: int) -> int:
+    """
+    Length of the longest suffix of left that is also a prefix of right
+    """
+    for size in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def dedupe_chunks(chunks: List[str], min_overlap: int = 30, max_overlap: int = 400) -> List[str]:
+    """
+    Remove text repeated between chunks: fully contained chunks become empty, and
+    splitter overlaps shared with an earlier chunk are trimmed from the later one.
+    """
+    kept: List[str] = []
+    for chunk in chunks:
+        text = chunk.strip()
+        for previous in kept:
+            if not text:
+                break
+            if text in previous:
+                text = ""
+                break
+            # previous ... | overlap | ... text  (text continues previous)
+            size = _overlap_length(previous[-max_overlap:], text[:max_overlap], min_overlap)
+            if size:
+                text = text[size:].lstrip()
+                continue
+            # text ... | overlap | ... previous  (text precedes previous)
+            size = _overlap_length(text[-max_overlap:], previous[:max_overlap], min_overlap)
+            if size:
+                text = text[:-size].rstrip()
+        kept.append(text)
+    return kept
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def pack_context(
+    question: str,
+    chunks: List[str],
+    token_budget: int = 1500,
+    min_overlap: int = 30
+) -> Tuple[List[str], Dict[str, float]]:
+    """
+    Dedupe, trim and fit retrieved chunks into a token budget.
+
+    Sentences are scored by overlap with the question terms (idf-weighted across the
+    retrieved sentences) with a small bonus for higher-ranked chunks, then picked
+    greedily until the budget is full. Each chunk keeps its selected sentences in
+    their original order; chunks with nothing selected come back as "".
+    """
+    start = time.perf_counter()
+    original_tokens = sum(estimate_tokens(c) for c in chunks)
+
+    deduped = dedupe_chunks(chunks, min_overlap=min_overlap)
+    sentences = [split_sentences(chunk) for chunk in deduped]
+
+    # Document frequency of each term across all candidate sentences
+    sentence_terms = [[set(_terms(s)) for s in chunk_sentences] for chunk_sentences in sentences]
+    total_sentences = sum(len(s) for s in sentence_terms) or 1
+    df: Dict[str, int] = {}
+    for chunk_terms in sentence_terms:
+        for terms in chunk_terms:
+            for term in terms:
+                df[term] = df.get(term, 0) + 1
+
+    query_terms = set(_terms(question))
+    candidates = []
+    for rank, chunk_sentences in enumerate(sentences):
+        rank_bonus = 1.0 / (rank + 2)
+        for position, sentence in enumerate(chunk_sentences):
+            matched = query_terms & sentence_terms[rank][position]
+            relevance = sum(math.log(1 + total_sentences / df[t]) for t in matched)
+            candidates.append((relevance + rank_bonus, rank, position, estimate_tokens(sentence)))
+
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+    selected = set()
+    used = 0
+    for score, rank, position, tokens in candidates:
+        if used + tokens > token_budget:
+            continue
+        selected.add((rank, position))
+        used += tokens
+
+    packed = [
+        " ".join(s for position, s in enumerate(chunk_sentences) if (rank, position) in selected)
+        for rank, chunk_sentences in enumerate(sentences)
+    ]
+
+    stats = {
+        "original_tokens": original_tokens,
+        "packed_tokens": sum(estimate_tokens(p) for p in packed),
+        "chunks_in": len(chunks),
+        "chunks_out": sum(1 for p in packed if p),
+        "packing_ms": (time.perf_counter() - start) * 1000
+    }
+    return packed, stats
+
+
+class PackingStats:
+    """
+    Running totals of prompt-size reduction and packing time, for reporting
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.original_tokens = 0
+        self.packed_tokens = 0
+        self.packing_ms = 0.0
+
+    def record(self, stats: Dict[str, float]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.original_tokens += stats["original_tokens"]
+            self.packed_tokens += stats["packed_tokens"]
+            self.packing_ms += stats["packing_ms"]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            if not self.requests:
+                return {"requests": 0, "token_reduction": None, "avg_packing_ms": None}
+            return {
+                "requests": self.requests,
+                "avg_original_tokens": round(self.original_tokens / self.requests, 1),
+                "avg_packed_tokens": round(self.packed_tokens / self.requests, 1),
+                "token_reduction": round(1 - self.packed_tokens / max(self.original_tokens, 1), 3),
+                "avg_packing_ms": round(self.packing_ms / self.requests, 3)
+            }
+
+
+packing_stats = PackingStats()
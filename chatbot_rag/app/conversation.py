@@ -0,0 +1,291 @@
+#app/conversation.py
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain_core.prompts import PromptTemplate
+
+import config
+from app.context_packing import estimate_tokens
+from app.deadline import check_deadline, stage_allowed
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    "Progressively summarize the conversation, keeping names, numbers and open questions.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{new_lines}\n\n"
+    "New summary (at most {max_words} words):"
+)
+
+# Answers are stored truncated; the rewrite step only needs their gist
+MAX_STORED_ANSWER_CHARS = 600
+
+
+class SessionBusy(TimeoutError):
+    """
+    Another request held the session's turn lock for longer than we could wait
+    """
+
+
+def _text(result: Any) -> str:
+    """
+    Normalize an LLM result (message or plain string) to text
+    """
+    return getattr(result, "content", result).strip()
+
+
+class Session:
+    """
+    Conversation state for one user session: a rolling summary plus the most recent turns
+    """
+
+    __slots__ = ("session_id", "summary", "turns", "last_access", "lock")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.summary = ""
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+    def history_tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns
+        )
+
+    def render_history(self) -> str:
+        lines = []
+        if self.summary:
+            lines.append(f"Summary of earlier conversation: {self.summary}")
+        for question, answer in self.turns:
+            lines.append(f"Human: {question}")
+            lines.append(f"Assistant: {answer}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"summary": self.summary, "turns": [list(turn) for turn in self.turns]}
+
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any]) -> "Session":
+        session = cls(session_id)
+        session.summary = data.get("summary", "")
+        session.turns.extend(tuple(turn) for turn in data.get("turns", []))
+        return session
+
+
+class SessionStore:
+    """
+    In-process LRU of sessions with idle expiry and a hard cap on the number of sessions
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = config.SESSION_IDLE_TTL_SECONDS,
+        max_sessions: int = config.MAX_SESSIONS
+    ):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session:
+        """
+        Return the session, creating it if it is new or has expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted, _ = self._sessions.popitem(last=False)
+                    logger.debug(f"Evicted session {evicted} (session cap reached)")
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return session
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        """
+        Hold the session's lock so one turn reads and records its history at a time
+        """
+        with self.get(session_id).lock:
+            yield
+
+    def save(self, session: Session) -> None:
+        """
+        Persist a session after a turn (no-op for the in-process store)
+        """
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _expire(self, now: float) -> None:
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+
+
+class SharedSessionStore:
+    """
+    Sessions kept in the shared state store so any worker can continue a conversation
+    """
+
+    KEY_PREFIX = "session:"
+    LOCK_PREFIX = "lock:session:"
+    LOCK_POLL_SECONDS = 0.05
+
+    def __init__(
+        self,
+        state_store,
+        idle_ttl: float = config.SESSION_IDLE_TTL_SECONDS,
+        lock_ttl: float = config.SESSION_LOCK_TTL_SECONDS,
+        lock_wait: float = config.SESSION_LOCK_WAIT_SECONDS
+    ):
+        self.state_store = state_store
+        self.idle_ttl = idle_ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self._local_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def _local_lock(self, session_id: str) -> Iterator[None]:
+        # Threads of this process queue here instead of polling the shared lease
+        with self._guard:
+            lock, users = self._local_locks.get(session_id, (threading.Lock(), 0))
+            self._local_locks[session_id] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._guard:
+                lock, users = self._local_locks[session_id]
+                if users == 1:
+                    del self._local_locks[session_id]
+                else:
+                    self._local_locks[session_id] = (lock, users - 1)
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        """
+        Serialize turns of one session across workers with a lease in the state store,
+        so a turn's read-modify-write of the history cannot overwrite another's.
+        The lease expires after lock_ttl in case its holder dies mid-turn.
+        """
+        key = self.LOCK_PREFIX + session_id
+        lease = {"owner": uuid.uuid4().hex}
+        with self._local_lock(session_id):
+            deadline = time.monotonic() + self.lock_wait
+            while not self.state_store.put_if_absent(key, lease, ttl=self.lock_ttl):
+                if time.monotonic() >= deadline:
+                    raise SessionBusy(f"Session {session_id} is busy with another request")
+                time.sleep(self.LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                self.state_store.delete_if_equal(key, lease)
+
+    def get(self, session_id: str) -> Session:
+        data = self.state_store.get(self.KEY_PREFIX + session_id)
+        if data is None:
+            return Session(session_id)
+        return Session.from_dict(session_id, data)
+
+    def save(self, session: Session) -> None:
+        # Re-writing with a fresh TTL doubles as the idle-expiry clock
+        self.state_store.put(self.KEY_PREFIX + session.session_id, session.to_dict(), ttl=self.idle_ttl)
+
+    def delete(self, session_id: str) -> bool:
+        return self.state_store.delete(self.KEY_PREFIX + session_id)
+
+
+class ConversationManager:
+    """
+    Rewrites follow-up questions to stand alone and keeps session history under a token budget
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        store: Optional[Any] = None,
+        history_tokens: int = config.CONVERSATION_HISTORY_TOKENS
+    ):
+        self.llm = llm
+        self.store = store or SessionStore()
+        self.history_tokens = history_tokens
+
+    def condense_question(self, session: Session, question: str) -> str:
+        """
+        Rewrite a follow-up question into a standalone one; first questions pass through unchanged
+        """
+        if not session.turns and not session.summary:
+            return question
+        check_deadline("question_rewrite")
+        prompt = CONDENSE_QUESTION_PROMPT.format(
+            chat_history=session.render_history(), question=question
+        )
+        standalone = _text(self.llm.invoke(prompt))
+        return standalone or question
+
+    def record_turn(self, session: Session, question: str, answer: str) -> None:
+        """
+        Append a turn and fold the oldest turns into the summary once over budget
+        """
+        session.turns.append((question, answer[:MAX_STORED_ANSWER_CHARS]))
+        if session.history_tokens() <= self.history_tokens:
+            self.store.save(session)
+            return
+
+        # Keep the latest turn verbatim; condense everything older into the summary
+        folded: List[Tuple[str, str]] = []
+        while len(session.turns) > 1 and session.history_tokens() > self.history_tokens // 2:
+            folded.append(session.turns.popleft())
+
+        if folded:
+            new_lines = "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in folded)
+            max_words = max(self.history_tokens // 4, 20)
+            summary = f"{session.summary} {new_lines}".strip()
+            # Summarizing is an extra LLM call; when the request is short on time keep the raw lines
+            if stage_allowed("history_summary"):
+                try:
+                    summary = _text(self.llm.invoke(SUMMARY_PROMPT.format(
+                        summary=session.summary or "(none)", new_lines=new_lines, max_words=max_words
+                    )))
+                except Exception as e:
+                    logger.warning(f"Summarizing session {session.session_id} failed: {e}")
+            # Hard cap in case the model ignores the length instruction (or the raw lines were kept);
+            # the tail holds the most recent turns, which follow-ups are most likely to refer to
+            session.summary = summary[-(self.history_tokens // 2) * 4:]
+        self.store.save(session)
+
+    def ask(self, session_id: str, question: str, answer_fn) -> Dict[str, Any]:
+        """
+        Run one conversational turn: condense, answer via answer_fn(standalone), record.
+        Returns answer_fn's result with the standalone question added.
+        """
+        # Read the session under its lock so concurrent turns each see the other's history
+        with self.store.lock(session_id):
+            session = self.store.get(session_id)
+            standalone = self.condense_question(session, question)
+            response = answer_fn(standalone)
+            self.record_turn(session, question, response["result"])
+        response["standalone_question"] = standalone
+        return response
@@ -0,0 +1,127 @@
+#app/deadline.py
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised by a stage that cannot start (or finish) within the request's remaining time
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Absolute time budget for one request, plus what each stage managed to produce
+    (so a timed-out request can still return a partial response).
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.skipped: List[str] = []
+        self.partial: Dict[str, Any] = {}
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """
+        A stage timeout shrunk to the time that is left
+        """
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def check(self, stage: str) -> None:
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+    def allows(self, stage: str, min_seconds: float = config.DEADLINE_OPTIONAL_STAGE_SECONDS) -> bool:
+        """
+        Whether an optional stage should run; records it as skipped otherwise
+        """
+        if self.remaining() >= min_seconds:
+            return True
+        self.skipped.append(stage)
+        logger.info(f"Skipping {stage}: {self.remaining():.3f}s left")
+        return False
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Make a deadline current for the enclosed code (and for threads started via copy_context)
+    """
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_deadline(stage: str) -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def stage_allowed(stage: str, min_seconds: float = config.DEADLINE_OPTIONAL_STAGE_SECONDS) -> bool:
+    """
+    Optional stages run unless a current deadline is too close
+    """
+    deadline = current_deadline()
+    return deadline is None or deadline.allows(stage, min_seconds)
+
+
+def stage_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for a blocking call: default, shrunk to the current deadline if there is one
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    return deadline.timeout(default)
+
+
+def record_partial(key: str, value: Any) -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.partial[key] = value
+
+
+def parse_deadline_seconds(header_ms: Optional[str], form_ms: Optional[int]) -> float:
+    """
+    Request budget from the X-Request-Deadline-Ms header or deadline_ms form field,
+    capped at DEADLINE_MAX_SECONDS; DEADLINE_DEFAULT_SECONDS when neither is given
+    """
+    value = form_ms
+    if header_ms:
+        try:
+            value = int(header_ms)
+        except ValueError:
+            logger.warning(f"Ignoring invalid deadline header: {header_ms!r}")
+    if not value or value <= 0:
+        return config.DEADLINE_DEFAULT_SECONDS
+    return min(value / 1000, config.DEADLINE_MAX_SECONDS)
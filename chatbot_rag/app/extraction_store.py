@@ -0,0 +1,189 @@
+#app/extraction_store.py
+import os
+import struct
+import zlib
+import hashlib
+import logging
+import tempfile
+from typing import List, Optional
+
+import config
+from app.utils import extract_pages_from_pdf, join_pages
+from app.metrics import record_cache, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction output changes (library upgrade, new cleanup rules)
+# so stale artifacts are ignored instead of being reused.
+EXTRACTOR_VERSION = "pypdf2-1"
+
+# Artifact layout:
+#   MAGIC | page_count (uint32) | page_count + 1 offsets (uint64) | zlib page blobs
+# Offsets are relative to the start of the blob section, so a single page can
+# be read with one seek without inflating the rest of the document.
+MAGIC = b"RAGX\x01"
+_COUNT = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionStore:
+    """
+    Persistent, compressed store of per-page PDF text keyed by content hash and extractor version
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, version: str = EXTRACTOR_VERSION):
+        self.root_dir = root_dir or config.EXTRACTION_STORE_DIR
+        self.version = version
+
+    def path_for(self, sha256: str) -> str:
+        """
+        Return the artifact path for a content hash
+        """
+        return os.path.join(self.root_dir, sha256[:2], f"{sha256}.{self.version}.pgz")
+
+    def contains(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def put_pages(self, sha256: str, pages: List[str]) -> str:
+        """
+        Write per-page text for a document, replacing any existing artifact atomically
+        """
+        path = self.path_for(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        blobs = [zlib.compress(page.encode("utf-8"), 6) for page in pages]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                f.write(_COUNT.pack(len(pages)))
+                for offset in offsets:
+                    f.write(_OFFSET.pack(offset))
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        logger.info(f"Stored extraction artifact for {sha256[:12]} ({len(pages)} pages)")
+        return path
+
+    def _read_header(self, f) -> List[int]:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not an extraction artifact")
+        (page_count,) = _COUNT.unpack(f.read(_COUNT.size))
+        raw = f.read(_OFFSET.size * (page_count + 1))
+        return [_OFFSET.unpack_from(raw, i * _OFFSET.size)[0] for i in range(page_count + 1)]
+
+    def get_pages(self, sha256: str) -> Optional[List[str]]:
+        """
+        Return all pages for a content hash, or None if no valid artifact exists
+        """
+        path = self.path_for(sha256)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                offsets = self._read_header(f)
+                data = f.read(offsets[-1])
+            return [
+                zlib.decompress(data[start:end]).decode("utf-8")
+                for start, end in zip(offsets, offsets[1:])
+            ]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable extraction artifact {path}: {e}")
+            return None
+
+    def get_page(self, sha256: str, page_num: int) -> Optional[str]:
+        """
+        Return a single page (1-based) using the offset index
+        """
+        path = self.path_for(sha256)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                offsets = self._read_header(f)
+                if page_num < 1 or page_num >= len(offsets):
+                    raise IndexError(f"Page {page_num} out of range")
+                base = f.tell()
+                f.seek(base + offsets[page_num - 1])
+                blob = f.read(offsets[page_num] - offsets[page_num - 1])
+            return zlib.decompress(blob).decode("utf-8")
+        except IndexError:
+            raise
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable extraction artifact {path}: {e}")
+            return None
+
+
+_default_store: Optional[ExtractionStore] = None
+
+
+def get_extraction_store() -> ExtractionStore:
+    """
+    Return the process-wide extraction store
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = ExtractionStore()
+    return _default_store
+
+
+def extract_pages_cached(
+    file_path: str,
+    store: Optional[ExtractionStore] = None,
+    sha256: Optional[str] = None
+) -> List[str]:
+    """
+    Return per-page text for a PDF, parsing it only if no artifact exists for its content hash
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"PDF file not found: {file_path}")
+
+    if not config.EXTRACTION_STORE_ENABLED and store is None:
+        with stage_timer("extraction"):
+            return extract_pages_from_pdf(file_path)
+
+    store = store or get_extraction_store()
+    sha256 = sha256 or file_sha256(file_path)
+
+    pages = store.get_pages(sha256)
+    record_cache("extraction", pages is not None)
+    if pages is not None:
+        logger.info(f"Extraction cache hit for {os.path.basename(file_path)}")
+        return pages
+
+    with stage_timer("extraction"):
+        pages = extract_pages_from_pdf(file_path)
+    try:
+        store.put_pages(sha256, pages)
+    except Exception as e:
+        logger.warning(f"Failed to persist extraction artifact: {e}")
+    return pages
+
+
+def extract_text_cached(file_path: str, store: Optional[ExtractionStore] = None) -> str:
+    """
+    Cached equivalent of extract_text_from_pdf
+    """
+    return join_pages(extract_pages_cached(file_path, store=store))
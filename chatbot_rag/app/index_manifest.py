@@ -0,0 +1,208 @@
+#app/index_manifest.py
+import os
+import json
+import time
+import fcntl
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.clients import get_client
+from app.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+class IndexManifest:
+    """
+    Generation-numbered record of the documents in a persisted vector store.
+
+    Every write to the index bumps the generation; readers compare generations to
+    know when their open handles are stale.
+    """
+
+    def __init__(self, persist_dir: str = "vectorstore"):
+        self.persist_dir = persist_dir
+        self.path = os.path.join(persist_dir, MANIFEST_FILE)
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_stat: Optional[Tuple[int, int]] = None
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self) -> Dict[str, Any]:
+        """
+        Return the manifest, re-reading the file only when it has changed
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {"generation": 0, "documents": {}}
+
+        # Writes replace the file, so the inode changes even if mtime granularity is coarse
+        key = (stat.st_mtime_ns, stat.st_ino)
+        if self._cached is None or key != self._cached_stat:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._cached = json.load(f)
+            self._cached_stat = key
+        return self._cached
+
+    def generation(self) -> int:
+        return self.read()["generation"]
+
+    def _write(self, manifest: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.persist_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def update(self, mutate: Callable[[Dict[str, Any]], None]) -> int:
+        """
+        Apply a change under an exclusive file lock and bump the generation
+        """
+        with self._locked():
+            self._cached = None
+            manifest = self.read()
+            manifest = {"generation": manifest["generation"], "documents": dict(manifest["documents"])}
+            mutate(manifest)
+            manifest["generation"] += 1
+            manifest["updated_at"] = time.time()
+            self._write(manifest)
+            return manifest["generation"]
+
+    def record_document(self, filename: str, collection_name: str, chunks: int, **fields) -> int:
+        """
+        Register (or refresh) a document's collection; returns the new generation
+        """
+        def mutate(manifest):
+            manifest["documents"][filename] = {
+                "collection": collection_name,
+                "chunks": chunks,
+                "updated_at": time.time(),
+                **fields
+            }
+        generation = self.update(mutate)
+        logger.info(f"Index generation {generation}: recorded {filename}")
+        return generation
+
+    def remove_document(self, filename: str) -> int:
+        return self.update(lambda manifest: manifest["documents"].pop(filename, None))
+
+    def clear(self) -> int:
+        """
+        Delete the index data and forget every document, keeping the manifest itself so the
+        generation keeps increasing: workers that cached an older one reopen their handles
+        """
+        def mutate(manifest):
+            keep = {MANIFEST_FILE, MANIFEST_FILE + ".lock"}
+            with os.scandir(self.persist_dir) as entries:
+                for entry in entries:
+                    if entry.name in keep:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.remove(entry.path)
+            manifest["documents"].clear()
+        generation = self.update(mutate)
+        logger.info(f"Index generation {generation}: cleared {self.persist_dir}")
+        return generation
+
+
+class IndexReader:
+    """
+    Query-side access to a persisted index.
+
+    Handles are opened once and shared by all requests in this worker. When the
+    manifest generation changes (another worker or node wrote to the index) the
+    handles and Chroma's in-process client cache are dropped so the next query
+    sees the new data. Readers never write to the index.
+    """
+
+    def __init__(self, persist_dir: str = "vectorstore"):
+        self.persist_dir = persist_dir
+        self.manifest = IndexManifest(persist_dir)
+        self._generation = -1
+        self._stores: Dict[str, Any] = {}
+        self._counts: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def _drop_handles(self) -> None:
+        self._stores.clear()
+        self._counts = None
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except Exception as e:
+            logger.warning(f"Could not reset Chroma client cache: {e}")
+
+    def _refresh(self) -> int:
+        generation = self.manifest.generation()
+        if generation != self._generation:
+            self._counts = None
+            if self._stores:
+                logger.info(
+                    f"Index generation changed {self._generation} -> {generation}; reopening collections"
+                )
+                self._drop_handles()
+            self._generation = generation
+        return generation
+
+    def get_store(self, collection_name: str, embeddings_factory: Callable[[], Any]) -> Tuple[Any, int]:
+        """
+        Return (store, generation) for a collection, reopening it if the index has moved on
+        """
+        with self._lock:
+            generation = self._refresh()
+            store = self._stores.get(collection_name)
+            record_cache("index_store", store is not None)
+            if store is None:
+                from app.rag_pipeline import Chroma
+                store = Chroma(
+                    collection_name=collection_name,
+                    embedding_function=embeddings_factory(),
+                    persist_directory=self.persist_dir
+                )
+                self._stores[collection_name] = store
+            return store, generation
+
+    def collection_counts(self) -> Dict[str, int]:
+        """
+        Return {collection name: row count} for every collection in the index. Existing
+        collections are listed, never opened by name, so nothing is created; the counts
+        are kept until the generation changes.
+        """
+        with self._lock:
+            self._refresh()
+            if self._counts is None:
+                counts: Dict[str, int] = {}
+                if os.path.exists(os.path.join(self.persist_dir, "chroma.sqlite3")):
+                    import chromadb
+                    client = chromadb.PersistentClient(path=self.persist_dir)
+                    counts = {collection.name: collection.count() for collection in client.list_collections()}
+                self._counts = counts
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._drop_handles()
+            self._generation = -1
+
+
+def get_index_reader(persist_dir: str = "vectorstore") -> IndexReader:
+    """
+    Return the worker-wide reader for a persist directory
+    """
+    return get_client(("index_reader", persist_dir), lambda: IndexReader(persist_dir))
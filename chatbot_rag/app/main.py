@@ -1,31 +1,109 @@
 #app/main.py
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+from contextlib import asynccontextmanager, nullcontext
 import shutil
 import os
+import asyncio
 import logging
 from typing import Optional
-import time
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import retry, stop_after_attempt, stop_after_delay, wait_fixed
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from app.utils import extract_text_from_pdf
-from app.rag_pipeline import get_vectorstore, get_qa_chain, clear_vectorstore
+from app.extraction_store import extract_text_cached
+from app.catalog import get_catalog
+from app.storage import get_storage
+from app.context_packing import packing_stats
+from app.state import get_state_store
+from app.index_manifest import get_index_reader
+from app.warm_start import start_warmup
+from app.clients import registry_summary
+from app.resilience import CircuitOpenError, resilience_summary
+from app.model_router import get_model_router
+from app.deadline import Deadline, DeadlineExceeded, deadline_scope, parse_deadline_seconds
+from app.conversation import SessionBusy
+from app.metrics import CONTENT_TYPE, record_cache, render_metrics, stage_timer
+from app.tracing import current_trace_id, setup_tracing
+from app.profiling import (
+    PROFILE_MODES, ProfilerBusy, is_admin, profile_path, profile_scope, start_tracemalloc,
+    stop_tracemalloc, take_tracemalloc_snapshot
+)
 import config
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="RAG Chatbot API", description="Upload PDF and ask questions")
+# Per-worker caches. Which document is loaded lives in the shared state store,
+# so every worker (and node) answers for the same PDF.
+qa_chains = {}
+conversation_manager = None
+warmup = None
+startup_report = {"startup_seconds": None, "aws_tables": "disabled" if not config.AWS_AVAILABLE else "pending"}
+
 
-# Global variables
-qa_chain = None
-current_pdf_name = None
+def _embeddings_factory():
+    # LangChain/Google modules are imported on first use, not when the app is imported
+    from app.rag_pipeline import get_embeddings
+    return get_embeddings()
+
+
+async def bootstrap_aws_tables():
+    """
+    Create/verify DynamoDB tables off the startup path, retrying with backoff while AWS is unreachable
+    """
+    from aws_service.dynamo_handler import setup_tables
+
+    delay = 1.0
+    for attempt in range(1, config.AWS_BOOTSTRAP_ATTEMPTS + 1):
+        try:
+            ready = await asyncio.wait_for(
+                asyncio.to_thread(setup_tables), timeout=config.AWS_BOOTSTRAP_TIMEOUT_SECONDS
+            )
+            if ready:
+                startup_report["aws_tables"] = "ready"
+                logger.info(f"DynamoDB tables ready (attempt {attempt})")
+                return
+            logger.warning(f"DynamoDB table setup incomplete (attempt {attempt})")
+        except asyncio.TimeoutError:
+            logger.warning(f"DynamoDB table setup timed out (attempt {attempt})")
+        except Exception as e:
+            logger.warning(f"Failed to setup DynamoDB tables (attempt {attempt}): {e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30.0)
+    startup_report["aws_tables"] = "unavailable"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serving immediately; AWS bootstrap and index rehydration run in the background
+    """
+    global warmup
+    bootstrap_task = asyncio.create_task(bootstrap_aws_tables()) if config.AWS_AVAILABLE else None
+    bootstrap = None
+    if config.AWS_AVAILABLE and config.SNAPSHOT_IMPORT_ON_STARTUP:
+        # A node with an empty index downloads the latest snapshot instead of re-embedding
+        from app.snapshots import bootstrap_from_snapshot
+        bootstrap = lambda: bootstrap_from_snapshot(VECTORSTORE_DIR)
+    warmup = start_warmup(VECTORSTORE_DIR, get_state_store(), _embeddings_factory, bootstrap=bootstrap)
+    get_catalog(DATA_DIR).start_refresher()
+    startup_report["startup_seconds"] = round(time.perf_counter() - _import_started, 3)
+    logger.info(f"Startup finished in {startup_report['startup_seconds']}s")
+    yield
+    get_catalog(DATA_DIR).stop_refresher()
+    if bootstrap_task is not None:
+        bootstrap_task.cancel()
+
+
+app = FastAPI(title="RAG Chatbot API", description="Upload PDF and ask questions", lifespan=lifespan)
 
 # CORS for frontend access
 app.add_middleware(
@@ -34,24 +112,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+# The trace id is echoed so a slow answer can be looked up
+@app.middleware("http")
+async def add_trace_id_header(request: Request, call_next):
+    response = await call_next(request)
+    trace_id = current_trace_id()
+    if trace_id:
+        response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
+# Request spans (sampled). Instrumented after the middleware above so the request span
+# wraps it on every opentelemetry-instrumentation-fastapi release
+setup_tracing(app)
+
 # Ensure directories exist
+VECTORSTORE_DIR = config.VECTORSTORE_DIR
 DATA_DIR = "data"
 UPLOADS_DIR = "uploads"
 Path(DATA_DIR).mkdir(exist_ok=True)
 Path(UPLOADS_DIR).mkdir(exist_ok=True)
 
-limiter = Limiter(key_func=get_remote_address)
+# RATE_LIMIT_ENABLED=false lifts the per-IP limits for load tests against a single client address
+limiter = Limiter(key_func=get_remote_address, enabled=config.RATE_LIMIT_ENABLED)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-if config.AWS_AVAILABLE:
-    try:
-        from aws_service.dynamo_handler import setup_tables
-        setup_tables()
-    except Exception as e:
-        logger.warning(f"Failed to setup DynamoDB tables: {e}")
+
+@app.exception_handler(ProfilerBusy)
+async def profiler_busy_handler(request: Request, exc: ProfilerBusy):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+def require_admin(request: Request) -> None:
+    if not is_admin(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required")
+
+
+def requested_profile(request: Request) -> Optional[str]:
+    """
+    Profile mode asked for with the X-Profile header or ?profile= flag (admins only), else None
+    """
+    mode = request.headers.get("X-Profile") or request.query_params.get("profile")
+    if not mode:
+        return None
+    require_admin(request)
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"Profile mode must be one of {', '.join(PROFILE_MODES)}")
+    return mode
 
 @app.post("/upload-pdf/")
 @limiter.limit("5/minute")  # 5 requests per minute per IP
@@ -59,135 +170,362 @@ async def upload_pdf(request: Request, file: UploadFile = File(...)):
     """
     Upload and process a PDF file for RAG-based question answering
     """
-    global qa_chain, current_pdf_name
-    
-    try:
-        # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file provided")
+    profile_mode = requested_profile(request)
+    with profile_scope(profile_mode, "upload") as profile:
+        try:
+            # Validate file
+            if not file.filename:
+                raise HTTPException(status_code=400, detail="No file provided")
         
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+            if not file.filename.lower().endswith('.pdf'):
+                raise HTTPException(status_code=400, detail="Only PDF files are allowed")
         
-        if file.size and file.size > 50 * 1024 * 1024:  # 50MB limit
-            raise HTTPException(status_code=400, detail="File size too large. Maximum 50MB allowed")
+            if file.size and file.size > 50 * 1024 * 1024:  # 50MB limit
+                raise HTTPException(status_code=400, detail="File size too large. Maximum 50MB allowed")
 
-        logger.info(f"Processing PDF: {file.filename}")
+            logger.info(f"Processing PDF: {file.filename}")
         
-        # Save file locally
-        file_path = os.path.join(DATA_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Extract text from PDF
-        text = extract_text_from_pdf(file_path)
-        if not text.strip():
-            os.remove(file_path)
-            raise HTTPException(
-                status_code=400, 
-                detail="No text found in PDF. It may be scanned, empty, or corrupted."
-            )
+            # Save file locally
+            file_path = os.path.join(DATA_DIR, file.filename)
+            with stage_timer("upload_write"), open(file_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+
+            # Extract text from PDF (reuses the stored artifact if this content was seen before)
+            text = extract_text_cached(file_path)
+            if not text.strip():
+                os.remove(file_path)
+                raise HTTPException(
+                    status_code=400, 
+                    detail="No text found in PDF. It may be scanned, empty, or corrupted."
+                )
+            catalog = get_catalog(DATA_DIR)
+            catalog.record_local(file.filename, size=os.path.getsize(file_path))
 
-        # Optional AWS integration
-        if config.AWS_AVAILABLE:
-            try:
-                from aws_service.s3_handler import upload_pdf_to_s3
-                from aws_service.dynamo_handler import store_metadata
+            # Optional AWS integration
+            in_s3 = False
+            if config.AWS_AVAILABLE:
+                try:
+                    from aws_service.s3_handler import upload_pdf_to_s3
+                    from aws_service.dynamo_handler import store_metadata
                 
-                # Upload to S3
-                with open(file_path, "rb") as f:
-                    file_content = f.read()
-                s3_url = upload_pdf_to_s3(file_content, file.filename, config.S3_BUCKET_NAME)
-                if s3_url:
-                    logger.info(f"PDF uploaded to S3: {s3_url}")
+                    # Upload to S3
+                    with open(file_path, "rb") as f:
+                        file_content = f.read()
+                    s3_url = upload_pdf_to_s3(file_content, file.filename, config.S3_BUCKET_NAME)
+                    if s3_url:
+                        logger.info(f"PDF uploaded to S3: {s3_url}")
+                        catalog.record_s3(file.filename, size=len(file_content))
+                        in_s3 = True
                 
-                # Store metadata
-                user_id_value = 'anonymous'
-                if store_metadata(file.filename, user_id=user_id_value):
-                    logger.info(f"Metadata stored for: {file.filename}")
+                    # Store metadata
+                    user_id_value = 'anonymous'
+                    if store_metadata(file.filename, user_id=user_id_value):
+                        logger.info(f"Metadata stored for: {file.filename}")
+                        catalog.record_metadata(file.filename, user_id=user_id_value, status="processed")
                     
-            except Exception as e:
-                logger.warning(f"AWS integration failed: {e}")
-        else:
-            logger.info("AWS services not configured, skipping S3 upload and metadata storage")
-
-        # Create vector store and QA chain
-        vectordb = get_vectorstore(text)
-        qa_chain = get_qa_chain(vectordb)
-        current_pdf_name = file.filename
-
-        # Get list of available PDFs
-        pdf_files = []
-        if os.path.exists(DATA_DIR):
-            pdf_files = [
-                f for f in os.listdir(DATA_DIR) 
-                if f.lower().endswith('.pdf') and os.path.isfile(os.path.join(DATA_DIR, f))
-            ]
-
-        return JSONResponse({
-            "message": f"PDF '{file.filename}' processed successfully",
-            "filename": file.filename,
-            "text_length": len(text),
-            "available_pdfs": sorted(pdf_files),
-            "status": "ready_for_questions"
-        })
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error processing PDF: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+                except Exception as e:
+                    logger.warning(f"AWS integration failed: {e}")
+            else:
+                logger.info("AWS services not configured, skipping S3 upload and metadata storage")
+
+            # data/ is a bounded cache of S3: older copies already in S3 may be evicted now
+            get_storage(DATA_DIR).admit(file.filename, remote=in_s3)
+
+            # Create vector store and make it the current document for every worker
+            from app.rag_pipeline import get_vectorstore, collection_name_for
+            get_vectorstore(text, persist_dir=VECTORSTORE_DIR, source=file.filename)
+            get_state_store().set_current_document(
+                file.filename, collection_name_for(file.filename), VECTORSTORE_DIR
+            )
+
+            # Available PDFs come from the in-memory catalog (first CATALOG_RESPONSE_LIMIT names; see /documents)
+            return JSONResponse({
+                "message": f"PDF '{file.filename}' processed successfully",
+                "filename": file.filename,
+                "text_length": len(text),
+                "available_pdfs": catalog.available_pdfs(),
+                "available_pdf_count": len(catalog),
+                "status": "ready_for_questions",
+                "trace_id": current_trace_id(),
+                "profile": profile.report() if profile else None
+            })
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing PDF: {e}")
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def get_chain_for(document: dict, model_name: Optional[str] = None):
+    """
+    Return this worker's QA chain for a document and model, rebuilt when the index generation changes
+    """
+    from app.rag_pipeline import get_qa_chain
+
+    collection = document["collection"]
+    store, generation = get_index_reader(document.get("persist_dir", VECTORSTORE_DIR)).get_store(
+        collection, _embeddings_factory
+    )
+    key = (collection, model_name)
+    cached = qa_chains.get(key)
+    record_cache("qa_chain", cached is not None and cached[0] == generation)
+    if cached is None or cached[0] != generation:
+        chain = get_qa_chain(store, model_name=model_name) if model_name else get_qa_chain(store)
+        cached = (generation, chain)
+        qa_chains[key] = cached
+    return cached[1]
+
+
+def route_question(question: str, latency_budget_ms: Optional[int] = None):
+    """
+    Pick the model for a question, or None to use the default model when routing is off.
+    Runs before retrieval, so the router assumes CONTEXT_TOKEN_BUDGET tokens of context (see ModelRouter.route).
+    """
+    if not config.ROUTER_ENABLED:
+        return None
+    budget = latency_budget_ms / 1000 if latency_budget_ms else None
+    return get_model_router().route(question, latency_budget=budget)
+
+
+def serving(decision):
+    """
+    Count the request against the routed model's queue depth while it runs
+    """
+    return get_model_router().track(decision.model) if decision else nullcontext()
+
+
+def get_conversation_manager():
+    """
+    Return the process-wide conversation manager, creating it on first use
+    """
+    global conversation_manager
+    if conversation_manager is None:
+        from app.conversation import ConversationManager, SharedSessionStore
+        from app.rag_pipeline import get_llm
+        conversation_manager = ConversationManager(
+            get_llm(max_output_tokens=512),
+            store=SharedSessionStore(get_state_store())
+        )
+    return conversation_manager
+
+
+async def run_before_deadline(deadline: Deadline, fn):
+    """
+    Run a blocking chain call in a worker thread (which inherits the deadline), giving up when it passes.
+    The LLM and AWS calls inside it get the remaining time as their own timeouts, so the thread
+    does not keep working long after the response has gone out.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(fn), timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("llm" if "sources" in deadline.partial else "retrieval")
+
+
+def deadline_report(deadline: Deadline) -> dict:
+    return {
+        "budget_seconds": deadline.budget,
+        "remaining_seconds": round(deadline.remaining(), 3),
+        "skipped_stages": deadline.skipped
+    }
+
+
+def deadline_response(deadline: Deadline, stage: str, question: str) -> JSONResponse:
+    """
+    504 carrying whatever the request produced before its deadline (e.g. retrieved sources)
+    """
+    logger.warning(f"Deadline of {deadline.budget}s exceeded during {stage}")
+    return JSONResponse(status_code=504, content={
+        "detail": f"Request deadline exceeded during {stage}",
+        "question": question,
+        "timed_out_stage": stage,
+        "partial": deadline.partial,
+        "deadline": deadline_report(deadline),
+        "trace_id": current_trace_id()
+    })
+
+
+def context_token_report(documents) -> Optional[dict]:
+    """
+    Prompt-size reduction reported by the context packing stage, if it ran
+    """
+    if not documents or "packed_tokens" not in documents[0].metadata:
+        return None
+    metadata = documents[0].metadata
+    return {"original": metadata["original_tokens"], "packed": metadata["packed_tokens"]}
 
 
 @app.post("/ask")
 @limiter.limit("10/minute")  # 10 requests per minute per IP
-async def ask_question(request: Request, question: str = Form(...)):
+async def ask_question(
+    request: Request,
+    question: str = Form(...),
+    session_id: Optional[str] = Form(None),
+    latency_budget_ms: Optional[int] = Form(None),
+    deadline_ms: Optional[int] = Form(None)
+):
     """
-    Ask a question about the uploaded PDF
+    Ask a question about the uploaded PDF.
+    Pass a session_id to ask follow-up questions that rely on earlier turns, and
+    latency_budget_ms to steer model routing towards faster models.
+    The whole request is bounded by deadline_ms (or the X-Request-Deadline-Ms header).
     """
-    global qa_chain, current_pdf_name
-    
-    if qa_chain is None:
+    document = get_state_store().get_current_document()
+    if document is None and warmup is not None and warmup.status == "warming":
+        raise HTTPException(status_code=503, detail="Service is warming up, please retry shortly")
+    if document is None:
         raise HTTPException(
             status_code=400, 
             detail="No PDF uploaded. Please upload a PDF first using /upload-pdf/"
         )
+    current_pdf_name = document["filename"]
 
     if not question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
 
-    try:
-        start_time = time.time()
+    profile_mode = requested_profile(request)
+    deadline_seconds = parse_deadline_seconds(request.headers.get("X-Request-Deadline-Ms"), deadline_ms)
+    with deadline_scope(deadline_seconds) as deadline, profile_scope(profile_mode, "ask") as profile:
+        try:
+            start_time = time.time()
+            decision = route_question(question, latency_budget_ms or int(deadline.remaining() * 1000))
+            qa_chain = get_chain_for(document, decision.model if decision else None)
         
-        # Get answer from RAG chain
-        response = qa_chain.invoke({"query": question})
-        answer = response["result"]
+            # Get answer from RAG chain
+            def answer_question():
+                with serving(decision):
+                    if session_id:
+                        return get_conversation_manager().ask(
+                            session_id, question, lambda standalone: qa_chain.invoke({"query": standalone})
+                        )
+                    return qa_chain.invoke({"query": question})
+        
+            response = await run_before_deadline(
+                deadline, (lambda: profile.run(answer_question)) if profile else answer_question
+            )
+            answer = response["result"]
         
-        # Calculate response time
-        response_time = time.time() - start_time
+            # Calculate response time
+            response_time = time.time() - start_time
         
-        # Optional AWS metrics storage
-        if config.AWS_AVAILABLE:
-            try:
-                from aws_service.dynamo_handler import store_llm_metrics
-                @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-                def store_llm_metrics_retry(question, response_time, answer, pdf_name):
-                    store_llm_metrics(question, response_time, answer, pdf_name)
-                store_llm_metrics_retry(question, response_time, answer, current_pdf_name)
-            except Exception as e:
-                logger.warning(f"Failed to store metrics: {e}")
-
-        return JSONResponse({
-            "answer": answer,
-            "question": question,
-            "pdf_name": current_pdf_name,
-            "response_time": round(response_time, 2),
-            "sources": [doc.page_content[:200] + "..." for doc in response.get("source_documents", [])]
-        })
+            # Optional AWS metrics storage (skipped, and its retries cut short, when time is running out)
+            if config.AWS_AVAILABLE and deadline.allows("metrics_persistence"):
+                try:
+                    from aws_service.dynamo_handler import store_llm_metrics
+                    @retry(
+                        stop=stop_after_attempt(3) | stop_after_delay(deadline.remaining()),
+                        wait=wait_fixed(min(2.0, deadline.remaining() / 3))
+                    )
+                    def store_llm_metrics_retry(question, response_time, answer, pdf_name):
+                        store_llm_metrics(question, response_time, answer, pdf_name)
+                    store_llm_metrics_retry(question, response_time, answer, current_pdf_name)
+                except Exception as e:
+                    logger.warning(f"Failed to store metrics: {e}")
 
-    except Exception as e:
-        logger.error(f"Error processing question: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+            return JSONResponse({
+                "answer": answer,
+                "question": question,
+                "pdf_name": current_pdf_name,
+                "response_time": round(response_time, 2),
+                "sources": [doc.page_content[:200] + "..." for doc in response.get("source_documents", [])],
+                "context_tokens": context_token_report(response.get("source_documents", [])),
+                "session_id": session_id,
+                "standalone_question": response.get("standalone_question"),
+                "model": decision.model if decision else None,
+                "routing": decision.to_dict() if decision else None,
+                "deadline": deadline_report(deadline),
+                "trace_id": current_trace_id(),
+                "profile": profile.report() if profile else None
+            })
+
+        except DeadlineExceeded as e:
+            return deadline_response(deadline, e.stage, question)
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+        except SessionBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error processing question: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+
+
+@app.post("/ask-all")
+@limiter.limit("10/minute")
+async def ask_across_documents(
+    request: Request,
+    question: str = Form(...),
+    filenames: Optional[str] = Form(None),
+    user_id: Optional[str] = Form(None),
+    k: int = Form(4),
+    latency_budget_ms: Optional[int] = Form(None),
+    deadline_ms: Optional[int] = Form(None)
+):
+    """
+    Ask a question across all uploaded PDFs, optionally filtered by filename (comma-separated) or user.
+    Bounded by deadline_ms (or the X-Request-Deadline-Ms header).
+    """
+    if not question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    deadline_seconds = parse_deadline_seconds(request.headers.get("X-Request-Deadline-Ms"), deadline_ms)
+    # Imported here to keep Chroma off the startup path
+    from app.retrieval import OwnerLookupError, get_cross_document_retriever
+
+    with deadline_scope(deadline_seconds) as deadline:
+        try:
+            from app.rag_pipeline import get_qa_chain
+
+            start_time = time.time()
+
+            filename_list = [f.strip() for f in filenames.split(",") if f.strip()] if filenames else None
+            retriever = get_cross_document_retriever(
+                persist_dir=VECTORSTORE_DIR, filenames=filename_list, user_id=user_id, k=k
+            )
+            if not retriever.collection_names:
+                raise HTTPException(status_code=404, detail="No documents match the given filters")
+
+            decision = route_question(question, latency_budget_ms or int(deadline.remaining() * 1000))
+            if decision:
+                chain = get_qa_chain(None, model_name=decision.model, retriever=retriever)
+            else:
+                chain = get_qa_chain(None, retriever=retriever)
+            def answer_question():
+                with serving(decision):
+                    return chain.invoke({"query": question})
+
+            response = await run_before_deadline(deadline, answer_question)
+            response_time = time.time() - start_time
+
+            return JSONResponse({
+                "answer": response["result"],
+                "question": question,
+                "documents_searched": len(retriever.collection_names),
+                "model": decision.model if decision else None,
+                "routing": decision.to_dict() if decision else None,
+                "context_tokens": context_token_report(response.get("source_documents", [])),
+                "response_time": round(response_time, 2),
+                "deadline": deadline_report(deadline),
+                "trace_id": current_trace_id(),
+                "sources": [
+                    {
+                        "pdf_name": doc.metadata.get("source"),
+                        "content": doc.page_content[:200] + "..."
+                    }
+                    for doc in response.get("source_documents", [])
+                ]
+            })
+
+        except HTTPException:
+            raise
+        except DeadlineExceeded as e:
+            return deadline_response(deadline, e.stage, question)
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+        except OwnerLookupError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error processing cross-document question: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
 
 @app.get("/status")
@@ -195,15 +533,162 @@ async def get_status():
     """
     Get current status of the RAG system
     """
-    global qa_chain, current_pdf_name
+    document = get_state_store().get_current_document()
     
     return JSONResponse({
-        "pdf_loaded": qa_chain is not None,
-        "current_pdf": current_pdf_name,
-        "status": "ready" if qa_chain else "no_pdf_loaded"
+        "pdf_loaded": document is not None,
+        "current_pdf": document["filename"] if document else None,
+        "status": "ready" if document else "no_pdf_loaded",
+        "index_generation": get_index_reader(VECTORSTORE_DIR).manifest.generation(),
+        "warmup": warmup.to_dict() if warmup else None,
+        "startup": startup_report,
+        "clients": registry_summary(),
+        "llm_resilience": resilience_summary(),
+        "routing": get_model_router().summary() if config.ROUTER_ENABLED else None,
+        "context_packing": packing_stats.summary(),
+        "catalog": get_catalog(DATA_DIR).summary(),
+        "storage": get_storage(DATA_DIR).summary()
     })
 
 
+@app.get("/documents")
+async def list_documents(limit: int = 100, cursor: Optional[str] = None):
+    """
+    Page through every known PDF (local, S3 and metadata merged) in filename order.
+    Pass next_cursor from a page as cursor to get the next one.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return JSONResponse(get_catalog(DATA_DIR).page(limit=limit, after=cursor))
+
+
+@app.post("/documents/{filename}/reindex")
+@limiter.limit("5/minute")
+async def reindex_document(request: Request, filename: str):
+    """
+    Rebuild a document's index from its stored PDF (the local cache, or S3 on a miss)
+    and make it the current document
+    """
+    try:
+        with get_storage(DATA_DIR).checkout(filename) as file_path:
+            text = extract_text_cached(file_path)
+            get_catalog(DATA_DIR).record_local(filename, size=os.path.getsize(file_path))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching {filename}: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not fetch document: {str(e)}")
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text found in PDF")
+
+    try:
+        from app.rag_pipeline import get_vectorstore, collection_name_for
+        get_vectorstore(text, persist_dir=VECTORSTORE_DIR, source=filename)
+        get_state_store().set_current_document(filename, collection_name_for(filename), VECTORSTORE_DIR)
+    except Exception as e:
+        logger.error(f"Error reindexing {filename}: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    return JSONResponse({
+        "message": f"PDF '{filename}' reindexed successfully",
+        "filename": filename,
+        "text_length": len(text),
+        "status": "ready_for_questions"
+    })
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 while persisted indexes are being rehydrated, 200 once ready
+    """
+    if warmup is None:
+        return JSONResponse({"status": "warming"}, status_code=503)
+    report = warmup.to_dict()
+    return JSONResponse(report, status_code=200 if warmup.ready else 503)
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Forget a conversation session
+    """
+    deleted = get_conversation_manager().store.delete(session_id)
+    return JSONResponse({"session_id": session_id, "deleted": deleted})
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, LLM latency, cache hits, queue depth and AWS call latency
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
+admin = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@admin.get("/profiles/{name}")
+async def download_profile(name: str, request: Request):
+    """
+    Download a stored profile (.folded for flame graphs, .prof for pstats/snakeviz, .tracemalloc snapshots)
+    """
+    require_admin(request)
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
+
+
+@admin.post("/tracemalloc/start")
+async def tracemalloc_start(request: Request, frames: int = 25):
+    require_admin(request)
+    return JSONResponse(start_tracemalloc(frames))
+
+
+@admin.get("/tracemalloc/snapshot")
+async def tracemalloc_snapshot(request: Request, limit: int = 20, group_by: str = "lineno"):
+    """
+    Top allocation sites, plus growth since the previous snapshot (e.g. across a large PDF upload)
+    """
+    require_admin(request)
+    try:
+        return JSONResponse(take_tracemalloc_snapshot(limit=limit, group_by=group_by))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@admin.post("/tracemalloc/stop")
+async def tracemalloc_stop(request: Request):
+    require_admin(request)
+    return JSONResponse(stop_tracemalloc())
+
+
+@admin.post("/snapshots")
+async def create_snapshot(request: Request):
+    """
+    Export the current index generation to S3 as the latest snapshot for new nodes
+    """
+    require_admin(request)
+    if not config.AWS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AWS services are not configured")
+    from app.snapshots import SnapshotConflict, export_snapshot
+    try:
+        snapshot = await asyncio.to_thread(export_snapshot, VECTORSTORE_DIR)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SnapshotConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse({key: value for key, value in snapshot.items() if key not in ("collections", "documents")})
+
+
+app.include_router(admin)
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -215,7 +700,11 @@ async def health_check():
 @app.post("/clear-vectorstore/")
 def clear_vectorstore_endpoint():
     try:
-        clear_vectorstore("vectorstore")
+        from app.rag_pipeline import clear_vectorstore
+        clear_vectorstore(VECTORSTORE_DIR)
+        get_state_store().clear_current_document()
+        get_index_reader(VECTORSTORE_DIR).reset()
+        qa_chains.clear()
         return {"status": "success", "message": "Vector store cleared."}
     except Exception as e:
         return {"status": "error", "message": str(e)}
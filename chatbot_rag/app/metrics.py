@@ -0,0 +1,352 @@
+#app/metrics.py
+import time
+import bisect
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond cache lookups up to slow LLM answers
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """
+    A named metric family; children per label combination are created once and reused
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    def labels(self, *values: str):
+        """
+        Return the child for a label combination (cache it at the call site on hot paths)
+        """
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        ...
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Gauge(_Metric):
+    """
+    Point-in-time value. A collect callback (returning {label values: value}) is evaluated at scrape time,
+    so nothing is paid on the request path for values that already live elsewhere.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _samples(self) -> Iterable[str]:
+        if self.collect is not None:
+            try:
+                for values, value in self.collect().items():
+                    self.labels(*values).set(value)
+            except Exception as e:
+                logger.warning(f"Collecting {self.name} failed: {e}")
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Timer:
+    """
+    Context manager observing elapsed seconds into a histogram child (a plain class: cheaper than @contextmanager)
+    """
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Metric families exposed on /metrics in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "rag_stage_seconds",
+    "Latency of each pipeline stage",
+    ["stage"]
+))
+LLM_SECONDS = registry.register(Histogram(
+    "rag_llm_seconds",
+    "LLM latency per model: time to first token and total",
+    ["model", "phase"]
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "rag_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]
+))
+AWS_CALL_SECONDS = registry.register(Histogram(
+    "rag_aws_call_seconds",
+    "Latency of S3 and DynamoDB API calls",
+    ["service", "operation"]
+))
+AWS_CALL_ERRORS = registry.register(Counter(
+    "rag_aws_call_errors_total",
+    "S3 and DynamoDB API calls that returned an error",
+    ["service", "operation"]
+))
+
+# Name -> callable returning {queue: depth}; read only when /metrics is scraped
+_queue_sources: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def _collect_queue_depth() -> Dict[Tuple[str, ...], float]:
+    depths: Dict[Tuple[str, ...], float] = {}
+    for source in list(_queue_sources.values()):
+        for queue, depth in source().items():
+            depths[(queue,)] = depth
+    return depths
+
+
+QUEUE_DEPTH = registry.register(Gauge(
+    "rag_queue_depth",
+    "Work waiting or in flight per queue (worker pools, model routes)",
+    ["queue"],
+    collect=_collect_queue_depth
+))
+
+
+def register_queue_source(name: str, source: Callable[[], Dict[str, float]]) -> None:
+    """
+    Report queue depths at scrape time; registering the same name again replaces the source
+    """
+    _queue_sources[name] = source
+
+
+def executor_depth(executor) -> int:
+    """
+    Tasks submitted to a ThreadPoolExecutor that have not started yet
+    """
+    return executor._work_queue.qsize()
+
+
+def stage_timer(stage: str) -> _Timer:
+    """
+    Time a block as one observation of a pipeline stage
+    """
+    return _Timer(STAGE_SECONDS.labels(stage))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_llm(model: str, first_token_seconds: float, total_seconds: float) -> None:
+    LLM_SECONDS.labels(model, "first_token").observe(first_token_seconds)
+    LLM_SECONDS.labels(model, "total").observe(total_seconds)
+
+
+def instrument_boto_client(client, service: str) -> None:
+    """
+    Observe every API call made by a boto3 client (pass resource.meta.client for resources)
+    """
+    # Start at parameter build: before-call handlers may short-circuit the call (e.g. stubs)
+    def before_call(model, context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+
+    def after_call(model, context, http_response=None, parsed=None, **kwargs):
+        started = context.pop("metrics_started", None)
+        if started is None:
+            return
+        AWS_CALL_SECONDS.labels(service, model.name).observe(time.perf_counter() - started)
+        if parsed is not None and "Error" in parsed:
+            AWS_CALL_ERRORS.labels(service, model.name).inc()
+
+    client.meta.events.register("before-parameter-build", before_call, unique_id="rag-metrics-before")
+    client.meta.events.register("after-call", after_call, unique_id="rag-metrics-after")
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,162 @@
+#app/mmr.py
+import time
+import logging
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document, BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+import config
+from app.deadline import check_deadline, stage_allowed
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def mmr_select(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7
+) -> Tuple[List[int], np.ndarray]:
+    """
+    Maximal marginal relevance over candidate embeddings.
+
+    Returns the selected candidate indexes (in selection order) and the cosine
+    similarity of every candidate to the query. The pairwise similarity matrix is
+    computed once; each selection step is a vectorized max/argmax over it.
+    """
+    candidates = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    query = _normalize(np.asarray(query_vector, dtype=np.float32))
+
+    relevance = candidates @ query
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return [], relevance
+
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    max_redundancy = pairwise[:, selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_redundancy, pairwise[:, best], out=max_redundancy)
+
+    return selected, relevance
+
+
+def adaptive_k(
+    similarities: np.ndarray,
+    min_k: int = 1,
+    max_k: int = 4,
+    score_threshold: float = 0.0,
+    elbow_gap: float = 0.08
+) -> int:
+    """
+    Choose how many results to keep for a query.
+
+    Candidates below score_threshold are dropped, then the list is cut at the
+    largest drop between consecutive similarities if that drop is at least
+    elbow_gap. Always keeps at least min_k and at most max_k.
+    """
+    ranked = np.sort(np.asarray(similarities, dtype=np.float32))[::-1]
+    if len(ranked) == 0:
+        return 0
+
+    n = int(np.count_nonzero(ranked >= score_threshold))
+    n = max(min(n, max_k, len(ranked)), min(min_k, len(ranked)))
+
+    if n > min_k:
+        gaps = ranked[:n - 1] - ranked[1:n]
+        gaps[:max(min_k - 1, 0)] = 0.0
+        cut = int(np.argmax(gaps))
+        if gaps[cut] >= elbow_gap:
+            n = max(cut + 1, min_k)
+    return n
+
+
+class MMRRetriever(BaseRetriever):
+    """
+    Over-fetches candidates from a Chroma store, picks k adaptively and diversifies with MMR
+    """
+
+    vectordb: Any
+    fetch_k: int = 20
+    min_k: int = 1
+    max_k: int = 4
+    lambda_mult: float = 0.7
+    score_threshold: float = 0.0
+    elbow_gap: float = 0.08
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        check_deadline("retrieval")
+        query_vector = self.vectordb._embedding_function.embed_query(query)
+        results = self.vectordb._collection.query(
+            query_embeddings=[query_vector],
+            n_results=self.fetch_k,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        documents = results["documents"][0]
+        if not documents:
+            return []
+        metadatas = results["metadatas"][0] or [None] * len(documents)
+
+        start = time.perf_counter()
+        embeddings = np.asarray(results["embeddings"][0], dtype=np.float32)
+        relevance = _normalize(embeddings) @ _normalize(np.asarray(query_vector, dtype=np.float32))
+        k = adaptive_k(
+            relevance,
+            min_k=self.min_k,
+            max_k=self.max_k,
+            score_threshold=self.score_threshold,
+            elbow_gap=self.elbow_gap
+        )
+        if stage_allowed("mmr_rerank"):
+            # Only candidates that clear the threshold compete in MMR (at least the top min_k)
+            eligible = np.flatnonzero(relevance >= self.score_threshold)
+            if len(eligible) < k:
+                eligible = np.argsort(-relevance)[:k]
+            picked, _ = mmr_select(query_vector, embeddings[eligible], k, lambda_mult=self.lambda_mult)
+            selected = [int(eligible[i]) for i in picked]
+        else:
+            selected = [int(i) for i in np.argsort(-relevance)[:k]]
+        stage_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"MMR selected {len(selected)}/{len(documents)} candidates in {stage_ms:.3f} ms")
+
+        return [
+            Document(
+                page_content=documents[i],
+                metadata={**(metadatas[i] or {}), "similarity": float(relevance[i])}
+            )
+            for i in selected
+        ]
+
+
+def get_mmr_retriever(vectordb: Any, max_k: int = 4, **overrides: Optional[float]) -> MMRRetriever:
+    """
+    Build an MMRRetriever using the RETRIEVAL_* settings from config
+    """
+    settings = {
+        "fetch_k": config.RETRIEVAL_FETCH_K,
+        "min_k": config.RETRIEVAL_MIN_K,
+        "max_k": max_k,
+        "lambda_mult": config.MMR_LAMBDA,
+        "score_threshold": config.RETRIEVAL_SCORE_THRESHOLD,
+        "elbow_gap": config.RETRIEVAL_ELBOW_GAP,
+    }
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return MMRRetriever(vectordb=vectordb, **settings)
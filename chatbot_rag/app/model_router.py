@@ -0,0 +1,210 @@
+#app/model_router.py
+import re
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import config
+from app.clients import get_client
+from app.context_packing import estimate_tokens
+from app.resilience import get_circuit_breaker, get_latency_tracker
+from app.metrics import register_queue_source
+
+logger = logging.getLogger(__name__)
+
+# Questions that usually need the full model's reasoning
+COMPLEX_QUESTION_PATTERN = re.compile(
+    r"\b(compare|contrast|differen\w*|why|explain|analy[sz]\w*|summar\w*|trade-?offs?|step[- ]by[- ]step|implications?)\b",
+    re.IGNORECASE
+)
+
+
+class ModelProfile:
+    """
+    A routable model with a prior latency estimate used until real latencies are learned
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prior_seconds: float,
+        seconds_per_1k_tokens: float = 0.25,
+        max_tokens: int = 30000,
+        concurrency: int = config.ROUTER_MODEL_CONCURRENCY
+    ):
+        self.name = name
+        self.prior_seconds = prior_seconds
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+
+
+class RoutingDecision:
+    """
+    Which model serves a request, and why
+    """
+
+    def __init__(self, model: str, reason: str, estimated_seconds: float, prompt_tokens: int, in_flight: int):
+        self.model = model
+        self.reason = reason
+        self.estimated_seconds = estimated_seconds
+        self.prompt_tokens = prompt_tokens
+        self.in_flight = in_flight
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "reason": self.reason,
+            "estimated_seconds": round(self.estimated_seconds, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "in_flight": self.in_flight
+        }
+
+
+class ModelRouter:
+    """
+    Picks a model per request from prompt size, question complexity, current load and the
+    caller's latency budget. Profiles are ordered from fastest/cheapest to most capable.
+    """
+
+    def __init__(self, profiles: List[ModelProfile], complex_question_tokens: int = config.ROUTER_COMPLEX_QUESTION_TOKENS):
+        if not profiles:
+            raise ValueError("At least one model profile is required")
+        self.profiles = profiles
+        self.complex_question_tokens = complex_question_tokens
+        self._in_flight: Counter = Counter()
+        self._served: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def in_flight(self, model: str) -> int:
+        with self._lock:
+            return self._in_flight[model]
+
+    def estimate_seconds(self, profile: ModelProfile, prompt_tokens: int) -> float:
+        """
+        Expected latency: learned p95 (or the prior plus a per-token cost), inflated by queueing
+        """
+        learned = get_latency_tracker(profile.name).quantile(95)
+        if learned is None:
+            learned = profile.prior_seconds + profile.seconds_per_1k_tokens * prompt_tokens / 1000
+        queue_factor = 1 + self.in_flight(profile.name) / max(profile.concurrency, 1)
+        return learned * queue_factor
+
+    def is_complex(self, question: str) -> bool:
+        return (
+            estimate_tokens(question) >= self.complex_question_tokens
+            or COMPLEX_QUESTION_PATTERN.search(question) is not None
+        )
+
+    def route(
+        self,
+        question: str,
+        context_tokens: Optional[int] = None,
+        latency_budget: Optional[float] = None
+    ) -> RoutingDecision:
+        """
+        Choose a model for a question; latency_budget is in seconds.
+
+        Without context_tokens the context is assumed to be CONTEXT_TOKEN_BUDGET tokens. The
+        endpoints route before retrieval (the model is part of the chain that retrieves), so for
+        them the context term is the same for every question and only the question, load and
+        latency budget change the choice. It is an estimate, not a bound: with packing disabled
+        retrieved chunks are sent whole, and when packing is skipped for time the top chunk is
+        kept even if it alone is over the budget.
+        """
+        if context_tokens is None:
+            context_tokens = config.CONTEXT_TOKEN_BUDGET
+        prompt_tokens = estimate_tokens(question) + context_tokens
+
+        usable = [
+            p for p in self.profiles
+            if p.max_tokens >= prompt_tokens and get_circuit_breaker(p.name).accepting()
+        ]
+        if not usable:
+            return self._decide(self.profiles[0], "no_model_available", prompt_tokens)
+
+        complex_question = self.is_complex(question)
+        preferred = usable[-1] if complex_question else usable[0]
+        reason = "complex_question" if complex_question else "simple_question"
+        wanted = self.profiles[-1] if complex_question else self.profiles[0]
+        if preferred is not wanted:
+            reason = "unavailable_fallback"
+
+        estimate = self.estimate_seconds(preferred, prompt_tokens)
+        if latency_budget is None or estimate <= latency_budget:
+            return self._decide(preferred, reason, prompt_tokens, estimate)
+
+        # Budget at risk: the most capable model that still fits, else the fastest one
+        estimates = [(self.estimate_seconds(p, prompt_tokens), p) for p in usable]
+        fitting = [(e, p) for e, p in estimates if e <= latency_budget]
+        if fitting:
+            estimate, profile = fitting[-1]
+            return self._decide(profile, "budget_fallback", prompt_tokens, estimate)
+        estimate, profile = min(estimates, key=lambda item: item[0])
+        return self._decide(profile, "budget_at_risk", prompt_tokens, estimate)
+
+    def _decide(
+        self,
+        profile: ModelProfile,
+        reason: str,
+        prompt_tokens: int,
+        estimate: Optional[float] = None
+    ) -> RoutingDecision:
+        if estimate is None:
+            estimate = self.estimate_seconds(profile, prompt_tokens)
+        with self._lock:
+            self._served[(profile.name, reason)] += 1
+        return RoutingDecision(profile.name, reason, estimate, prompt_tokens, self.in_flight(profile.name))
+
+    @contextmanager
+    def track(self, model: str):
+        """
+        Count a request as in flight on a model while it runs (feeds the queue-depth estimate)
+        """
+        with self._lock:
+            self._in_flight[model] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[model] -= 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            served: Dict[str, Dict[str, int]] = {}
+            for (model, reason), count in self._served.items():
+                served.setdefault(model, {})[reason] = count
+            return {
+                "models": [p.name for p in self.profiles],
+                "in_flight": {p.name: self._in_flight[p.name] for p in self.profiles},
+                "served": served
+            }
+
+
+def profiles_from_config() -> List[ModelProfile]:
+    """
+    Build profiles from ROUTER_MODELS / ROUTER_PRIOR_SECONDS (comma-separated, fastest first)
+    """
+    names = [name.strip() for name in config.ROUTER_MODELS.split(",") if name.strip()]
+    priors = [float(value) for value in config.ROUTER_PRIOR_SECONDS.split(",") if value.strip()]
+    return [
+        ModelProfile(name, priors[i] if i < len(priors) else priors[-1] if priors else 2.0)
+        for i, name in enumerate(names)
+    ]
+
+
+def get_model_router() -> ModelRouter:
+    """
+    Return the process-wide router
+    """
+    return get_client(("model_router",), _build_router)
+
+
+def _build_router() -> ModelRouter:
+    router = ModelRouter(profiles_from_config())
+    register_queue_source("model_router", lambda: {
+        f"model:{p.name}": router.in_flight(p.name) for p in router.profiles
+    })
+    return router
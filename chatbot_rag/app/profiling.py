@@ -0,0 +1,321 @@
+#app/profiling.py
+import os
+import sys
+import hmac
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+# Leaf frames of threads that are parked, not working; their samples are dropped
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# One profile at a time: profilers are process-wide and concurrent sessions would mix samples
+_session_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """
+    Raised when a profile is requested while another one is still running
+    """
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """
+    Whether a request carries the admin token (profiling is off when ADMIN_TOKEN is unset)
+    """
+    if not config.ADMIN_TOKEN or not token:
+        return False
+    # Compare bytes: compare_digest rejects str arguments with non-ASCII characters
+    return hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode())
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> Optional[str]:
+    """
+    Root-to-leaf "a;b;c" stack for a frame, or None if the thread is idle
+    """
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples every thread's Python stack at a fixed interval into collapsed-stack counts
+    (the "folded" format read by flamegraph.pl and speedscope)
+    """
+
+    def __init__(self, interval: float = config.PROFILE_SAMPLE_INTERVAL_SECONDS):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = collapse_stack(frame)
+                if stack is not None:
+                    self.counts[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfileSession:
+    """
+    A single request profiled with the sampling profiler or cProfile
+    """
+
+    def __init__(self, mode: str, label: str, profile_dir: str = config.PROFILE_DIR):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; use one of {PROFILE_MODES}")
+        self.mode = mode
+        self.label = label
+        self.profile_dir = profile_dir
+        self.started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        self.path: Optional[str] = None
+        self._sampler: Optional[StackSampler] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+
+    def start(self) -> None:
+        if self.mode == "sampling":
+            self._sampler = StackSampler()
+            self._sampler.start()
+        else:
+            # The calling thread (the event loop for async endpoints) plus any worker wrapped with run()
+            self._enable_here()
+
+    def _enable_here(self) -> bool:
+        if getattr(self._local, "profile", None) is not None:
+            return False
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        self._local.profile = profile
+        profile.enable()
+        return True
+
+    def _disable_here(self) -> None:
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            profile.disable()
+            self._local.profile = None
+
+    def run(self, fn: Callable[[], Any]) -> Any:
+        """
+        Call fn, under cProfile in this thread too when profiling deterministically
+        """
+        if self.mode != "cprofile" or not self._enable_here():
+            return fn()
+        try:
+            return fn()
+        finally:
+            self._disable_here()
+
+    def stop(self) -> None:
+        if self.elapsed is not None:
+            return
+        self.elapsed = time.perf_counter() - self.started
+        if self._sampler is not None:
+            self._sampler.stop()
+        else:
+            self._disable_here()
+        self._save()
+
+    def _save(self) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.label}-{os.getpid()}"
+        if self._sampler is not None:
+            self.path = os.path.join(self.profile_dir, f"{stem}.folded")
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self._sampler.folded())
+        else:
+            self.path = os.path.join(self.profile_dir, f"{stem}.prof")
+            self._stats().dump_stats(self.path)
+        logger.info(f"Saved {self.mode} profile of {self.label} to {self.path}")
+
+    def _stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        Stop profiling and summarise: hottest leaf frames (sampling) or functions by cumulative time (cProfile)
+        """
+        self.stop()
+        report: Dict[str, Any] = {
+            "mode": self.mode,
+            "seconds": round(self.elapsed, 3),
+            "file": os.path.basename(self.path) if self.path else None
+        }
+        if self._sampler is not None:
+            leaves: Counter = Counter()
+            for stack, count in self._sampler.counts.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            report["samples"] = self._sampler.samples
+            report["top_frames"] = [
+                {"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)
+            ]
+        else:
+            stats = self._stats()
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+            report["top_functions"] = [
+                {
+                    "function": f"{name} ({os.path.basename(filename)}:{line})",
+                    "calls": calls,
+                    "total_seconds": round(total, 6),
+                    "cumulative_seconds": round(cumulative, 6)
+                }
+                for (filename, line, name), (_, calls, total, cumulative, _) in rows
+            ]
+        return report
+
+
+@contextmanager
+def profile_scope(mode: Optional[str], label: str):
+    """
+    Profile the enclosed request when mode is set; yields the session (or None)
+    """
+    if mode is None:
+        yield None
+        return
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusy("Another request is being profiled")
+    session = ProfileSession(mode, label)
+    try:
+        session.start()
+        yield session
+    finally:
+        try:
+            session.stop()
+        finally:
+            _session_lock.release()
+
+
+def profile_path(name: str, profile_dir: str = config.PROFILE_DIR) -> Optional[str]:
+    """
+    Path of a stored profile by file name, refusing anything outside the profile directory
+    """
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(profile_dir, name)
+    return path if os.path.isfile(path) else None
+
+
+# --- ALLOCATION SNAPSHOTS ---
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def start_tracemalloc(frames: int = 25) -> Dict[str, Any]:
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _previous_snapshot = None
+    return tracemalloc_status()
+
+
+def stop_tracemalloc() -> Dict[str, Any]:
+    global _previous_snapshot
+    tracemalloc.stop()
+    _previous_snapshot = None
+    return tracemalloc_status()
+
+
+def tracemalloc_status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_bytes": current,
+        "peak_bytes": peak
+    }
+
+
+def _stat_row(stat) -> Dict[str, Any]:
+    row = {
+        "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        "size_bytes": stat.size,
+        "count": stat.count
+    }
+    if hasattr(stat, "size_diff"):
+        row["size_diff_bytes"] = stat.size_diff
+        row["count_diff"] = stat.count_diff
+    return row
+
+
+def take_tracemalloc_snapshot(
+    limit: int = 20,
+    group_by: str = "lineno",
+    profile_dir: str = config.PROFILE_DIR
+) -> Dict[str, Any]:
+    """
+    Top allocation sites now, and the growth since the previous snapshot.
+    The raw snapshot is stored too, for offline analysis with tracemalloc.Snapshot.load.
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running; start it first")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise ValueError("group_by must be lineno, filename or traceback")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.tracemalloc")
+    snapshot.dump(path)
+
+    report = tracemalloc_status()
+    report["file"] = os.path.basename(path)
+    report["top"] = [_stat_row(stat) for stat in snapshot.statistics(group_by)[:limit]]
+    report["growth"] = None
+    if _previous_snapshot is not None:
+        report["growth"] = [
+            _stat_row(stat) for stat in snapshot.compare_to(_previous_snapshot, group_by)[:limit]
+        ]
+    _previous_snapshot = snapshot
+    return report
@@ -0,0 +1,194 @@
+#app/providers.py
+import re
+import time
+import zlib
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import Field
+
+import config
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("google", "local")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def check_provider(kind: str, name: str) -> str:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown {kind} provider {name!r}; use one of {PROVIDERS}")
+    return name
+
+
+def google_api_key_required() -> bool:
+    """
+    Only the Google provider needs GOOGLE_API_KEY
+    """
+    return "google" in (config.EMBEDDINGS_PROVIDER, config.LLM_PROVIDER)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic offline embedder: signed feature hashing of word unigrams and bigrams,
+    L2-normalised. Texts that share words land close together, so retrieval still behaves
+    like retrieval, without any network call.
+    """
+
+    def __init__(self, dimension: int = config.LOCAL_EMBEDDING_DIM):
+        if dimension <= 0:
+            raise ValueError("dimension must be positive")
+        self.dimension = dimension
+
+    def _features(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in self._features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class LatencyDistribution:
+    """
+    Log-normal delays around a median, so a fake model has a realistic long tail
+    """
+
+    def __init__(self, median_seconds: float, sigma: float = config.LOCAL_LLM_LATENCY_SIGMA, seed: Optional[int] = None):
+        self.median_seconds = median_seconds
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.median_seconds <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median_seconds
+        with self._lock:
+            return self.median_seconds * self._random.lognormvariate(0.0, self.sigma)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Offline chat model that streams a deterministic answer token by token.
+
+    The answer is drawn from the words of the prompt (so it reflects the retrieved context), and
+    the time to first token and the gap between tokens follow configurable log-normal distributions.
+    """
+
+    model_name: str = "local-fake"
+    response_tokens: int = config.LOCAL_LLM_RESPONSE_TOKENS
+    first_token: Any = Field(default_factory=lambda: LatencyDistribution(config.LOCAL_LLM_FIRST_TOKEN_MS / 1000))
+    inter_token: Any = Field(default_factory=lambda: LatencyDistribution(config.LOCAL_LLM_TOKEN_MS / 1000))
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat-model"
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        words = TOKEN_PATTERN.findall(" ".join(str(message.content) for message in messages))
+        return [f"{word} " for word in words[:self.response_tokens]] or ["(empty prompt)"]
+
+    def _paced(self, messages: List[BaseMessage], timeout: Optional[float]) -> Iterator[Tuple[Optional[str], float]]:
+        """
+        (token, delay before it) pairs. Like a real client it gives up at timeout seconds:
+        the last pair is then (None, time left), after which the caller raises TimeoutError.
+        """
+        elapsed = 0.0
+        for i, token in enumerate(self._answer_tokens(messages)):
+            delay = (self.first_token if i == 0 else self.inter_token).sample()
+            if timeout is not None and elapsed + delay > timeout:
+                yield None, max(timeout - elapsed, 0.0)
+                return
+            elapsed += delay
+            yield token, delay
+
+    def _timed_out(self, timeout: float) -> TimeoutError:
+        return TimeoutError(f"{self.model_name} request timed out after {timeout:.3f}s")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        for token, delay in self._paced(messages, kwargs.get("timeout")):
+            time.sleep(delay)
+            if token is None:
+                raise self._timed_out(kwargs["timeout"])
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for token, delay in self._paced(messages, kwargs.get("timeout")):
+            await asyncio.sleep(delay)
+            if token is None:
+                raise self._timed_out(kwargs["timeout"])
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        content = "".join(chunk.text for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content.strip()))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        chunks = [chunk.text async for chunk in self._astream(messages, stop, run_manager, **kwargs)]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(chunks).strip()))])
+
+
+def local_chat_model(model_name: str, max_output_tokens: int) -> FakeStreamingChatModel:
+    """
+    Fake model configured from LOCAL_LLM_*; LOCAL_LLM_SEED makes its latencies reproducible
+    """
+    seed = config.LOCAL_LLM_SEED
+    return FakeStreamingChatModel(
+        model_name=model_name,
+        response_tokens=min(config.LOCAL_LLM_RESPONSE_TOKENS, max_output_tokens),
+        first_token=LatencyDistribution(config.LOCAL_LLM_FIRST_TOKEN_MS / 1000, seed=seed),
+        inter_token=LatencyDistribution(config.LOCAL_LLM_TOKEN_MS / 1000, seed=None if seed is None else seed + 1)
+    )
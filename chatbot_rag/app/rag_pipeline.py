@@ -1,15 +1,30 @@
 #app/rag_pipeline.py
 import os
+import re
+import hashlib
 import logging
 from dotenv import load_dotenv
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain.chains import RetrievalQA, ConversationalRetrievalChain
+from langchain.chains import RetrievalQA
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain.schema import Document
-from langchain.memory import ConversationBufferMemory
+from langchain.schema import Document, BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+
+import config
+from app.context_packing import estimate_tokens, pack_context, packing_stats
+from app.mmr import get_mmr_retriever
+from app.index_manifest import IndexManifest, get_index_reader
+from app.clients import get_client
+from app.resilience import HedgedChatModel, get_latency_tracker, get_circuit_breaker
+from app.deadline import check_deadline, record_partial, stage_allowed
+from app.metrics import stage_timer
+from app.tracing import set_attributes, span, traced
+from app.providers import HashingEmbeddings, check_provider, google_api_key_required, local_chat_model
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -17,14 +32,16 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Check for required environment variables
+# Check for required environment variables (the local providers run without one)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
+if not GOOGLE_API_KEY and google_api_key_required():
     raise ValueError("GOOGLE_API_KEY environment variable is required")
 
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+if GOOGLE_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
 # --- TEXT SPLITTING ---
+@traced()
 def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
     """
     Split text into chunks for better processing
@@ -39,7 +56,9 @@ def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> L
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
-        chunks = splitter.split_text(text)
+        with stage_timer("splitting"):
+            chunks = splitter.split_text(text)
+        set_attributes(chunks=len(chunks), characters=len(text))
         logger.info(f"Text split into {len(chunks)} chunks")
         return chunks
     except Exception as e:
@@ -47,63 +66,253 @@ def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> L
         raise
 
 # --- VECTOR STORE CREATION ---
-def get_vectorstore(text: str, persist_dir: str = "vectorstore") -> Chroma:
+def get_vectorstore(
+    text: str,
+    persist_dir: str = "vectorstore",
+    source: Optional[str] = None
+) -> Chroma:
     """
-    Create and return a vector store from text
+    Create and return a vector store from text.
+    When a source filename is given, chunks go into that document's own collection,
+    replacing whatever an earlier upload of the document left there.
     """
     try:
         # Split text into chunks
         chunks = split_text(text)
         
-        # Create embeddings
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            task_type="retrieval_document"
-        )
+        # Shared embeddings client
+        embeddings = get_embeddings()
         
-        # Create vector store
-        vectordb = Chroma.from_texts(
-            texts=chunks,
-            embedding=embeddings,
-            persist_directory=persist_dir
-        )
+        # Chroma embeds and inserts in one call here, so both are timed as index_build
+        with stage_timer("index_build"), span("embed_and_index", chunks=len(chunks)):
+            if source:
+                collection_name = collection_name_for(source)
+                vectordb = Chroma(
+                    collection_name=collection_name,
+                    embedding_function=embeddings,
+                    persist_directory=persist_dir,
+                    collection_metadata={"source": source}
+                )
+                # A shorter re-upload would otherwise leave the old tail chunks behind
+                clear_collection(vectordb)
+                vectordb.add_texts(
+                    texts=chunks,
+                    metadatas=[{"source": source, "chunk": i} for i in range(len(chunks))],
+                    ids=chunk_ids(collection_name, len(chunks))
+                )
+            else:
+                vectordb = Chroma.from_texts(
+                    texts=chunks,
+                    embedding=embeddings,
+                    persist_directory=persist_dir
+                )
         
         # Note: Chroma 0.4.x automatically persists, no need for manual persist()
         logger.info(f"Vector store created and persisted to {persist_dir}")
         
+        # Bump the index generation so other workers reopen their handles
+        if source:
+            IndexManifest(persist_dir).record_document(source, collection_name, len(chunks))
+        
         return vectordb
         
     except Exception as e:
         logger.error(f"Error creating vector store: {e}")
         raise
 
+# --- BATCHED INDEXING ---
+def collection_name_for(filename: str) -> str:
+    """
+    Return a Chroma-safe collection name for a document
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    stem = re.sub(r"[^a-zA-Z0-9_-]+", "-", stem).strip("-_")[:40] or "doc"
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:8]
+    return f"doc-{stem}-{digest}"
+
+def chunk_ids(collection_name: str, count: int) -> List[str]:
+    """
+    Ids of a document's chunks, shared by uploads and bulk ingestion
+    """
+    return [f"{collection_name}-{i}" for i in range(count)]
+
+def clear_collection(vectordb: Chroma) -> int:
+    """
+    Delete every row of a collection before a document is re-indexed into it
+    """
+    ids = vectordb._collection.get(include=[])["ids"]
+    if ids:
+        vectordb._collection.delete(ids=ids)
+    return len(ids)
+
+def get_embeddings(task_type: str = "retrieval_document") -> Embeddings:
+    """
+    Return the shared embeddings client used for indexing and querying
+    """
+    if check_provider("embeddings", config.EMBEDDINGS_PROVIDER) == "local":
+        return get_client(("embeddings", "local", config.LOCAL_EMBEDDING_DIM), lambda: HashingEmbeddings(
+            dimension=config.LOCAL_EMBEDDING_DIM
+        ))
+    return get_client(("embeddings", task_type), lambda: GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        task_type=task_type
+    ))
+
+def embed_chunks_batched(
+    chunks: List[str],
+    embeddings=None,
+    batch_size: int = 100
+) -> List[List[float]]:
+    """
+    Embed chunks in fixed-size batches (one provider call per batch)
+    """
+    embeddings = embeddings or get_embeddings()
+    vectors: List[List[float]] = []
+    for start in range(0, len(chunks), batch_size):
+        with stage_timer("embedding_batch"), span("embedding_batch", size=len(chunks[start:start + batch_size])):
+            vectors.extend(embeddings.embed_documents(chunks[start:start + batch_size]))
+    return vectors
+
+def index_embedded_chunks(
+    vectordb: Chroma,
+    chunks: List[str],
+    vectors: List[List[float]],
+    ids: List[str],
+    metadatas: Optional[List[dict]] = None
+) -> None:
+    """
+    Upsert pre-computed embeddings into a vector store collection
+    """
+    if not (len(chunks) == len(vectors) == len(ids)):
+        raise ValueError("chunks, vectors and ids must have the same length")
+    
+    with stage_timer("index_insert"), span("index_insert", chunks=len(chunks)):
+        vectordb._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=chunks,
+            metadatas=metadatas
+        )
+
+# --- CONTEXT PACKING ---
+class PackedRetriever(BaseRetriever):
+    """
+    Wraps a retriever and packs its chunks into a token budget before they reach the prompt
+    """
+    
+    base_retriever: Any
+    token_budget: int = 1500
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        check_deadline("retrieval")
+        with stage_timer("retrieval"), span("retrieval") as retrieval_span:
+            documents = self.base_retriever.invoke(query)
+            retrieval_span.set_attribute("documents", len(documents))
+        record_partial("sources", [doc.page_content[:200] + "..." for doc in documents])
+        
+        if not stage_allowed("context_packing"):
+            # Short on time: keep whole chunks, in rank order, up to the budget
+            kept, used = [], 0
+            for doc in documents:
+                tokens = estimate_tokens(doc.page_content)
+                if kept and used + tokens > self.token_budget:
+                    break
+                kept.append(doc)
+                used += tokens
+            return kept
+        
+        with stage_timer("context_packing"), span("context_packing"):
+            packed, stats = pack_context(
+                query, [doc.page_content for doc in documents], token_budget=self.token_budget
+            )
+        packing_stats.record(stats)
+        logger.info(
+            f"Context packed: {stats['original_tokens']} -> {stats['packed_tokens']} tokens, "
+            f"{stats['chunks_in']} -> {stats['chunks_out']} chunks in {stats['packing_ms']:.2f} ms"
+        )
+        
+        result = []
+        for doc, text in zip(documents, packed):
+            if not text:
+                continue
+            metadata = dict(doc.metadata)
+            metadata["original_tokens"] = stats["original_tokens"]
+            metadata["packed_tokens"] = stats["packed_tokens"]
+            result.append(Document(page_content=text, metadata=metadata))
+        return result
+
 # --- QA CHAIN SETUP ---
+def get_llm(
+    model_name: str = "gemini-1.5-flash-8b",
+    temperature: float = 0.0,
+    max_output_tokens: int = 2048
+) -> BaseChatModel:
+    """
+    Return the shared chat model used for answering, question rewriting and summaries
+    """
+    if check_provider("LLM", config.LLM_PROVIDER) == "local":
+        return get_client(("llm", "local", model_name, max_output_tokens), lambda: local_chat_model(
+            model_name, max_output_tokens
+        ))
+    return get_client(("llm", model_name, temperature, max_output_tokens), lambda: ChatGoogleGenerativeAI(
+        model=model_name,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        safety_settings={
+            1: 2,  # HARM_CATEGORY_HARASSMENT: BLOCK_MEDIUM_AND_ABOVE
+            2: 2   # HARM_CATEGORY_HATE_SPEECH: BLOCK_MEDIUM_AND_ABOVE
+        }
+    ))
+
+def get_resilient_llm(
+    model_name: str = "gemini-1.5-flash-8b",
+    temperature: float = 0.0,
+    max_output_tokens: int = 2048
+) -> HedgedChatModel:
+    """
+    Return the chat model wrapped with hedging and a per-model circuit breaker
+    """
+    return get_client(("resilient_llm", model_name, temperature, max_output_tokens), lambda: HedgedChatModel(
+        model=get_llm(model_name, temperature, max_output_tokens),
+        tracker=get_latency_tracker(model_name),
+        breaker=get_circuit_breaker(model_name),
+        hedging=config.LLM_HEDGING_ENABLED,
+        model_name=model_name
+    ))
+
 def get_qa_chain(
-    vectordb: Chroma, 
+    vectordb: Optional[Chroma], 
     model_name: str = "gemini-1.5-flash-8b", 
     temperature: float = 0.0,
-    k: int = 4
+    k: int = 4,
+    retriever: Optional[BaseRetriever] = None,
+    token_budget: Optional[int] = None
 ) -> RetrievalQA:
     """
-    Create and return a QA chain for question answering
+    Create and return a QA chain for question answering.
+    Pass a retriever to answer over something other than a single vector store.
+    Retrieved chunks are packed into token_budget tokens unless packing is disabled.
     """
     try:
         # Configure retriever
-        retriever = vectordb.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": k}
-        )
+        if retriever is None and config.RETRIEVAL_MODE == "mmr":
+            retriever = get_mmr_retriever(vectordb, max_k=k)
+        elif retriever is None:
+            retriever = vectordb.as_retriever(
+                search_type="similarity",
+                search_kwargs={"k": k}
+            )
         
-        # Configure LLM
-        llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=temperature,
-            max_output_tokens=2048,
-            safety_settings={
-                1: 2,  # HARM_CATEGORY_HARASSMENT: BLOCK_MEDIUM_AND_ABOVE
-                2: 2   # HARM_CATEGORY_HATE_SPEECH: BLOCK_MEDIUM_AND_ABOVE
-            }
-        )
+        if config.CONTEXT_PACKING_ENABLED:
+            retriever = PackedRetriever(
+                base_retriever=retriever,
+                token_budget=token_budget or config.CONTEXT_TOKEN_BUDGET
+            )
+        
+        # Configure LLM (hedged, behind the provider's circuit breaker)
+        llm = get_resilient_llm(model_name=model_name, temperature=temperature)
 
         # Create QA chain
         chain = RetrievalQA.from_chain_type(
@@ -154,12 +363,12 @@ def run_rag_pipeline(file_path: str, persist_dir: str = "vectorstore") -> Retrie
 # --- UTILITY FUNCTIONS ---
 def clear_vectorstore(persist_dir: str = "vectorstore") -> None:
     """
-    Clear the vector store directory
+    Clear the vector store directory. The manifest stays and its generation is bumped, so other
+    workers see the change instead of a reset generation that a later upload would reuse.
     """
     try:
-        import shutil
         if os.path.exists(persist_dir):
-            shutil.rmtree(persist_dir)
+            IndexManifest(persist_dir).clear()
             logger.info(f"Cleared vector store: {persist_dir}")
     except Exception as e:
         logger.error(f"Error clearing vector store: {e}")
@@ -167,21 +376,24 @@ def clear_vectorstore(persist_dir: str = "vectorstore") -> None:
 
 def get_vectorstore_info(persist_dir: str = "vectorstore") -> dict:
     """
-    Get information about the current vector store
+    Get information about the current vector store: rows across every collection and the
+    documents the manifest knows about
     """
     try:
         if not os.path.exists(persist_dir):
             return {"exists": False, "count": 0}
         
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        vectordb = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
-        
-        collection = vectordb._collection
-        count = collection.count()
+        # Counted once per index generation by this worker's reader, so polling stays cheap
+        reader = get_index_reader(persist_dir)
+        counts = reader.collection_counts()
+        manifest = reader.manifest.read()
         
         return {
             "exists": True,
-            "count": count,
+            "count": sum(counts.values()),
+            "collections": len(counts),
+            "documents": len(manifest["documents"]),
+            "generation": manifest["generation"],
             "directory": persist_dir
         }
     except Exception as e:
@@ -0,0 +1,469 @@
+#app/resilience.py
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, BaseMessageChunk, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.pydantic_v1 import Field
+
+import config
+from app.deadline import DeadlineExceeded, check_deadline, stage_timeout
+from app.metrics import executor_depth, observe_llm, register_queue_source
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Attempts run here so a slow first attempt never blocks firing the hedge
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+register_queue_source("llm_hedge", lambda: {"llm_hedge": executor_depth(_hedge_pool)})
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling the provider while its circuit breaker is open
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful attempt latencies; the hedge delay is learned from its percentile
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        percentile: float = config.HEDGE_PERCENTILE,
+        initial_delay: float = config.HEDGE_INITIAL_DELAY_SECONDS,
+        min_delay: float = config.HEDGE_MIN_DELAY_SECONDS,
+        max_delay: float = config.HEDGE_MAX_DELAY_SECONDS,
+        min_samples: int = 20
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait before firing the second attempt
+        """
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        if not enough:
+            return self.initial_delay
+        return min(max(self.quantile(self.percentile), self.min_delay), self.max_delay)
+
+
+class CircuitBreaker:
+    """
+    Opens when the error rate over a sliding time window exceeds a threshold, then lets a
+    single trial request through after a cooldown (half-open) to decide whether to close again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = config.BREAKER_ERROR_RATE,
+        min_requests: int = config.BREAKER_MIN_REQUESTS,
+        window_seconds: float = config.BREAKER_WINDOW_SECONDS,
+        cooldown_seconds: float = config.BREAKER_COOLDOWN_SECONDS
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def before_call(self) -> None:
+        """
+        Raise CircuitOpenError if the call should not be attempted
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "open":
+                remaining = self.opened_at + self.cooldown_seconds - now
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.name, self.cooldown_seconds)
+                self._trial_in_flight = True
+
+    def accepting(self) -> bool:
+        """
+        Whether a call would currently be let through (closed, or open with the cooldown over)
+        """
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() >= self.opened_at + self.cooldown_seconds
+            return not (self.state == "half_open" and self._trial_in_flight)
+
+    def record(self, success: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                    logger.info(f"Circuit {self.name} closed")
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (
+                self.state == "closed"
+                and len(self._outcomes) >= self.min_requests
+                and failures / len(self._outcomes) >= self.error_rate
+            ):
+                self._open(now)
+
+    def abandon(self) -> None:
+        """
+        Forget a call that ended without an outcome (e.g. the caller's deadline passed)
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self.state = "open"
+        self.opened_at = now
+        self.times_opened += 1
+        self._outcomes.clear()
+        logger.warning(f"Circuit {self.name} opened for {self.cooldown_seconds}s")
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self.state,
+                "times_opened": self.times_opened,
+                "window_requests": len(self._outcomes),
+                "window_error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0
+            }
+
+
+class ResilienceStats:
+    """
+    Running totals of hedging and circuit-breaker activity, for reporting
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Losing attempts stopped before they ran vs. left running with their result dropped
+        self.cancelled = 0
+        self.abandoned = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "cancelled_attempts": self.cancelled,
+                "abandoned_attempts": self.abandoned,
+                "failures": self.failures,
+                "rejected_by_breaker": self.rejected
+            }
+
+
+resilience_stats = ResilienceStats()
+
+
+def hedged_call(fn: Callable[[], Any], delay: float, stats: ResilienceStats = resilience_stats) -> Any:
+    """
+    Run fn; if it has not returned after delay seconds, run it again and take whichever
+    finishes first. The loser is cancelled if it has not started; one already running cannot be
+    stopped from here, so it is counted as abandoned and its result is dropped.
+    Raises DeadlineExceeded if the request deadline passes first.
+    """
+    # Each attempt gets its own copy of the context so the request deadline follows it
+    first = _hedge_pool.submit(contextvars.copy_context().run, fn)
+    remaining = stage_timeout()
+    done, _ = wait([first], timeout=delay if remaining is None else min(delay, remaining))
+    if done:
+        return first.result()
+    if remaining is not None and stage_timeout() <= 0:
+        first.cancel()
+        raise DeadlineExceeded("llm")
+
+    second = _hedge_pool.submit(contextvars.copy_context().run, fn)
+    stats.add(hedged=1)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, timeout=stage_timeout(), return_when=FIRST_COMPLETED)
+        if not done:
+            for future in pending:
+                future.cancel()
+            raise DeadlineExceeded("llm")
+        for future in done:
+            if future.exception() is None:
+                cancelled = sum(1 for loser in pending if loser.cancel())
+                stats.add(
+                    cancelled=cancelled, abandoned=len(pending) - cancelled, hedge_wins=int(future is second)
+                )
+                return future.result()
+            error = future.exception()
+    raise error  # type: ignore[misc]
+
+
+async def ahedged_call(fn: Callable[[], Any], delay: float, stats: ResilienceStats = resilience_stats) -> Any:
+    """
+    Async counterpart of hedged_call; the losing attempt's task is cancelled outright
+    """
+    first = asyncio.ensure_future(fn())
+    remaining = stage_timeout()
+    done, _ = await asyncio.wait({first}, timeout=delay if remaining is None else min(delay, remaining))
+    if done:
+        return first.result()
+    if remaining is not None and stage_timeout() <= 0:
+        first.cancel()
+        raise DeadlineExceeded("llm")
+
+    second = asyncio.ensure_future(fn())
+    stats.add(hedged=1)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, timeout=stage_timeout(), return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            for task in pending:
+                task.cancel()
+            raise DeadlineExceeded("llm")
+        for task in done:
+            if task.exception() is None:
+                cancelled = sum(1 for loser in pending if loser.cancel())
+                stats.add(
+                    cancelled=cancelled, abandoned=len(pending) - cancelled, hedge_wins=int(task is second)
+                )
+                return task.result()
+            error = task.exception()
+    raise error  # type: ignore[misc]
+
+
+def _joined(message: Optional[BaseMessageChunk]) -> BaseMessage:
+    # Streamed chunks add up to one chunk; callers expect a plain message
+    return AIMessage(content="") if message is None else message_chunk_to_message(message)
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that hedges slow calls and fails fast while the provider is unhealthy.
+    Attempts are streamed so the time to first token is measured, not inferred.
+    """
+
+    model: Any
+    tracker: Any
+    breaker: Any
+    stats: Any = Field(default_factory=lambda: resilience_stats)
+    hedging: bool = True
+    model_name: str = "llm"
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat-model"
+
+    def _timed(self, call: Callable[[], Iterator[BaseMessageChunk]]) -> Tuple[BaseMessage, float]:
+        """
+        Stream one attempt; returns the joined message and when its first chunk arrived
+        """
+        with span("llm_attempt", model=self.model_name):
+            start = time.perf_counter()
+            message, first_token_at = None, None
+            for chunk in call():
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                message = chunk if message is None else message + chunk
+            self.tracker.record(time.perf_counter() - start)
+            return _joined(message), first_token_at or time.perf_counter()
+
+    async def _atimed(self, call: Callable[[], AsyncIterator[BaseMessageChunk]]) -> Tuple[BaseMessage, float]:
+        with span("llm_attempt", model=self.model_name):
+            start = time.perf_counter()
+            message, first_token_at = None, None
+            async for chunk in call():
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                message = chunk if message is None else message + chunk
+            self.tracker.record(time.perf_counter() - start)
+            return _joined(message), first_token_at or time.perf_counter()
+
+    def _call_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Per-attempt call options: the provider request gets the time left before the deadline
+        as its timeout, so an attempt is cut off at the source rather than merely abandoned
+        """
+        check_deadline("llm")
+        remaining = stage_timeout()
+        return kwargs if remaining is None else {**kwargs, "timeout": remaining}
+
+    def _result(self, attempt: Tuple[BaseMessage, float], started: float) -> ChatResult:
+        message, first_token_at = attempt
+        observe_llm(self.model_name, first_token_at - started, time.perf_counter() - started)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _guarded(self, run: Callable[[], Any]) -> Any:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats.add(rejected=1)
+            raise
+        self.stats.add(requests=1)
+        try:
+            message = run()
+        except DeadlineExceeded:
+            # Our own budget ran out; that says nothing about the provider's health
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            if stage_timeout() == 0:
+                # The provider timed out on the deadline we handed it
+                self.breaker.abandon()
+                raise DeadlineExceeded("llm") from e
+            self.breaker.record(False)
+            self.stats.add(failures=1)
+            raise
+        self.breaker.record(True)
+        return message
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        started = time.perf_counter()
+        attempt = lambda: self._timed(lambda: self.model.stream(messages, stop=stop, **self._call_kwargs(kwargs)))
+        with span("llm", model=self.model_name):
+            if not self.hedging:
+                return self._result(self._guarded(attempt), started)
+            return self._result(self._guarded(
+                lambda: hedged_call(attempt, self.tracker.hedge_delay(), self.stats)
+            ), started)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats.add(rejected=1)
+            raise
+        self.stats.add(requests=1)
+        started = time.perf_counter()
+        attempt = lambda: self._atimed(lambda: self.model.astream(messages, stop=stop, **self._call_kwargs(kwargs)))
+        try:
+            with span("llm", model=self.model_name):
+                if self.hedging:
+                    result = await ahedged_call(attempt, self.tracker.hedge_delay(), self.stats)
+                else:
+                    result = await attempt()
+        except DeadlineExceeded:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            if stage_timeout() == 0:
+                self.breaker.abandon()
+                raise DeadlineExceeded("llm") from e
+            self.breaker.record(False)
+            self.stats.add(failures=1)
+            raise
+        self.breaker.record(True)
+        return self._result(result, started)
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    with _registry_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def resilience_summary() -> Dict[str, Any]:
+    """
+    Hedging counters plus per-model hedge delay and breaker state
+    """
+    with _registry_lock:
+        names = sorted(set(_trackers) | set(_breakers))
+    models = {}
+    for name in names:
+        tracker = get_latency_tracker(name)
+        p95 = tracker.quantile(95)
+        models[name] = {
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "hedge_delay_seconds": round(tracker.hedge_delay(), 3),
+            "breaker": get_circuit_breaker(name).summary()
+        }
+    return {**resilience_stats.summary(), "models": models}
@@ -0,0 +1,174 @@
+#app/retrieval.py
+import heapq
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document, BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+import config
+from app.rag_pipeline import Chroma, get_embeddings
+from app.index_manifest import get_index_reader
+from app.deadline import DeadlineExceeded, check_deadline, record_partial, stage_timeout
+from app.metrics import executor_depth, register_queue_source, stage_timer
+from app.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for per-collection searches; Chroma queries release the GIL in hnswlib
+_search_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="collection-search")
+register_queue_source("collection_search", lambda: {"collection_search": executor_depth(_search_pool)})
+
+
+def list_document_collections(persist_dir: str = "vectorstore") -> Dict[str, str]:
+    """
+    Return {source filename: collection name} for every indexed document (including a legacy
+    default collection if one was registered), read from the index manifest
+    """
+    documents = get_index_reader(persist_dir).manifest.read()["documents"]
+    return {filename: entry["collection"] for filename, entry in documents.items()}
+
+
+def _get_store(persist_dir: str, collection_name: str) -> Chroma:
+    """
+    Return this worker's handle to a collection, reopened when the index generation changes
+    """
+    store, _ = get_index_reader(persist_dir).get_store(
+        collection_name, lambda: get_embeddings(task_type="retrieval_query")
+    )
+    return store
+
+
+def reset_store_cache(persist_dir: str = "vectorstore") -> None:
+    """
+    Drop cached collection handles (e.g. after the vector store directory is cleared)
+    """
+    get_index_reader(persist_dir).reset()
+
+
+class OwnerLookupError(RuntimeError):
+    """
+    The owners of the indexed documents could not be looked up, so a user_id filter cannot apply
+    """
+
+
+def resolve_collections(
+    persist_dir: str = "vectorstore",
+    filenames: Optional[List[str]] = None,
+    user_id: Optional[str] = None
+) -> List[str]:
+    """
+    Pick the collections to search, narrowed by filename and/or PDF_Metadata owner.
+    Owners come from the PDF_Metadata user_id index; if it cannot be read this raises
+    OwnerLookupError rather than treating the user as having no documents.
+    """
+    documents = list_document_collections(persist_dir)
+    allowed = set(documents)
+
+    if filenames:
+        allowed &= set(filenames)
+
+    if user_id:
+        if not config.AWS_AVAILABLE:
+            raise OwnerLookupError("Filtering by user_id needs the PDF_Metadata table, but AWS is not configured")
+        from aws_service.dynamo_handler import list_user_pdfs
+        try:
+            owned = list_user_pdfs(user_id, raise_errors=True)
+        except Exception as e:
+            raise OwnerLookupError(f"Could not look up documents owned by {user_id}: {e}") from e
+        allowed &= {item["filename"] for item in owned}
+
+    return [documents[name] for name in sorted(allowed)]
+
+
+@traced()
+def search_collections(
+    question: str,
+    collection_names: List[str],
+    persist_dir: str = "vectorstore",
+    k: int = 4,
+    where: Optional[dict] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Search several collections concurrently and return the global top-k as (document, distance).
+    The query is embedded once and every collection is searched with the same vector.
+    """
+    if not collection_names:
+        return []
+
+    check_deadline("retrieval")
+    with stage_timer("query_embedding"):
+        query_vector = get_embeddings(task_type="retrieval_query").embed_query(question)
+
+    def search_one(collection_name: str) -> List[Tuple[Document, float]]:
+        # Searches still queued when the deadline passes return at once instead of holding the pool
+        check_deadline("retrieval")
+        try:
+            store = _get_store(persist_dir, collection_name)
+            return store.similarity_search_by_vector_with_relevance_scores(
+                query_vector, k=k, filter=where
+            )
+        except Exception as e:
+            logger.warning(f"Search failed for collection {collection_name}: {e}")
+            return []
+
+    with stage_timer("collection_search"):
+        # Each search gets its own copy of the context so it sees the request deadline
+        futures = [
+            _search_pool.submit(contextvars.copy_context().run, search_one, name) for name in collection_names
+        ]
+        _, pending = wait(futures, timeout=stage_timeout())
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise DeadlineExceeded("retrieval")
+    per_collection = [future.result() for future in futures]
+
+    # Each list is already sorted by distance; a k-way heap merge stops after k items
+    merged = heapq.merge(*per_collection, key=lambda pair: pair[1])
+    results = list(islice(merged, k))
+    record_partial("sources", [
+        {"pdf_name": doc.metadata.get("source"), "content": doc.page_content[:200] + "..."}
+        for doc, _ in results
+    ])
+    logger.info(f"Searched {len(collection_names)} collections, returning {len(results)} chunks")
+    return results
+
+
+class MultiCollectionRetriever(BaseRetriever):
+    """
+    Retriever that fans a question out over several per-document collections
+    """
+
+    collection_names: List[str]
+    persist_dir: str = "vectorstore"
+    k: int = 4
+    where: Optional[dict] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        results = search_collections(
+            query, self.collection_names, persist_dir=self.persist_dir, k=self.k, where=self.where
+        )
+        documents = []
+        for document, distance in results:
+            document.metadata["distance"] = distance
+            documents.append(document)
+        return documents
+
+
+def get_cross_document_retriever(
+    persist_dir: str = "vectorstore",
+    filenames: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    k: int = 4
+) -> MultiCollectionRetriever:
+    """
+    Build a retriever over every document matching the filters
+    """
+    collection_names = resolve_collections(persist_dir, filenames=filenames, user_id=user_id)
+    return MultiCollectionRetriever(collection_names=collection_names, persist_dir=persist_dir, k=k)
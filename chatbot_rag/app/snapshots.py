@@ -0,0 +1,494 @@
+#app/snapshots.py
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from app.index_manifest import IndexManifest, MANIFEST_FILE
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "rag-index-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = "snapshot.json"
+LATEST_FILE = "latest.json"
+
+# Snapshot layout under SNAPSHOT_PREFIX:
+#   latest.json                                   -> {"snapshot_id", "generation", "created_at"}
+#   <snapshot_id>/snapshot.json                   -> documents, collections and their parts
+#   <snapshot_id>/<collection>/part-NNNNN.npy.gz  -> float32 vectors (numpy .npy, gzipped)
+#   <snapshot_id>/<collection>/part-NNNNN.jsonl.gz -> chunk table: one {"id", "document", "metadata"} per row
+# Parts are uploaded first and snapshot.json, then latest.json, last, so a reader never sees
+# a partial snapshot.
+
+
+class SnapshotConflict(RuntimeError):
+    """The index changed while it was being exported or replaced by an import"""
+
+
+class _IndexChanged(Exception):
+    pass
+
+
+def snapshot_key(prefix: str, snapshot_id: str, name: str) -> str:
+    return f"{prefix.rstrip('/')}/{snapshot_id}/{name}"
+
+
+def _open_client(path: str):
+    import chromadb
+    return chromadb.PersistentClient(path=path)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode_vectors(vectors: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(vectors, dtype=np.float32), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_vectors(raw: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(raw), allow_pickle=False)
+
+
+def encode_chunks(ids: List[str], documents: List[str], metadatas: List[Optional[dict]]) -> bytes:
+    return "".join(
+        json.dumps({"id": id_, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n"
+        for id_, document, metadata in zip(ids, documents, metadatas)
+    ).encode("utf-8")
+
+
+def decode_chunks(raw: bytes) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in raw.decode("utf-8").splitlines() if line]
+
+
+class _BoundedPool:
+    """
+    Thread pool that blocks submit() while `limit` jobs are in flight, so encoded parts
+    waiting for their upload never pile up in memory
+    """
+
+    def __init__(self, workers: int, limit: Optional[int] = None):
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(limit or workers * 2)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        self._slots.acquire()
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def __enter__(self) -> "_BoundedPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=exc[0] is not None)
+
+
+# --- EXPORT ---
+def _upload_part(bucket_name: str, key: str, raw: bytes, level: int) -> Dict[str, Any]:
+    from aws_service.s3_handler import put_object_bytes
+
+    data = gzip.compress(raw, compresslevel=level)
+    put_object_bytes(bucket_name, key, data)
+    return {"key": key, "bytes": len(data), "raw_bytes": len(raw), "sha256": _sha256(data)}
+
+
+def _export_generation(
+    persist_dir: str,
+    documents: Dict[str, Dict[str, Any]],
+    bucket_name: str,
+    prefix: str,
+    snapshot_id: str,
+    part_rows: int,
+    workers: int,
+    level: int,
+    submitted: List[str]
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Upload every collection of one manifest generation as compressed parts (compression and
+    uploads run on the pool while the next page is read); keys are appended to submitted.
+    Raises _IndexChanged when a collection does not hold the chunk count the manifest records.
+    """
+    client = _open_client(persist_dir)
+    collections = []
+    dimension = None
+
+    def upload(pool: _BoundedPool, key: str, raw: bytes) -> Future:
+        submitted.append(key)
+        return pool.submit(_upload_part, bucket_name, key, raw, level)
+
+    with _BoundedPool(workers) as pool:
+        for filename, document in sorted(documents.items()):
+            collection = client.get_collection(document["collection"])
+            total = collection.count()
+            if total != document.get("chunks", total):
+                raise _IndexChanged(f"{document['collection']} holds {total} chunks, manifest says {document['chunks']}")
+
+            parts = []
+            for number, offset in enumerate(range(0, total, part_rows)):
+                page = collection.get(limit=part_rows, offset=offset, include=["embeddings", "documents", "metadatas"])
+                vectors = np.asarray(page["embeddings"], dtype=np.float32)
+                dimension = vectors.shape[1] if vectors.size else dimension
+                base = snapshot_key(prefix, snapshot_id, f"{document['collection']}/part-{number:05d}")
+                parts.append({
+                    "rows": len(page["ids"]),
+                    "vectors": upload(pool, f"{base}.npy.gz", encode_vectors(vectors)),
+                    "chunks": upload(pool, f"{base}.jsonl.gz", encode_chunks(page["ids"], page["documents"], page["metadatas"]))
+                })
+            collections.append({
+                "filename": filename,
+                "collection": document["collection"],
+                "metadata": collection.metadata,
+                "rows": total,
+                "parts": parts
+            })
+
+        for entry in collections:
+            for part in entry["parts"]:
+                part["vectors"] = part["vectors"].result()
+                part["chunks"] = part["chunks"].result()
+    return collections, dimension
+
+
+def _delete_keys(bucket_name: str, keys: Iterable[str]) -> None:
+    from aws_service.s3_handler import delete_pdf_from_s3
+
+    for key in keys:
+        delete_pdf_from_s3(key, bucket_name)
+
+
+def export_snapshot(
+    persist_dir: str = config.VECTORSTORE_DIR,
+    bucket_name: Optional[str] = None,
+    prefix: Optional[str] = None,
+    part_rows: Optional[int] = None,
+    workers: Optional[int] = None,
+    attempts: int = 3
+) -> Dict[str, Any]:
+    """
+    Upload the current index generation (vectors, chunk table and manifest) to S3 and point
+    latest.json at it. The export is consistent: it is retried when the generation moves on, or
+    a collection does not match the manifest, while it runs. Raises SnapshotConflict after `attempts`.
+    """
+    from aws_service.s3_handler import ensure_bucket, put_object_bytes
+
+    bucket_name = bucket_name or config.S3_BUCKET_NAME
+    prefix = prefix or config.SNAPSHOT_PREFIX
+    part_rows = part_rows or config.SNAPSHOT_PART_ROWS
+    workers = workers or config.SNAPSHOT_WORKERS
+    ensure_bucket(bucket_name)
+
+    manifest = IndexManifest(persist_dir)
+    for attempt in range(1, attempts + 1):
+        index = manifest.read()
+        generation = index["generation"]
+        if not index["documents"]:
+            raise ValueError("The index has no documents to snapshot")
+
+        started = time.perf_counter()
+        snapshot_id = f"g{generation:08d}-{uuid.uuid4().hex[:8]}"
+        submitted: List[str] = []
+        try:
+            collections, dimension = _export_generation(
+                persist_dir, index["documents"], bucket_name, prefix, snapshot_id,
+                part_rows, workers, config.SNAPSHOT_COMPRESSION_LEVEL, submitted
+            )
+            if manifest.generation() != generation:
+                raise _IndexChanged(f"generation moved from {generation} to {manifest.generation()}")
+        except _IndexChanged as e:
+            logger.warning(f"Index changed during snapshot export (attempt {attempt}): {e}")
+            _delete_keys(bucket_name, submitted)
+            continue
+
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "snapshot_id": snapshot_id,
+            "generation": generation,
+            "created_at": time.time(),
+            "embeddings": {"provider": config.EMBEDDINGS_PROVIDER, "dimension": dimension},
+            "documents": index["documents"],
+            "collections": collections,
+            "rows": sum(entry["rows"] for entry in collections),
+            "bytes": sum(part[kind]["bytes"] for entry in collections for part in entry["parts"] for kind in ("vectors", "chunks"))
+        }
+        put_object_bytes(
+            bucket_name, snapshot_key(prefix, snapshot_id, SNAPSHOT_FILE),
+            json.dumps(snapshot, indent=2).encode("utf-8"), "application/json"
+        )
+        put_object_bytes(
+            bucket_name, f"{prefix.rstrip('/')}/{LATEST_FILE}",
+            json.dumps({"snapshot_id": snapshot_id, "generation": generation, "created_at": snapshot["created_at"]}).encode("utf-8"),
+            "application/json"
+        )
+        seconds = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Exported index generation {generation} as snapshot {snapshot_id}: {snapshot['rows']} chunks, "
+            f"{snapshot['bytes']} bytes in {seconds}s"
+        )
+        return {**snapshot, "seconds": seconds}
+
+    raise SnapshotConflict(f"The index changed during each of {attempts} export attempts")
+
+
+# --- IMPORT ---
+def read_snapshot(bucket_name: str, prefix: str, snapshot_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return a snapshot's manifest (the latest one unless an id is given)
+    """
+    from aws_service.s3_handler import get_object_bytes
+
+    if snapshot_id is None:
+        snapshot_id = json.loads(get_object_bytes(bucket_name, f"{prefix.rstrip('/')}/{LATEST_FILE}"))["snapshot_id"]
+    snapshot = json.loads(get_object_bytes(bucket_name, snapshot_key(prefix, snapshot_id, SNAPSHOT_FILE)))
+    if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot format in {snapshot_id}")
+    return snapshot
+
+
+def check_compatible(snapshot: Dict[str, Any]) -> None:
+    """
+    Refuse snapshots whose vectors this node's embeddings could not query
+    """
+    embeddings = snapshot["embeddings"]
+    if embeddings["provider"] != config.EMBEDDINGS_PROVIDER:
+        raise ValueError(
+            f"Snapshot {snapshot['snapshot_id']} was embedded with {embeddings['provider']}, "
+            f"this node uses {config.EMBEDDINGS_PROVIDER}"
+        )
+    if embeddings["provider"] == "local" and embeddings["dimension"] not in (None, config.LOCAL_EMBEDDING_DIM):
+        raise ValueError(
+            f"Snapshot {snapshot['snapshot_id']} has {embeddings['dimension']}-dimensional vectors, "
+            f"LOCAL_EMBEDDING_DIM is {config.LOCAL_EMBEDDING_DIM}"
+        )
+
+
+def _download_part(bucket_name: str, part: Dict[str, Any]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    from aws_service.s3_handler import get_object_bytes
+
+    raw = {}
+    for kind in ("vectors", "chunks"):
+        data = get_object_bytes(bucket_name, part[kind]["key"])
+        if _sha256(data) != part[kind]["sha256"]:
+            raise IOError(f"Checksum mismatch for {part[kind]['key']}")
+        raw[kind] = gzip.decompress(data)
+    vectors = decode_vectors(raw["vectors"])
+    chunks = decode_chunks(raw["chunks"])
+    if len(chunks) != part["rows"] or len(vectors) != part["rows"]:
+        raise IOError(f"Part {part['chunks']['key']} has {len(chunks)} rows, expected {part['rows']}")
+    return vectors, chunks
+
+
+def _load_collections(snapshot: Dict[str, Any], target_dir: str, bucket_name: str, workers: int) -> None:
+    """
+    Download parts in parallel and insert each into its collection as soon as it arrives
+    """
+    client = _open_client(target_dir)
+    handles: Dict[str, Any] = {}
+
+    def collection_for(entry: Dict[str, Any]):
+        if entry["collection"] not in handles:
+            handles[entry["collection"]] = client.get_or_create_collection(
+                entry["collection"], metadata=entry["metadata"] or None
+            )
+        return handles[entry["collection"]]
+
+    jobs = [(entry, part) for entry in snapshot["collections"] for part in entry["parts"]]
+    for entry in snapshot["collections"]:
+        collection_for(entry)
+
+    pending: Dict[Future, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        remaining = iter(jobs)
+        while True:
+            # Keep 2x workers downloads in flight; insertion into Chroma stays on this thread
+            for entry, part in remaining:
+                pending[pool.submit(_download_part, bucket_name, part)] = entry
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = pending.pop(future)
+                vectors, chunks = future.result()
+                collection_for(entry).upsert(
+                    ids=[chunk["id"] for chunk in chunks],
+                    embeddings=vectors.tolist(),
+                    documents=[chunk["document"] for chunk in chunks],
+                    metadatas=[chunk["metadata"] for chunk in chunks]
+                )
+
+
+def _index_fingerprint(persist_dir: str) -> List[Tuple[str, int, int]]:
+    """
+    (path, size, mtime) of every file in the index, to notice writes made during an import
+    """
+    files = []
+    for root, _, names in os.walk(persist_dir):
+        for name in names:
+            if name == MANIFEST_FILE + ".lock":
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((os.path.relpath(path, persist_dir), stat.st_size, stat.st_mtime_ns))
+    return sorted(files)
+
+
+@contextmanager
+def _import_lock(persist_dir: str):
+    # Next to the persist directory, which is replaced by the import; serializes workers on one node
+    lock_path = f"{os.path.abspath(persist_dir)}.snapshot.lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def import_snapshot(
+    persist_dir: str = config.VECTORSTORE_DIR,
+    bucket_name: Optional[str] = None,
+    prefix: Optional[str] = None,
+    snapshot_id: Optional[str] = None,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Replace the local index with a snapshot from S3 (the latest unless an id is given).
+    The snapshot is built in a staging directory and swapped in whole, so a failed import
+    leaves the existing index untouched. Skipped when the local index already has documents
+    unless force is set. The swap happens under the manifest lock and is abandoned with
+    SnapshotConflict if anything was written to the local index during the download.
+    """
+    from chromadb.api.client import SharedSystemClient
+
+    bucket_name = bucket_name or config.S3_BUCKET_NAME
+    prefix = prefix or config.SNAPSHOT_PREFIX
+    workers = workers or config.SNAPSHOT_WORKERS
+
+    with _import_lock(persist_dir):
+        manifest = IndexManifest(persist_dir)
+        local = manifest.read()
+        if local["documents"] and not force:
+            return {"status": "skipped", "reason": "local index is not empty", "generation": local["generation"]}
+        before = _index_fingerprint(persist_dir)
+
+        started = time.perf_counter()
+        snapshot = read_snapshot(bucket_name, prefix, snapshot_id)
+        check_compatible(snapshot)
+
+        staging = f"{os.path.abspath(persist_dir)}.import-{uuid.uuid4().hex[:8]}"
+        try:
+            _load_collections(snapshot, staging, bucket_name, workers)
+            SharedSystemClient.clear_system_cache()
+
+            replaced = None
+            # Uploads record their document under this lock, so none can land between check and swap
+            with manifest._locked():
+                manifest._cached = None
+                local = manifest.read()
+                if _index_fingerprint(persist_dir) != before:
+                    raise SnapshotConflict(
+                        f"{persist_dir} was written to during the import (now {len(local['documents'])} "
+                        "documents); keeping the local index"
+                    )
+                # Always move the generation forward so open readers notice the new data
+                generation = max(local["generation"], snapshot["generation"]) + 1
+                with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                    json.dump({
+                        "generation": generation,
+                        "documents": snapshot["documents"],
+                        "updated_at": time.time(),
+                        "snapshot_id": snapshot["snapshot_id"]
+                    }, f, indent=2)
+                if os.path.exists(persist_dir):
+                    replaced = f"{os.path.abspath(persist_dir)}.replaced-{uuid.uuid4().hex[:8]}"
+                    os.rename(persist_dir, replaced)
+                os.rename(staging, persist_dir)
+            if replaced:
+                shutil.rmtree(replaced, ignore_errors=True)
+        except BaseException:
+            SharedSystemClient.clear_system_cache()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Imported snapshot {snapshot['snapshot_id']} ({len(snapshot['documents'])} documents, "
+        f"{snapshot['rows']} chunks) in {seconds}s"
+    )
+    return {
+        "status": "imported",
+        "snapshot_id": snapshot["snapshot_id"],
+        "generation": generation,
+        "documents": len(snapshot["documents"]),
+        "rows": snapshot["rows"],
+        "bytes": snapshot["bytes"],
+        "seconds": seconds
+    }
+
+
+def bootstrap_from_snapshot(persist_dir: str = config.VECTORSTORE_DIR) -> Dict[str, Any]:
+    """
+    Startup hook: import the latest snapshot into an empty index; no snapshot yet is not an error
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        return import_snapshot(persist_dir)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return {"status": "none"}
+        raise
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export or import vector index snapshots in S3")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--persist-dir", default=config.VECTORSTORE_DIR)
+    parser.add_argument("--bucket", default=None, help="Default: S3_BUCKET_NAME")
+    parser.add_argument("--prefix", default=None, help="Default: SNAPSHOT_PREFIX")
+    parser.add_argument("--snapshot-id", default=None, help="Import this snapshot instead of the latest")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel uploads/downloads (default: SNAPSHOT_WORKERS)")
+    parser.add_argument("--force", action="store_true", help="Import even if the local index has documents")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
+
+    if args.action == "export":
+        report = export_snapshot(args.persist_dir, args.bucket, args.prefix, workers=args.workers)
+        report = {key: value for key, value in report.items() if key not in ("collections", "documents")}
+    else:
+        report = import_snapshot(
+            args.persist_dir, args.bucket, args.prefix, args.snapshot_id, workers=args.workers, force=args.force
+        )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
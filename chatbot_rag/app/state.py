@@ -0,0 +1,283 @@
+#app/state.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DOCUMENT_KEY = "document:current"
+
+
+class StateStore(ABC):
+    """
+    Key/value store for state that every worker must agree on (current document, sessions).
+    Values are JSON-serializable dicts; ttl is in seconds.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put_if_absent(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        """
+        Write only if the key is missing or expired; True if this call wrote it
+        """
+
+    @abstractmethod
+    def delete_if_equal(self, key: str, value: Dict[str, Any]) -> bool:
+        """
+        Delete only if the stored value is still `value`; True if this call deleted it
+        """
+
+    # --- Document registry ---
+    def get_current_document(self) -> Optional[Dict[str, Any]]:
+        return self.get(CURRENT_DOCUMENT_KEY)
+
+    def set_current_document(self, filename: str, collection_name: str, persist_dir: str) -> None:
+        self.put(CURRENT_DOCUMENT_KEY, {
+            "filename": filename,
+            "collection": collection_name,
+            "persist_dir": persist_dir,
+            "updated_at": time.time()
+        })
+
+    def clear_current_document(self) -> None:
+        self.delete(CURRENT_DOCUMENT_KEY)
+
+
+class MemoryStateStore(StateStore):
+    """
+    Single-process stand-in, used in tests
+    """
+
+    def __init__(self):
+        self._items: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._items[key]
+                return None
+            return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (json.dumps(value), expires_at)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._items.pop(key, None) is not None
+
+    def put_if_absent(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (item[1] is None or item[1] > now):
+                return False
+            self._items[key] = (json.dumps(value), now + ttl if ttl else None)
+            return True
+
+    def delete_if_equal(self, key: str, value: Dict[str, Any]) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or json.loads(item[0]) != value:
+                return False
+            del self._items[key]
+            return True
+
+
+class SQLiteStateStore(StateStore):
+    """
+    State shared by all workers on one node through a WAL-mode SQLite file
+    """
+
+    def __init__(self, path: str = config.STATE_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value, separators=(",", ":")), expires_at)
+        )
+
+    def delete(self, key: str) -> bool:
+        cursor = self._connection().execute("DELETE FROM state WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def put_if_absent(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        # The upsert only overwrites an expired row; rowcount is 0 when a live row is kept
+        cursor = self._connection().execute(
+            "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE state.expires_at IS NOT NULL AND state.expires_at <= ?",
+            (key, json.dumps(value, separators=(",", ":")), now + ttl if ttl else None, now)
+        )
+        return cursor.rowcount > 0
+
+    def delete_if_equal(self, key: str, value: Dict[str, Any]) -> bool:
+        cursor = self._connection().execute(
+            "DELETE FROM state WHERE key = ? AND value = ?", (key, json.dumps(value, separators=(",", ":")))
+        )
+        return cursor.rowcount > 0
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+
+class DynamoStateStore(StateStore):
+    """
+    State shared across nodes through a DynamoDB table keyed by 'key' with TTL on 'expires_at'
+    """
+
+    def __init__(self, table_name: str = config.STATE_TABLE_NAME):
+        from aws_service.dynamo_handler import get_dynamodb
+
+        dynamodb = get_dynamodb()
+        if dynamodb is None:
+            raise RuntimeError("DynamoDB not available for shared state")
+        self.table = dynamodb.Table(table_name)  # type: ignore
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"key": key}, ConsistentRead=True).get("Item")
+        if item is None:
+            return None
+        # DynamoDB TTL deletes lazily, so expired items can still be read
+        expires_at = item.get("expires_at")
+        if expires_at is not None and float(expires_at) <= time.time():
+            return None
+        return json.loads(item["value"])
+
+    def put(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        item: Dict[str, Any] = {"key": key, "value": json.dumps(value, separators=(",", ":"))}
+        if ttl:
+            item["expires_at"] = int(time.time() + ttl)
+        self.table.put_item(Item=item)
+
+    def delete(self, key: str) -> bool:
+        response = self.table.delete_item(Key={"key": key}, ReturnValues="ALL_OLD")
+        return "Attributes" in response
+
+    def put_if_absent(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        from botocore.exceptions import ClientError
+
+        item: Dict[str, Any] = {"key": key, "value": json.dumps(value, separators=(",", ":"))}
+        if ttl:
+            item["expires_at"] = int(time.time() + ttl)
+        try:
+            self.table.put_item(
+                Item=item,
+                ConditionExpression="attribute_not_exists(#k) OR expires_at <= :now",
+                ExpressionAttributeNames={"#k": "key"},
+                ExpressionAttributeValues={":now": int(time.time())}
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def delete_if_equal(self, key: str, value: Dict[str, Any]) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.delete_item(
+                Key={"key": key},
+                ConditionExpression="#v = :value",
+                ExpressionAttributeNames={"#v": "value"},
+                ExpressionAttributeValues={":value": json.dumps(value, separators=(",", ":"))}
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+
+_state_store: Optional[StateStore] = None
+_state_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """
+    Return the configured shared state store (STATE_BACKEND: sqlite, dynamodb or memory)
+    """
+    global _state_store
+    with _state_lock:
+        if _state_store is None:
+            backend = config.STATE_BACKEND
+            if backend == "dynamodb":
+                _state_store = DynamoStateStore()
+            elif backend == "memory":
+                _state_store = MemoryStateStore()
+            else:
+                _state_store = SQLiteStateStore()
+            logger.info(f"Using {type(_state_store).__name__} for shared state")
+        return _state_store
+
+
+def set_state_store(store: StateStore) -> None:
+    """
+    Replace the shared state store (tests)
+    """
+    global _state_store
+    with _state_lock:
+        _state_store = store
@@ -0,0 +1,281 @@
+#app/storage.py
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+import config
+from app.clients import get_client
+from app.metrics import record_cache, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the temp files ranged downloads write before renaming them into place
+DOWNLOAD_PREFIX = ".download-"
+
+
+class DocumentStorage:
+    """
+    Two storage tiers for uploaded PDFs: the S3 bucket holds every document and the local
+    directory is a size-bounded LRU cache of it.
+
+    Reads go through fetch/checkout, which return the local copy (touching it) or download it
+    with parallel ranged GETs. Whenever the cache is over max_bytes the least recently used
+    copies are deleted, but only copies known to be in S3: a file that exists nowhere else is
+    never evicted. Recency is the file's mtime, so the order survives a restart.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "data",
+        max_bytes: int = config.STORAGE_CACHE_MAX_BYTES,
+        part_size: int = config.STORAGE_PART_SIZE_BYTES,
+        download_workers: int = config.STORAGE_DOWNLOAD_WORKERS,
+        bucket_name: Optional[str] = None,
+        is_remote: Optional[Callable[[str], bool]] = None,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.part_size = part_size
+        self.download_workers = download_workers
+        self.bucket_name = bucket_name
+        self.is_remote = is_remote
+        self.on_evict = on_evict
+        # filename -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._remote: Set[str] = set()
+        self._pins: Dict[str, int] = {}
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        """
+        Index the PDFs already on disk (oldest first) and drop downloads left by a crash
+        """
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return
+        found = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.startswith(DOWNLOAD_PREFIX):
+                    os.remove(entry.path)
+                elif entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._bytes += size
+
+    def path_for(self, filename: str) -> str:
+        if not filename or os.path.basename(filename) != filename or filename in (".", ".."):
+            raise ValueError(f"Invalid document name: {filename!r}")
+        return os.path.join(self.cache_dir, filename)
+
+    # --- LRU BOOKKEEPING ---
+    def _record(self, filename: str, size: int) -> None:
+        with self._lock:
+            self._bytes += size - self._entries.get(filename, 0)
+            self._entries[filename] = size
+            self._entries.move_to_end(filename)
+
+    def _touch(self, filename: str) -> None:
+        with self._lock:
+            if filename in self._entries:
+                self._entries.move_to_end(filename)
+        try:
+            os.utime(self.path_for(filename))
+        except OSError:
+            pass
+
+    def _evictable(self, filename: str) -> bool:
+        if self._pins.get(filename):
+            return False
+        if filename in self._remote:
+            return True
+        return bool(self.is_remote and self.is_remote(filename))
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Delete least recently used copies that are also in S3 until the cache fits in max_bytes.
+        Returns the number of files evicted.
+        """
+        evicted = []
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return 0
+            for filename in list(self._entries):
+                if self._bytes <= self.max_bytes:
+                    break
+                if filename == keep or not self._evictable(filename):
+                    continue
+                try:
+                    os.remove(self.path_for(filename))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not evict {filename}: {e}")
+                    continue
+                self._bytes -= self._entries.pop(filename)
+                evicted.append(filename)
+            self.evictions += len(evicted)
+            if self._bytes > self.max_bytes:
+                logger.warning(
+                    f"Document cache holds {self._bytes} bytes (limit {self.max_bytes}); "
+                    "the rest is in use or not yet in S3"
+                )
+        for filename in evicted:
+            logger.info(f"Evicted local copy of {filename}")
+            if self.on_evict:
+                self.on_evict(filename)
+        return len(evicted)
+
+    # --- WRITES ---
+    def admit(self, filename: str, remote: bool = False) -> str:
+        """
+        Take a file just written to the cache directory (an upload) into the LRU as the most
+        recently used; remote=True once this content is in S3. Evicts others if the cache is full.
+        """
+        path = self.path_for(filename)
+        self._record(filename, os.path.getsize(path))
+        with self._lock:
+            if remote:
+                self._remote.add(filename)
+            else:
+                self._remote.discard(filename)
+        self.evict(keep=filename)
+        return path
+
+    def mark_remote(self, filename: str) -> None:
+        with self._lock:
+            self._remote.add(filename)
+
+    def forget(self, filename: str) -> None:
+        """
+        Drop a document from the cache index (the file itself is left alone)
+        """
+        with self._lock:
+            self._bytes -= self._entries.pop(filename, 0)
+            self._remote.discard(filename)
+
+    # --- READS ---
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._entries
+
+    def _download(self, filename: str, path: str) -> None:
+        if not config.AWS_AVAILABLE:
+            raise FileNotFoundError(f"{filename} is not cached locally and S3 is not configured")
+        from botocore.exceptions import ClientError
+        from aws_service.s3_handler import download_object_ranged
+
+        bucket_name = self.bucket_name or config.S3_BUCKET_NAME
+        started = time.perf_counter()
+        try:
+            with stage_timer("storage_download"):
+                result = download_object_ranged(
+                    bucket_name, filename, path, part_size=self.part_size, max_workers=self.download_workers
+                )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(f"{filename} is not in bucket {bucket_name}") from e
+            raise
+        with self._lock:
+            self.bytes_downloaded += result["size"]
+        logger.info(
+            f"Fetched {filename} from S3 ({result['size']} bytes, {result['parts']} parts) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _hit(self, filename: str, path: str) -> str:
+        with self._lock:
+            self.hits += 1
+        record_cache("document_storage", True)
+        self._touch(filename)
+        return path
+
+    def fetch(self, filename: str) -> str:
+        """
+        Return the local path of a document, downloading it from S3 on a miss.
+        Concurrent misses for the same file share one download.
+        """
+        path = self.path_for(filename)
+        with self._lock:
+            cached = filename in self._entries and os.path.exists(path)
+            if not cached:
+                lock = self._inflight.setdefault(filename, threading.Lock())
+        if cached:
+            return self._hit(filename, path)
+
+        with lock:
+            try:
+                if filename in self._entries and os.path.exists(path):
+                    return self._hit(filename, path)
+                with self._lock:
+                    self.misses += 1
+                record_cache("document_storage", False)
+                self.forget(filename)
+                self._download(filename, path)
+                self._record(filename, os.path.getsize(path))
+                self.mark_remote(filename)
+            finally:
+                with self._lock:
+                    self._inflight.pop(filename, None)
+        self.evict(keep=filename)
+        return path
+
+    @contextmanager
+    def checkout(self, filename: str) -> Iterator[str]:
+        """
+        Fetch a document and keep it from being evicted while the block runs
+        """
+        with self._lock:
+            self._pins[filename] = self._pins.get(filename, 0) + 1
+        try:
+            yield self.fetch(filename)
+        finally:
+            with self._lock:
+                self._pins[filename] -= 1
+                if not self._pins[filename]:
+                    del self._pins[filename]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes_downloaded": self.bytes_downloaded
+            }
+
+
+def get_storage(cache_dir: str = "data") -> DocumentStorage:
+    """
+    Return the process-wide storage for a cache directory. S3 presence comes from the
+    document catalog, and evicted copies are removed from it.
+    """
+    def build() -> DocumentStorage:
+        from app.catalog import get_catalog
+
+        catalog = get_catalog(cache_dir)
+        return DocumentStorage(
+            cache_dir,
+            is_remote=lambda filename: bool((catalog.get(filename) or {}).get("s3")),
+            on_evict=catalog.remove_local
+        )
+
+    return get_client(("document_storage", cache_dir), build)
@@ -0,0 +1,141 @@
+#app/tracing.py
+import os
+import logging
+import threading
+import functools
+from typing import Any, Callable, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+import config
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("chatbot_rag")
+
+_provider: Optional[TracerProvider] = None
+_setup_lock = threading.Lock()
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a local file, one JSON object per line (a stand-in for a collector)
+    """
+
+    def __init__(self, path: str = config.TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            return SpanExportResult.SUCCESS
+        except OSError as e:
+            logger.warning(f"Failed to export {len(spans)} spans: {e}")
+            return SpanExportResult.FAILURE
+
+    def shutdown(self) -> None:
+        pass
+
+
+def build_exporter(kind: str = config.TRACE_EXPORTER) -> Optional[SpanExporter]:
+    """
+    Exporter for TRACE_EXPORTER: "file" (JSONL at TRACE_FILE), "otlp" (gRPC to TRACE_OTLP_ENDPOINT) or "none"
+    """
+    if kind == "file":
+        return JsonLinesSpanExporter(config.TRACE_FILE)
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=config.TRACE_OTLP_ENDPOINT, insecure=True)
+    if kind != "none":
+        logger.warning(f"Unknown TRACE_EXPORTER {kind!r}; spans will not be exported")
+    return None
+
+
+def setup_tracing(app=None, exporter: Optional[SpanExporter] = None) -> Optional[TracerProvider]:
+    """
+    Install the process-wide tracer provider (once) and instrument the FastAPI app.
+
+    Sampling is decided once per trace at its root: TRACE_SAMPLE_RATE of new requests, or whatever
+    an incoming traceparent header says. Unsampled requests only create non-recording spans.
+    """
+    global _provider
+    if not config.TRACING_ENABLED:
+        return None
+
+    with _setup_lock:
+        if _provider is None:
+            _provider = TracerProvider(
+                resource=Resource.create({"service.name": config.TRACE_SERVICE_NAME}),
+                sampler=ParentBased(TraceIdRatioBased(config.TRACE_SAMPLE_RATE))
+            )
+            exporter = exporter or build_exporter()
+            if exporter is not None:
+                # Spans are queued and exported off the request path; a full queue drops spans
+                _provider.add_span_processor(BatchSpanProcessor(exporter, max_queue_size=4096))
+            trace.set_tracer_provider(_provider)
+            logger.info(
+                f"Tracing enabled: sample rate {config.TRACE_SAMPLE_RATE}, exporter {config.TRACE_EXPORTER}"
+            )
+
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(
+            app, tracer_provider=_provider, excluded_urls="metrics,health,ready"
+        )
+    return _provider
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator running a function inside a span named after it
+    """
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.start_as_current_span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager for a child span of the current request
+    """
+    return tracer.start_as_current_span(name, attributes=attributes or None)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """
+    Annotate the current span; a no-op when the request is not sampled
+    """
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """
+    Hex trace id of the current request, or None when it is not being recorded
+    """
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid or not context.trace_flags.sampled:
+        return None
+    return trace.format_trace_id(context.trace_id)
+
+
+def flush_traces(timeout_millis: int = 5000) -> None:
+    if _provider is not None:
+        _provider.force_flush(timeout_millis)
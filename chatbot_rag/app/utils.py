@@ -1,14 +1,18 @@
 #app/utils.py
 import logging
 from PyPDF2 import PdfReader
-from typing import Optional
+from typing import List, Optional
 import os
 
+from app.tracing import traced
+
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_path: str) -> str:
+@traced()
+def extract_pages_from_pdf(file_path: str) -> List[str]:
     """
-    Extract text from a PDF file with improved error handling
+    Extract text from each page of a PDF file.
+    Pages that yield no text are returned as empty strings so page numbers are preserved.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"PDF file not found: {file_path}")
@@ -19,30 +23,44 @@ def extract_text_from_pdf(file_path: str) -> str:
         if len(reader.pages) == 0:
             raise ValueError("PDF file is empty or corrupted")
         
-        text = ""
-        total_pages = len(reader.pages)
+        pages = []
         
         for page_num, page in enumerate(reader.pages, 1):
             try:
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                else:
+                if not page_text:
                     logger.warning(f"No text extracted from page {page_num}")
+                pages.append(page_text or "")
             except Exception as e:
                 logger.warning(f"Error extracting text from page {page_num}: {e}")
-                continue
-        
-        if not text.strip():
-            raise ValueError("No text could be extracted from the PDF. It may be scanned or image-based.")
+                pages.append("")
         
-        logger.info(f"Successfully extracted text from {total_pages} pages")
-        return text.strip()
+        logger.info(f"Successfully extracted text from {len(pages)} pages")
+        return pages
         
     except Exception as e:
         logger.error(f"Error processing PDF {file_path}: {e}")
         raise
 
+def join_pages(pages: List[str]) -> str:
+    """
+    Join per-page text into the document text used for splitting
+    """
+    text = "".join(page_text + "\n" for page_text in pages if page_text)
+    
+    if not text.strip():
+        raise ValueError("No text could be extracted from the PDF. It may be scanned or image-based.")
+    
+    return text.strip()
+
+@traced()
+def extract_text_from_pdf(file_path: str) -> str:
+    """
+    Extract text from a PDF file with improved error handling
+    """
+    pages = extract_pages_from_pdf(file_path)
+    return join_pages(pages)
+
 def validate_pdf_file(file_path: str) -> bool:
     """
     Validate if a file is a valid PDF
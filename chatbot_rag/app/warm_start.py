@@ -0,0 +1,157 @@
+#app/warm_start.py
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app.index_manifest import IndexManifest, get_index_reader
+
+logger = logging.getLogger(__name__)
+
+# LangChain's default collection, which held the whole index before per-document collections
+LEGACY_COLLECTION = "langchain"
+# Manifest name for that collection when no document registry says which PDF it holds
+LEGACY_DOCUMENT = "legacy-index"
+
+
+class WarmupState:
+    """
+    Readiness of this worker: "warming" until persisted indexes are rehydrated, then "ready" (or "failed")
+    """
+
+    def __init__(self):
+        self.status = "warming"
+        self.documents = 0
+        self.current_document: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def finish(self, documents: int, current_document: Optional[str]) -> None:
+        with self._lock:
+            self.status = "ready"
+            self.documents = documents
+            self.current_document = current_document
+            self.finished_at = time.time()
+
+    def fail(self, error: str) -> None:
+        with self._lock:
+            self.status = "failed"
+            self.error = error
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "status": self.status,
+                "documents": self.documents,
+                "current_document": self.current_document,
+                "warmup_seconds": round(end - self.started_at, 3),
+                "error": self.error,
+                "snapshot": self.snapshot
+            }
+
+
+def recover_manifest(persist_dir: str, current: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Rebuild the manifest from collection metadata for indexes persisted before it existed.
+    A non-empty legacy "langchain" collection is registered too, under the current document's
+    filename if the registry points at it, else as LEGACY_DOCUMENT.
+    """
+    manifest = IndexManifest(persist_dir)
+    if manifest.read()["documents"] or not os.path.exists(os.path.join(persist_dir, "chroma.sqlite3")):
+        return manifest.read()
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_dir)
+    updated_at = os.path.getmtime(os.path.join(persist_dir, "chroma.sqlite3"))
+    found = {}
+    for collection in client.list_collections():
+        source = (collection.metadata or {}).get("source")
+        if source:
+            found[source] = {"collection": collection.name, "chunks": collection.count(), "updated_at": updated_at}
+        elif collection.name == LEGACY_COLLECTION and collection.count():
+            name = LEGACY_DOCUMENT
+            if current and current.get("collection") == LEGACY_COLLECTION:
+                name = current["filename"]
+            found[name] = {
+                "collection": collection.name, "chunks": collection.count(), "updated_at": updated_at, "legacy": True
+            }
+
+    if found:
+        manifest.update(lambda data: data["documents"].update(found))
+        logger.info(f"Recovered {len(found)} documents into the index manifest")
+    return manifest.read()
+
+
+def rehydrate(
+    persist_dir: str,
+    state_store,
+    embeddings_factory,
+    state: WarmupState,
+    bootstrap: Optional[Callable[[], Dict[str, Any]]] = None
+) -> None:
+    """
+    Restore the document registry from the persisted index and open the current document's collection.
+    bootstrap (e.g. a snapshot import) runs first; if it fails the node starts from its local index.
+    QA chains are still built lazily on the first question.
+    """
+    try:
+        if bootstrap is not None:
+            try:
+                state.snapshot = bootstrap()
+            except Exception as e:
+                logger.warning(f"Index bootstrap failed, starting from the local index: {e}")
+                state.snapshot = {"status": "failed", "error": str(e)}
+
+        current = state_store.get_current_document()
+        documents = recover_manifest(persist_dir, current)["documents"]
+
+        if documents and (current is None or current["filename"] not in documents):
+            # The registry was lost (or points at a cleared document): resume with the newest one
+            filename = max(documents, key=lambda name: documents[name].get("updated_at", 0))
+            state_store.set_current_document(filename, documents[filename]["collection"], persist_dir)
+            current = state_store.get_current_document()
+            logger.info(f"Restored current document {filename} from the index manifest")
+        elif not documents:
+            current = None
+
+        if current is not None:
+            get_index_reader(persist_dir).get_store(current["collection"], embeddings_factory)
+
+        state.finish(len(documents), current["filename"] if current else None)
+        logger.info(
+            f"Warm start finished in {state.to_dict()['warmup_seconds']}s "
+            f"({len(documents)} persisted documents)"
+        )
+    except Exception as e:
+        logger.error(f"Warm start failed: {e}")
+        state.fail(str(e))
+
+
+def start_warmup(
+    persist_dir: str,
+    state_store,
+    embeddings_factory,
+    bootstrap: Optional[Callable[[], Dict[str, Any]]] = None
+) -> WarmupState:
+    """
+    Rehydrate in a background thread so the server accepts connections immediately
+    """
+    state = WarmupState()
+    threading.Thread(
+        target=rehydrate,
+        args=(persist_dir, state_store, embeddings_factory, state, bootstrap),
+        name="warm-start",
+        daemon=True
+    ).start()
+    return state
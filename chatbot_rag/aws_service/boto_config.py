@@ -0,0 +1,29 @@
+#aws_service/boto_config.py
+import os
+from botocore.config import Config
+
+# Shared by every boto3 client/resource in the process. Timeouts fail fast when the
+# endpoint is down; the pool is sized for concurrent request threads and kept alive.
+client_config = Config(
+    connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "10")),
+    retries={"max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "2"))},
+    max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True
+)
+
+
+def bind_to_request_deadline(client) -> None:
+    """
+    Shrink each call's read timeout to the current request deadline (and refuse calls once it
+    has passed), so a slow AWS call inside a request cannot outlive the request's budget
+    """
+    from app.deadline import check_deadline, stage_timeout
+
+    def before_call(model, context, **kwargs):
+        check_deadline(model.name)
+        remaining = stage_timeout(client_config.read_timeout)
+        if remaining < client_config.read_timeout:
+            context["read_timeout"] = remaining
+
+    client.meta.events.register("before-call", before_call, unique_id="rag-request-deadline")
@@ -1,50 +1,85 @@
 import boto3
 import os
+import json
+import base64
 import logging
+from aws_service.boto_config import bind_to_request_deadline, client_config
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from app.tracing import traced
 from datetime import datetime
 import time
-from typing import Optional, Dict, Any, Union
+import threading
+from typing import Optional, Dict, Any, Iterator, List, Union
 from boto3.resources.base import ServiceResource
 from botocore.client import BaseClient
 
 logger = logging.getLogger(__name__)
 
-# Initialize DynamoDB client
+# DynamoDB resource and client, created on first use so importing this module never touches the network
 dynamodb: Optional[ServiceResource] = None
 dynamodb_client: Optional[BaseClient] = None
+_dynamodb_lock = threading.Lock()
 
-try:
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
-        endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566")
-    )
-    
-    # Test connection
-    if dynamodb:
-        dynamodb_client = dynamodb.meta.client  # type: ignore
-        tables = dynamodb_client.list_tables()  # type: ignore
-        logger.info(f"Successfully connected to DynamoDB. Tables: {tables.get('TableNames', [])}")
-    
-except Exception as e:
-    logger.error(f"Failed to connect to DynamoDB: {e}")
-    dynamodb = None
-    dynamodb_client = None
+def get_dynamodb() -> Optional[ServiceResource]:
+    """
+    Return the DynamoDB resource, creating it (without any network call) on first use
+    """
+    global dynamodb, dynamodb_client
+    if dynamodb is None:
+        with _dynamodb_lock:
+            if dynamodb is None:
+                try:
+                    resource = boto3.resource(
+                        'dynamodb',
+                        region_name=os.getenv("AWS_REGION", "us-east-1"),
+                        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
+                        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
+                        endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566"),
+                        config=client_config
+                    )
+                    dynamodb_client = resource.meta.client  # type: ignore
+                    from app.metrics import instrument_boto_client
+                    instrument_boto_client(dynamodb_client, "dynamodb")
+                    bind_to_request_deadline(dynamodb_client)
+                    dynamodb = resource
+                except Exception as e:
+                    logger.error(f"Failed to create DynamoDB resource: {e}")
+    return dynamodb
 
 # Initialize table references
 pdf_metadata_table = None
 llm_metrics_table = None
 
+# Secondary indexes: a user's documents by upload time, and a PDF's queries by time.
+# Only the attributes listed here are projected, so listing pages stay small.
+PDF_METADATA_USER_INDEX = 'user_id-upload_timestamp-index'
+LLM_METRICS_PDF_INDEX = 'pdf_name-timestamp-index'
+
+PDF_METADATA_INDEXES = [
+    {
+        'name': PDF_METADATA_USER_INDEX,
+        'partition_key': 'user_id',
+        'sort_key': 'upload_timestamp',
+        'attributes': ['status']
+    }
+]
+LLM_METRICS_INDEXES = [
+    {
+        'name': LLM_METRICS_PDF_INDEX,
+        'partition_key': 'pdf_name',
+        'sort_key': 'timestamp',
+        'attributes': ['query', 'response_time', 'response_length']
+    }
+]
+
 def initialize_tables():
     """
     Initialize DynamoDB table references
     """
     global pdf_metadata_table, llm_metrics_table
     
-    if dynamodb is None:
+    if get_dynamodb() is None:
         logger.error("DynamoDB not available")
         return False
     
@@ -57,39 +92,57 @@ def initialize_tables():
         logger.error(f"Error initializing table references: {e}")
         return False
 
-def create_dynamodb_table(table_name: str, partition_key: str, sort_key: Optional[str] = None) -> bool:
+def _key_schema(partition_key: str, sort_key: Optional[str] = None) -> List[Dict[str, str]]:
+    key_schema = [{'AttributeName': partition_key, 'KeyType': 'HASH'}]
+    if sort_key:
+        key_schema.append({'AttributeName': sort_key, 'KeyType': 'RANGE'})
+    return key_schema
+
+def _index_definition(index: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'IndexName': index['name'],
+        'KeySchema': _key_schema(index['partition_key'], index.get('sort_key')),
+        'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': index['attributes']}
+    }
+
+def _attribute_definitions(*names: Optional[str]) -> List[Dict[str, str]]:
+    unique = dict.fromkeys(name for name in names if name)
+    return [{'AttributeName': name, 'AttributeType': 'S'} for name in unique]
+
+def create_dynamodb_table(
+    table_name: str,
+    partition_key: str,
+    sort_key: Optional[str] = None,
+    global_secondary_indexes: Optional[List[Dict[str, Any]]] = None
+) -> bool:
     """
-    Create a DynamoDB table if it doesn't exist
+    Create a DynamoDB table if it doesn't exist, with its global secondary indexes
+    (added to an existing table when missing)
     """
-    if dynamodb is None or dynamodb_client is None:
+    if get_dynamodb() is None or dynamodb_client is None:
         logger.error("DynamoDB not available")
         return False
     
+    indexes = global_secondary_indexes or []
     try:
-        key_schema = [
-            {'AttributeName': partition_key, 'KeyType': 'HASH'}
-        ]
-        attribute_definitions = [
-            {'AttributeName': partition_key, 'AttributeType': 'S'}
-        ]
-        
-        if sort_key:
-            key_schema.append({'AttributeName': sort_key, 'KeyType': 'RANGE'})
-            attribute_definitions.append({'AttributeName': sort_key, 'AttributeType': 'S'})
+        index_keys = [key for index in indexes for key in (index['partition_key'], index.get('sort_key'))]
+        create_kwargs: Dict[str, Any] = {
+            'TableName': table_name,
+            'KeySchema': _key_schema(partition_key, sort_key),
+            'AttributeDefinitions': _attribute_definitions(partition_key, sort_key, *index_keys),
+            'BillingMode': 'PAY_PER_REQUEST'
+        }
+        if indexes:
+            create_kwargs['GlobalSecondaryIndexes'] = [_index_definition(index) for index in indexes]
         
-        dynamodb_client.create_table(
-            TableName=table_name,
-            KeySchema=key_schema,
-            AttributeDefinitions=attribute_definitions,
-            BillingMode='PAY_PER_REQUEST'
-        )
+        dynamodb_client.create_table(**create_kwargs)
         logger.info(f"Table '{table_name}' created successfully")
         return True
         
     except ClientError as e:
         if e.response['Error']['Code'] == 'ResourceInUseException':
             logger.info(f"Table '{table_name}' already exists")
-            return True
+            return ensure_indexes(table_name, indexes)
         else:
             logger.error(f"Error creating table '{table_name}': {e}")
             return False
@@ -97,6 +150,53 @@ def create_dynamodb_table(table_name: str, partition_key: str, sort_key: Optiona
         logger.error(f"Unexpected error creating table '{table_name}': {e}")
         return False
 
+def ensure_indexes(table_name: str, indexes: List[Dict[str, Any]]) -> bool:
+    """
+    Add missing global secondary indexes to an existing table (one per update, as DynamoDB requires).
+    New indexes backfill in the background; queries against them work once they are ACTIVE.
+    """
+    if not indexes:
+        return True
+    
+    try:
+        table = dynamodb_client.describe_table(TableName=table_name)['Table']
+        existing = {index['IndexName'] for index in table.get('GlobalSecondaryIndexes', [])}
+        for index in indexes:
+            if index['name'] in existing:
+                continue
+            dynamodb_client.update_table(
+                TableName=table_name,
+                AttributeDefinitions=_attribute_definitions(index['partition_key'], index.get('sort_key')),
+                GlobalSecondaryIndexUpdates=[{'Create': _index_definition(index)}]
+            )
+            logger.info(f"Adding index '{index['name']}' to table '{table_name}'")
+        return True
+    except Exception as e:
+        logger.error(f"Error adding indexes to table '{table_name}': {e}")
+        return False
+
+def enable_ttl(table_name: str, attribute_name: str) -> bool:
+    """
+    Enable DynamoDB TTL on a table attribute (idempotent)
+    """
+    if get_dynamodb() is None or dynamodb_client is None:
+        return False
+    
+    try:
+        dynamodb_client.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification={'Enabled': True, 'AttributeName': attribute_name}
+        )
+        return True
+    except ClientError as e:
+        if 'already enabled' in str(e).lower():
+            return True
+        logger.warning(f"Could not enable TTL on '{table_name}': {e}")
+        return False
+    except Exception as e:
+        logger.warning(f"Could not enable TTL on '{table_name}': {e}")
+        return False
+
 def setup_tables():
     """
     Setup required DynamoDB tables
@@ -107,7 +207,8 @@ def setup_tables():
     if not create_dynamodb_table(
         table_name='PDF_Metadata',
         partition_key='filename',
-        sort_key='user_id'
+        sort_key='user_id',
+        global_secondary_indexes=PDF_METADATA_INDEXES
     ):
         success = False
     
@@ -115,8 +216,28 @@ def setup_tables():
     if not create_dynamodb_table(
         table_name='LLMMetrics',
         partition_key='query_id',
-        sort_key='timestamp'
+        sort_key='timestamp',
+        global_secondary_indexes=LLM_METRICS_INDEXES
+    ):
+        success = False
+    
+    # Create RAG_State table (shared worker/node state, expired via TTL)
+    if create_dynamodb_table(
+        table_name='RAG_State',
+        partition_key='key'
+    ):
+        enable_ttl('RAG_State', 'expires_at')
+    else:
+        success = False
+    
+    # Create LLMMetricsRollups table (latency rollups kept by the metrics Lambda; minute rollups expire)
+    if create_dynamodb_table(
+        table_name='LLMMetricsRollups',
+        partition_key='bucket',
+        sort_key='series'
     ):
+        enable_ttl('LLMMetricsRollups', 'expires_at')
+    else:
         success = False
     
     # Initialize table references
@@ -125,11 +246,12 @@ def setup_tables():
     
     return success
 
+@traced()
 def store_metadata(filename: str, user_id: str = "anonymous", additional_info: Optional[Dict[str, Any]] = None) -> bool:
     """
     Store PDF metadata in the PDF_Metadata table
     """
-    if pdf_metadata_table is None:
+    if pdf_metadata_table is None and not initialize_tables():
         logger.error("PDF_Metadata table not available")
         return False
     
@@ -153,11 +275,12 @@ def store_metadata(filename: str, user_id: str = "anonymous", additional_info: O
         logger.error(f"Error storing metadata: {e}")
         return False
 
+@traced()
 def store_llm_metrics(query: str, response_time: float, response: str, pdf_name: Optional[str] = None) -> bool:
     """
     Store LLM metrics in the LLMMetrics table
     """
-    if llm_metrics_table is None:
+    if llm_metrics_table is None and not initialize_tables():
         logger.error("LLMMetrics table not available")
         return False
     
@@ -187,7 +310,7 @@ def get_pdf_metadata(filename: str, user_id: str = "anonymous") -> Optional[Dict
     """
     Retrieve PDF metadata from DynamoDB
     """
-    if pdf_metadata_table is None:
+    if pdf_metadata_table is None and not initialize_tables():
         logger.error("PDF_Metadata table not available")
         return None
     
@@ -213,20 +336,19 @@ def get_llm_metrics(query_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieve LLM metrics from DynamoDB
     """
-    if llm_metrics_table is None:
+    if llm_metrics_table is None and not initialize_tables():
         logger.error("LLMMetrics table not available")
         return None
     
     try:
-        response = llm_metrics_table.get_item(
-            Key={
-                'query_id': query_id,
-                'timestamp': datetime.utcnow().isoformat()
-            }
+        # The sort key is the time the query was stored, so look the item up by query_id alone
+        response = llm_metrics_table.query(
+            KeyConditionExpression=Key('query_id').eq(query_id),
+            Limit=1
         )
         
-        if 'Item' in response:
-            return response['Item']
+        if response.get('Items'):
+            return response['Items'][0]
         else:
             logger.info(f"No metrics found for query_id: {query_id}")
             return None
@@ -235,31 +357,194 @@ def get_llm_metrics(query_id: str) -> Optional[Dict[str, Any]]:
         logger.error(f"Error retrieving metrics: {e}")
         return None
 
-def list_user_pdfs(user_id: str = "anonymous") -> list:
+def encode_page_token(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Opaque continuation token for a page's LastEvaluatedKey (None on the last page)
+    """
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, sort_keys=True).encode()).decode()
+
+def decode_page_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {e}")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid page token")
+    return key
+
+def _query_page(table, index_name: str, key_condition, attributes: List[str], limit: int, next_token: Optional[str], newest_first: bool) -> Dict[str, Any]:
     """
-    List all PDFs for a specific user
+    One page of an index query: at most `limit` items, only the requested attributes
     """
-    if pdf_metadata_table is None:
+    query_kwargs: Dict[str, Any] = {
+        'IndexName': index_name,
+        'KeyConditionExpression': key_condition,
+        'ProjectionExpression': ', '.join(f'#a{i}' for i in range(len(attributes))),
+        'ExpressionAttributeNames': {f'#a{i}': name for i, name in enumerate(attributes)},
+        'ScanIndexForward': not newest_first,
+        'Limit': limit
+    }
+    start_key = decode_page_token(next_token)
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+    response = table.query(**query_kwargs)
+    return {
+        'items': response.get('Items', []),
+        'next_token': encode_page_token(response.get('LastEvaluatedKey'))
+    }
+
+def list_user_pdfs_page(
+    user_id: str = "anonymous",
+    limit: int = 50,
+    next_token: Optional[str] = None,
+    newest_first: bool = True,
+    attributes: Optional[List[str]] = None,
+    raise_errors: bool = False
+) -> Dict[str, Any]:
+    """
+    One page of a user's documents by upload time: {"items": [...], "next_token": str or None}.
+    Reads the user_id index, so the cost is the page size, not the table size (eventually consistent).
+    With raise_errors a failed lookup raises instead of returning an empty page.
+    """
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    if pdf_metadata_table is None and not initialize_tables():
         logger.error("PDF_Metadata table not available")
-        return []
+        if raise_errors:
+            raise RuntimeError("PDF_Metadata table not available")
+        return {'items': [], 'next_token': None}
     
     try:
-        response = pdf_metadata_table.query(
-            KeyConditionExpression='user_id = :user_id',
-            ExpressionAttributeValues={':user_id': user_id}
+        return _query_page(
+            pdf_metadata_table,
+            PDF_METADATA_USER_INDEX,
+            Key('user_id').eq(user_id),
+            attributes or ['filename', 'user_id', 'upload_timestamp', 'status'],
+            limit,
+            next_token,
+            newest_first
         )
         
-        return response.get('Items', [])
-        
     except Exception as e:
         logger.error(f"Error listing user PDFs: {e}")
+        if raise_errors:
+            raise
+        return {'items': [], 'next_token': None}
+
+def list_user_pdfs(user_id: str = "anonymous", raise_errors: bool = False) -> list:
+    """
+    List all PDFs for a specific user (every page of the user_id index)
+    """
+    items: list = []
+    next_token = None
+    while True:
+        page = list_user_pdfs_page(user_id, limit=100, next_token=next_token, raise_errors=raise_errors)
+        items.extend(page['items'])
+        next_token = page['next_token']
+        if not next_token:
+            return items
+
+def list_pdf_queries(
+    pdf_name: str,
+    limit: int = 50,
+    next_token: Optional[str] = None,
+    since: Optional[str] = None,
+    newest_first: bool = True,
+    attributes: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    One page of the queries asked about a PDF, newest first by default, optionally since an ISO timestamp
+    """
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    if llm_metrics_table is None and not initialize_tables():
+        logger.error("LLMMetrics table not available")
+        return {'items': [], 'next_token': None}
+    
+    key_condition = Key('pdf_name').eq(pdf_name)
+    if since:
+        key_condition = key_condition & Key('timestamp').gte(since)
+    try:
+        return _query_page(
+            llm_metrics_table,
+            LLM_METRICS_PDF_INDEX,
+            key_condition,
+            attributes or ['query_id', 'timestamp', 'query', 'response_time'],
+            limit,
+            next_token,
+            newest_first
+        )
+        
+    except Exception as e:
+        logger.error(f"Error listing queries for {pdf_name}: {e}")
+        return {'items': [], 'next_token': None}
+
+def iter_pdf_metadata(page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every PDF_Metadata item (filename, user, upload time, status), one scan page at a time.
+    For background catalog refreshes, never the request path; errors propagate to the caller.
+    """
+    if pdf_metadata_table is None and not initialize_tables():
+        raise RuntimeError("PDF_Metadata table not available")
+    
+    scan_kwargs: Dict[str, Any] = {
+        'ProjectionExpression': 'filename, user_id, upload_timestamp, #status',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'Limit': page_size
+    }
+    while True:
+        response = pdf_metadata_table.scan(**scan_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def scan_llm_metrics(since: Optional[str] = None, until: Optional[str] = None, limit: Optional[int] = None) -> list:
+    """
+    Page through the LLMMetrics table, optionally between two ISO timestamps.
+    A full-table scan: meant for offline workload export, never for the request path.
+    """
+    if llm_metrics_table is None and not initialize_tables():
+        logger.error("LLMMetrics table not available")
         return []
+    
+    from boto3.dynamodb.conditions import Attr
+    
+    scan_kwargs: Dict[str, Any] = {
+        'ProjectionExpression': 'query_id, #ts, #q, response_time, pdf_name',
+        'ExpressionAttributeNames': {'#ts': 'timestamp', '#q': 'query'}
+    }
+    if since and until:
+        scan_kwargs['FilterExpression'] = Attr('timestamp').between(since, until)
+    elif since:
+        scan_kwargs['FilterExpression'] = Attr('timestamp').gte(since)
+    elif until:
+        scan_kwargs['FilterExpression'] = Attr('timestamp').lte(until)
+    
+    items: list = []
+    try:
+        while True:
+            response = llm_metrics_table.scan(**scan_kwargs)
+            items.extend(response.get('Items', []))
+            if limit is not None and len(items) >= limit:
+                return items[:limit]
+            if 'LastEvaluatedKey' not in response:
+                return items
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            
+    except Exception as e:
+        logger.error(f"Error scanning LLM metrics: {e}")
+        return items
 
 def check_dynamodb_connection() -> bool:
     """
     Check if DynamoDB connection is working
     """
-    if dynamodb is None or dynamodb_client is None:
+    if get_dynamodb() is None or dynamodb_client is None:
         return False
     
     try:
@@ -267,8 +552,4 @@ def check_dynamodb_connection() -> bool:
         return True
     except Exception as e:
         logger.error(f"DynamoDB connection check failed: {e}")
-        return False
-
-# Initialize tables when module is imported
-if dynamodb is not None:
-    initialize_tables()
\ No newline at end of file
+        return False
\ No newline at end of file
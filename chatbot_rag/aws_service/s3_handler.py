@@ -2,43 +2,75 @@
 import boto3
 import os
 import logging
-from typing import Optional
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+from aws_service.boto_config import bind_to_request_deadline, client_config
 from botocore.exceptions import ClientError, NoCredentialsError
+from app.tracing import traced
 
 logger = logging.getLogger(__name__)
 
-# Initialize S3 client
-try:
-    s3 = boto3.client(
-        "s3",
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566")  # Use LocalStack for local development
-    )
-    logger.info("S3 client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize S3 client: {e}")
-    s3 = None
+# S3 client, created on first use so importing this module never touches the network
+s3 = None
+_s3_lock = threading.Lock()
 
+def get_s3_client():
+    """
+    Return the S3 client, creating it on first use
+    """
+    global s3
+    if s3 is None:
+        with _s3_lock:
+            if s3 is None:
+                try:
+                    s3 = boto3.client(
+                        "s3",
+                        region_name=os.getenv("AWS_REGION", "us-east-1"),
+                        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                        endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566"),  # Use LocalStack for local development
+                        config=client_config
+                    )
+                    from app.metrics import instrument_boto_client
+                    instrument_boto_client(s3, "s3")
+                    bind_to_request_deadline(s3)
+                    logger.info("S3 client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize S3 client: {e}")
+    return s3
+
+def ensure_bucket(bucket_name: str) -> None:
+    """
+    Create the bucket if it does not exist yet
+    """
+    s3 = get_s3_client()
+    if s3 is None:
+        raise RuntimeError("S3 client not available")
+    
+    try:
+        s3.head_bucket(Bucket=bucket_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] == '404':
+            logger.info(f"Creating bucket: {bucket_name}")
+            s3.create_bucket(Bucket=bucket_name)
+        else:
+            raise
+
+@traced()
 def upload_pdf_to_s3(file_content: bytes, filename: str, bucket_name: str) -> Optional[str]:
     """
     Upload a PDF file to S3 bucket
     """
+    s3 = get_s3_client()
     if s3 is None:
         logger.error("S3 client not available")
         return None
     
     try:
         # Check if bucket exists, create if not
-        try:
-            s3.head_bucket(Bucket=bucket_name)
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                logger.info(f"Creating bucket: {bucket_name}")
-                s3.create_bucket(Bucket=bucket_name)
-            else:
-                raise
+        ensure_bucket(bucket_name)
         
         # Upload file
         s3.put_object(
@@ -67,16 +99,35 @@ def upload_pdf_to_s3(file_content: bytes, filename: str, bucket_name: str) -> Op
         logger.error(f"Unexpected error uploading to S3: {e}")
         return None
 
+def put_object_bytes(bucket_name: str, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+    """
+    Write an object in one PUT. Errors propagate.
+    """
+    s3 = get_s3_client()
+    if s3 is None:
+        raise RuntimeError("S3 client not available")
+    s3.put_object(Bucket=bucket_name, Key=key, Body=data, ContentType=content_type)
+
+def get_object_bytes(bucket_name: str, key: str) -> bytes:
+    """
+    Read a whole object into memory. Errors propagate.
+    """
+    s3 = get_s3_client()
+    if s3 is None:
+        raise RuntimeError("S3 client not available")
+    return s3.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+
 def download_pdf_from_s3(filename: str, bucket_name: str, local_path: str) -> bool:
     """
     Download a PDF file from S3 bucket
     """
+    s3 = get_s3_client()
     if s3 is None:
         logger.error("S3 client not available")
         return False
     
     try:
-        s3.download_file(bucket_name, filename, local_path)
+        download_object_ranged(bucket_name, filename, local_path)
         logger.info(f"Successfully downloaded {filename} from S3")
         return True
         
@@ -87,10 +138,66 @@ def download_pdf_from_s3(filename: str, bucket_name: str, local_path: str) -> bo
         logger.error(f"Unexpected error downloading from S3: {e}")
         return False
 
+def download_object_ranged(
+    bucket_name: str,
+    key: str,
+    local_path: str,
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 8
+) -> Dict[str, Any]:
+    """
+    Download an object with parallel ranged GETs (a single GET when it fits in one part).
+    Every part is pinned to the ETag seen by HEAD, so an overwrite during the download fails
+    instead of mixing two versions; parts land in a temp file that replaces local_path at the end.
+    Errors propagate.
+    """
+    s3 = get_s3_client()
+    if s3 is None:
+        raise RuntimeError("S3 client not available")
+    
+    head = s3.head_object(Bucket=bucket_name, Key=key)
+    size = head['ContentLength']
+    etag = head.get('ETag')
+    pinned = {'IfMatch': etag} if etag else {}
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    
+    directory = os.path.dirname(os.path.abspath(local_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".download-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if len(ranges) <= 1:
+                body = s3.get_object(Bucket=bucket_name, Key=key, **pinned)['Body']
+                for block in iter(lambda: body.read(1024 * 1024), b""):
+                    f.write(block)
+            else:
+                f.truncate(size)
+        
+        if len(ranges) > 1:
+            def fetch_part(byte_range):
+                first, last = byte_range
+                data = s3.get_object(Bucket=bucket_name, Key=key, Range=f"bytes={first}-{last}", **pinned)['Body'].read()
+                if len(data) != last - first + 1:
+                    raise IOError(f"Short read for bytes {first}-{last} of {key}")
+                with open(temp_path, "r+b") as f:
+                    f.seek(first)
+                    f.write(data)
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ranges)))) as pool:
+                list(pool.map(fetch_part, ranges))
+        os.replace(temp_path, local_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return {'size': size, 'etag': etag, 'parts': max(1, len(ranges))}
+
 def delete_pdf_from_s3(filename: str, bucket_name: str) -> bool:
     """
     Delete a PDF file from S3 bucket
     """
+    s3 = get_s3_client()
     if s3 is None:
         logger.error("S3 client not available")
         return False
@@ -107,27 +214,35 @@ def delete_pdf_from_s3(filename: str, bucket_name: str) -> bool:
         logger.error(f"Unexpected error deleting from S3: {e}")
         return False
 
-def list_pdfs_in_s3(bucket_name: str) -> list:
+def iter_pdf_objects_in_s3(bucket_name: str, prefix: str = "") -> Iterator[Dict[str, Any]]:
     """
-    List all PDF files in S3 bucket
+    Yield filename, size and last_modified of every PDF under a prefix, one list page (up to 1,000 keys) at a time.
+    Listing errors propagate, so a caller never mistakes a failed listing for an empty bucket.
     """
+    s3 = get_s3_client()
     if s3 is None:
+        raise RuntimeError("S3 client not available")
+    
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Key'].lower().endswith('.pdf'):
+                yield {
+                    'filename': obj['Key'],
+                    'size': obj['Size'],
+                    'last_modified': obj['LastModified'].isoformat()
+                }
+
+def list_pdfs_in_s3(bucket_name: str) -> list:
+    """
+    List all PDF files in S3 bucket (every page of the listing)
+    """
+    if get_s3_client() is None:
         logger.error("S3 client not available")
         return []
     
     try:
-        response = s3.list_objects_v2(Bucket=bucket_name)
-        pdf_files = []
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if obj['Key'].lower().endswith('.pdf'):
-                    pdf_files.append({
-                        'filename': obj['Key'],
-                        'size': obj['Size'],
-                        'last_modified': obj['LastModified'].isoformat()
-                    })
-        
+        pdf_files = list(iter_pdf_objects_in_s3(bucket_name))
         logger.info(f"Found {len(pdf_files)} PDF files in S3 bucket")
         return pdf_files
         
@@ -142,6 +257,7 @@ def check_s3_connection() -> bool:
     """
     Check if S3 connection is working
     """
+    s3 = get_s3_client()
     if s3 is None:
         return False
     
@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for the ingestion and query stages.
+
+Usage (from the chatbot_rag directory):
+    python -m benchmarks.run                       # full suite, writes benchmarks/results/<time>-<commit>.json
+    python -m benchmarks.run --quick --only retrieval,ask
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+"""
@@ -0,0 +1,81 @@
+#benchmarks/compare.py
+import sys
+import json
+import argparse
+from typing import Any, Dict, List, Optional
+
+# Metric name suffix -> whether a larger value is better
+DIRECTIONS = (("_per_sec", True), ("_ms", False), ("_seconds", False))
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    {"retrieval": {"chunks_1000": {"vector_search": {"p99_ms": 1.2}}}} -> {"retrieval.chunks_1000.vector_search.p99_ms": 1.2}
+    """
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def direction(metric: str) -> Optional[bool]:
+    leaf = metric.rsplit(".", 1)[-1]
+    for suffix, higher_is_better in DIRECTIONS:
+        if leaf.endswith(suffix) or leaf == suffix.lstrip("_"):
+            return higher_is_better
+    return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Per-metric change for every rate or latency present in both runs; "regression" is set when
+    it got worse by more than threshold (a fraction)
+    """
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    rows = []
+    for metric in sorted(set(before) & set(after)):
+        higher_is_better = direction(metric)
+        if higher_is_better is None or before[metric] == 0:
+            continue
+        change = (after[metric] - before[metric]) / before[metric]
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": metric,
+            "baseline": before[metric],
+            "current": after[metric],
+            "change_pct": round(change * 100, 2),
+            "regression": worse > threshold
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--all", action="store_true", help="Show unchanged metrics too")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, threshold=args.threshold / 100)
+    print(f"{baseline['meta']['git']['commit']} -> {current['meta']['git']['commit']}")
+    for row in rows:
+        if args.all or row["regression"] or abs(row["change_pct"]) > args.threshold:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<70} {row['baseline']:>12.4g} {row['current']:>12.4g} {row['change_pct']:>+8.1f}% {flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressions beyond {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#benchmarks/corpus.py
+import os
+import random
+from typing import List
+
+# Fixed vocabulary so generated corpora (and therefore results) are identical between runs
+VOCABULARY = (
+    "model data learning training feature label network layer gradient loss function "
+    "optimizer accuracy precision recall dataset sample batch epoch weight bias kernel "
+    "regression classification cluster vector matrix tensor embedding token sequence "
+    "attention transformer encoder decoder retrieval index query document context answer "
+    "supervised unsupervised reinforcement policy reward agent state action value estimate "
+    "variance distribution probability inference evaluation validation test overfitting "
+    "regularization dropout normalization activation convolution pooling recurrent memory"
+).split()
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "Machine learning.pdf")
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".corpus")
+
+
+def synthetic_sentence(rng: random.Random, words: int = 14) -> str:
+    sentence = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return sentence.capitalize() + "."
+
+
+def synthetic_text(characters: int, seed: int = 0) -> str:
+    """
+    Paragraphed prose of roughly the given length
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < characters:
+        paragraph = " ".join(synthetic_sentence(rng) for _ in range(rng.randint(3, 8)))
+        parts.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+
+def synthetic_chunks(count: int, seed: int = 0, sentences: int = 8) -> List[str]:
+    """
+    Chunk-sized texts (about 800 characters each) for embedding, indexing and retrieval
+    """
+    rng = random.Random(seed)
+    return [" ".join(synthetic_sentence(rng) for _ in range(sentences)) for _ in range(count)]
+
+
+def generate_pdf(pages: int, seed: int = 0, directory: str = CORPUS_DIR) -> str:
+    """
+    Write (once) a text PDF with the given number of pages and return its path
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic-{pages}p-{seed}.pdf")
+    if os.path.exists(path):
+        return path
+
+    rng = random.Random(seed)
+    tmp_path = path + ".tmp"
+    pdf = canvas.Canvas(tmp_path, pagesize=A4)
+    _, height = A4
+    for _ in range(pages):
+        text = pdf.beginText(40, height - 50)
+        text.setFont("Helvetica", 10)
+        for _ in range(55):
+            text.textLine(synthetic_sentence(rng, words=rng.randint(10, 14)))
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    os.replace(tmp_path, path)
+    return path
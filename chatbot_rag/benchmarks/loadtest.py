@@ -0,0 +1,317 @@
+#benchmarks/loadtest.py
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+from benchmarks.corpus import SAMPLE_PDF, synthetic_sentence
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ("upload", "ask", "status")
+
+DEFAULT_MIX = {"ask": 0.8, "status": 0.2, "upload": 0.0}
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Environment for a spawned server: local stand-ins for the models, no AWS, no rate limits, no traces.
+# State is in SQLite (under the scratch directory) so every uvicorn worker sees the uploaded document.
+SPAWN_ENV = {
+    "EMBEDDINGS_PROVIDER": "local",
+    "LLM_PROVIDER": "local",
+    "RATE_LIMIT_ENABLED": "false",
+    "TRACE_EXPORTER": "none",
+    "STATE_BACKEND": "sqlite",
+    "STATE_DB_PATH": os.path.join("state", "rag_state.db"),
+    "AWS_AVAILABLE": "false",
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    "ask=0.8,status=0.2" -> normalised weights per endpoint
+    """
+    mix = {endpoint: 0.0 for endpoint in ENDPOINTS}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; use one of {ENDPOINTS}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError("Endpoint weights must not be negative")
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("At least one endpoint needs a positive weight")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, Optional[float]]:
+    """
+    p50/p95/p99/max of latencies in seconds, reported in milliseconds
+    """
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+class EndpointStats:
+    """
+    Latencies and outcomes of one endpoint within one concurrency stage
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: Optional[int]) -> None:
+        self.latencies.append(seconds)
+        key = str(status) if status is not None else "transport_error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        requests = len(self.latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            **percentiles(self.latencies)
+        }
+
+
+class LoadGenerator:
+    """
+    Closed-loop load: each of N workers sends a request, waits for the answer, and sends the next,
+    choosing the endpoint by the weighted mix
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        mix: Dict[str, float],
+        pdf_path: str = SAMPLE_PDF,
+        seed: int = 0
+    ):
+        self.client = client
+        self.mix = mix
+        self.pdf_name = os.path.basename(pdf_path)
+        with open(pdf_path, "rb") as f:
+            self.pdf_bytes = f.read()
+        self._random = random.Random(seed)
+
+    def _pick(self) -> str:
+        names = [name for name, weight in self.mix.items() if weight > 0]
+        return self._random.choices(names, weights=[self.mix[name] for name in names])[0]
+
+    async def request(self, endpoint: str) -> httpx.Response:
+        if endpoint == "ask":
+            return await self.client.post("/ask", data={"question": synthetic_sentence(self._random, words=8)})
+        if endpoint == "upload":
+            files = {"file": (self.pdf_name, self.pdf_bytes, "application/pdf")}
+            return await self.client.post("/upload-pdf/", files=files)
+        return await self.client.get("/status")
+
+    async def _timed(self, endpoint: str, stats: Dict[str, EndpointStats]) -> None:
+        start = time.perf_counter()
+        try:
+            status = (await self.request(endpoint)).status_code
+        except httpx.HTTPError as e:
+            logger.debug(f"{endpoint} failed: {e}")
+            status = None
+        stats[endpoint].record(time.perf_counter() - start, status)
+
+    async def _worker(self, deadline: float, stats: Dict[str, EndpointStats]) -> None:
+        while time.perf_counter() < deadline:
+            await self._timed(self._pick(), stats)
+
+    async def run_stage(self, concurrency: int, seconds: float) -> Dict[str, Any]:
+        stats = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(self._worker(deadline, stats) for _ in range(concurrency)))
+        # Requests in flight at the deadline are waited for, so the stage runs slightly long
+        elapsed = time.perf_counter() - start
+
+        everything = EndpointStats()
+        for endpoint_stats in stats.values():
+            everything.latencies.extend(endpoint_stats.latencies)
+            everything.errors += endpoint_stats.errors
+        return {
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 3),
+            "overall": everything.summary(elapsed),
+            "endpoints": {
+                endpoint: endpoint_stats.summary(elapsed)
+                for endpoint, endpoint_stats in stats.items() if endpoint_stats.latencies
+            }
+        }
+
+
+async def run_load_test(
+    base_url: str = "http://127.0.0.1:8000",
+    concurrency: Sequence[int] = (1, 4, 16, 64),
+    stage_seconds: float = 30.0,
+    mix: Optional[Dict[str, float]] = None,
+    pdf_path: str = SAMPLE_PDF,
+    timeout: float = 60.0,
+    seed: int = 0,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict[str, Any]:
+    """
+    Upload the PDF once (so /ask has a document), then ramp through the concurrency levels.
+    Returns per-stage, per-endpoint percentiles, throughput and error rates, plus the
+    throughput/latency curve across stages.
+    """
+    mix = mix or DEFAULT_MIX
+    limits = httpx.Limits(max_connections=max(concurrency), max_keepalive_connections=max(concurrency))
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits, transport=transport
+    ) as client:
+        generator = LoadGenerator(client, mix, pdf_path=pdf_path, seed=seed)
+        setup = await generator.request("upload")
+        if setup.status_code >= 400:
+            raise RuntimeError(f"Initial upload failed with {setup.status_code}: {setup.text[:200]}")
+
+        stages = []
+        for level in concurrency:
+            logger.info(f"Load stage: {level} concurrent clients for {stage_seconds}s")
+            stages.append(await generator.run_stage(level, stage_seconds))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "base_url": base_url,
+            "concurrency": list(concurrency),
+            "stage_seconds": stage_seconds,
+            "mix": mix,
+            "pdf": os.path.basename(pdf_path)
+        },
+        "stages": stages,
+        "curve": [
+            {
+                "concurrency": stage["concurrency"],
+                "throughput_rps": stage["overall"]["throughput_rps"],
+                "p50_ms": stage["overall"]["p50_ms"],
+                "p99_ms": stage["overall"]["p99_ms"],
+                "error_rate": stage["overall"]["error_rate"]
+            }
+            for stage in stages
+        ]
+    }
+
+
+@contextmanager
+def spawn_server(port: int, workers: int = 1, startup_timeout: float = 60.0):
+    """
+    Run the app under uvicorn with local stand-ins (SPAWN_ENV) until the block exits.
+    The server works in a scratch directory, so the checked-in vector stores are never touched.
+    """
+    env = {**os.environ, **SPAWN_ENV}
+    if workers > 1 and env["STATE_BACKEND"] == "memory":
+        raise ValueError("Several workers need a shared STATE_BACKEND; the memory backend is per process")
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", app_dir,
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"
+    ]
+    with tempfile.TemporaryDirectory(prefix="rag-load-") as workdir:
+        process = subprocess.Popen(command, cwd=workdir, env=env)
+        try:
+            _wait_healthy(f"http://127.0.0.1:{port}", process, startup_timeout)
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def _wait_healthy(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server did not become healthy within {timeout}s")
+
+
+def print_table(report: Dict[str, Any]) -> None:
+    print(f"{'clients':>8} {'endpoint':>8} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9}")
+    for stage in report["stages"]:
+        for endpoint, row in stage["endpoints"].items():
+            print(
+                f"{stage['concurrency']:>8} {endpoint:>8} {row['requests']:>7} {row['throughput_rps']:>8} "
+                f"{row['error_rate'] * 100:>6.1f} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load test of /upload-pdf/, /ask and /status")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of a running app")
+    parser.add_argument("--spawn", action="store_true", help="Start the app locally with stand-in models instead")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated ramp of concurrent clients")
+    parser.add_argument("--stage-seconds", type=float, default=30.0, help="Duration of each concurrency stage")
+    parser.add_argument("--mix", default="ask=0.8,status=0.2", help="Endpoint weights, e.g. ask=0.7,status=0.2,upload=0.1")
+    parser.add_argument("--pdf", default=SAMPLE_PDF, help="PDF uploaded before the ramp (and by upload requests)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    options = {
+        "concurrency": [int(level) for level in args.concurrency.split(",")],
+        "stage_seconds": args.stage_seconds,
+        "mix": parse_mix(args.mix),
+        "pdf_path": args.pdf,
+        "timeout": args.timeout,
+        "seed": args.seed
+    }
+    if args.spawn:
+        with spawn_server(args.port, workers=args.workers) as base_url:
+            report = asyncio.run(run_load_test(base_url, **options))
+        report["meta"]["spawned_workers"] = args.workers
+    else:
+        report = asyncio.run(run_load_test(args.url, **options))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#benchmarks/run.py
+import os
+
+if __name__ == "__main__":
+    # Benchmarks never call external providers or write traces; set before config is imported
+    os.environ.setdefault("EMBEDDINGS_PROVIDER", "local")
+    os.environ.setdefault("LLM_PROVIDER", "local")
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    os.environ.setdefault("STATE_BACKEND", "memory")
+
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from benchmarks import stages
+from benchmarks.corpus import SAMPLE_PDF, generate_pdf, synthetic_text
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extraction", "splitting", "embedding", "index_insert", "retrieval", "ask")
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, timeout=10,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def environment() -> Dict[str, Any]:
+    import chromadb
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "chromadb": chromadb.__version__,
+        "embedding_dim": config.LOCAL_EMBEDDING_DIM,
+        "retrieval_mode": config.RETRIEVAL_MODE
+    }
+
+
+def run_benchmarks(
+    only: Optional[List[str]] = None,
+    large_pages: int = 300,
+    retrieval_sizes: Optional[List[int]] = None,
+    embed_chunks: int = 5000,
+    insert_chunks: int = 10000,
+    queries: int = 200,
+    ask_requests: int = 50,
+    repeat: int = 3
+) -> Dict[str, Any]:
+    """
+    Run the selected stages and return {"meta": ..., "results": {stage: ...}}
+    """
+    selected = only or list(STAGES)
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark stages: {', '.join(sorted(unknown))}")
+    retrieval_sizes = retrieval_sizes or [1000, 10000, 100000]
+
+    pdfs = [SAMPLE_PDF]
+    if large_pages and any(stage in selected for stage in ("extraction", "splitting")):
+        pdfs.append(generate_pdf(large_pages))
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        runners: Dict[str, Callable[[], Any]] = {
+            "extraction": lambda: stages.bench_extraction(pdfs, repeat=repeat),
+            "splitting": lambda: stages.bench_splitting(_texts(pdfs), repeat=repeat),
+            "embedding": lambda: stages.bench_embedding(chunk_count=embed_chunks),
+            "index_insert": lambda: stages.bench_index_insert(
+                os.path.join(workdir, "insert"), chunk_count=insert_chunks
+            ),
+            "retrieval": lambda: stages.bench_retrieval(
+                os.path.join(workdir, "retrieval"), sizes=retrieval_sizes, queries=queries
+            ),
+            "ask": lambda: stages.bench_ask(SAMPLE_PDF, workdir, requests=ask_requests),
+        }
+        for stage in STAGES:
+            if stage not in selected:
+                continue
+            logger.info(f"Benchmarking {stage}")
+            start = time.perf_counter()
+            results[stage] = runners[stage]()
+            timings[stage] = round(time.perf_counter() - start, 2)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "environment": environment(),
+            "parameters": {
+                "large_pages": large_pages,
+                "retrieval_sizes": retrieval_sizes,
+                "embed_chunks": embed_chunks,
+                "insert_chunks": insert_chunks,
+                "queries": queries,
+                "ask_requests": ask_requests,
+                "repeat": repeat
+            },
+            "stage_seconds": timings
+        },
+        "results": results
+    }
+
+
+def _texts(pdfs: List[str]) -> Dict[str, str]:
+    from app.utils import extract_text_from_pdf
+
+    texts = {os.path.basename(path): extract_text_from_pdf(path) for path in pdfs}
+    texts["synthetic-10mb"] = synthetic_text(10_000_000)
+    return texts
+
+
+def default_output_path(report: Dict[str, Any]) -> str:
+    commit = report["meta"]["git"]["commit"] or "nogit"
+    return os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every ingestion and query stage")
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--only", default=None, help=f"Comma-separated stages: {','.join(STAGES)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller corpora and indexes (no 100k retrieval)")
+    parser.add_argument("--large-pages", type=int, default=None, help="Pages in the generated large PDF")
+    parser.add_argument("--retrieval-sizes", default=None, help="Comma-separated index sizes in chunks")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
+
+    sizes = [int(size) for size in args.retrieval_sizes.split(",")] if args.retrieval_sizes else (
+        [1000, 10000] if args.quick else [1000, 10000, 100000]
+    )
+    report = run_benchmarks(
+        only=[stage.strip() for stage in args.only.split(",")] if args.only else None,
+        large_pages=args.large_pages if args.large_pages is not None else (60 if args.quick else 300),
+        retrieval_sizes=sizes,
+        embed_chunks=1000 if args.quick else 5000,
+        insert_chunks=2000 if args.quick else 10000,
+        queries=50 if args.quick else 200,
+        ask_requests=20 if args.quick else 50,
+        repeat=args.repeat
+    )
+
+    out = args.out or default_output_path(report)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
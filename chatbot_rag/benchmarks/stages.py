@@ -0,0 +1,292 @@
+#benchmarks/stages.py
+import os
+import time
+import random
+import statistics
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+import config
+from benchmarks.corpus import synthetic_chunks, synthetic_sentence
+
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    p50/p90/p99/mean of latencies in seconds, reported in milliseconds
+    """
+    values = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p90_ms": round(float(np.percentile(values, 90)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "mean_ms": round(float(values.mean()), 4)
+    }
+
+
+def repeat_timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def rate(amount: float, seconds: float) -> float:
+    return round(amount / seconds, 2) if seconds > 0 else float("inf")
+
+
+# --- INGESTION STAGES ---
+def bench_extraction(pdf_paths: Iterable[str], repeat: int = 3) -> Dict[str, Any]:
+    """
+    Pages/sec and MB/sec of PDF text extraction (median of repeats, no extraction cache)
+    """
+    from app.utils import extract_pages_from_pdf
+
+    results = {}
+    for path in pdf_paths:
+        pages = extract_pages_from_pdf(path)
+        seconds = statistics.median(repeat_timed(lambda: extract_pages_from_pdf(path), repeat))
+        size_mb = os.path.getsize(path) / 1e6
+        results[os.path.basename(path)] = {
+            "pages": len(pages),
+            "file_mb": round(size_mb, 3),
+            "seconds": round(seconds, 4),
+            "pages_per_sec": rate(len(pages), seconds),
+            "mb_per_sec": rate(size_mb, seconds)
+        }
+    return results
+
+
+def bench_splitting(texts: Dict[str, str], repeat: int = 3) -> Dict[str, Any]:
+    """
+    MB/sec of the recursive character splitter used for every upload
+    """
+    from app.rag_pipeline import split_text
+
+    results = {}
+    for name, text in texts.items():
+        chunks = split_text(text)
+        seconds = statistics.median(repeat_timed(lambda: split_text(text), repeat))
+        size_mb = len(text.encode("utf-8")) / 1e6
+        results[name] = {
+            "text_mb": round(size_mb, 3),
+            "chunks": len(chunks),
+            "seconds": round(seconds, 4),
+            "mb_per_sec": rate(size_mb, seconds)
+        }
+    return results
+
+
+def bench_embedding(
+    chunk_count: int = 5000,
+    batch_sizes: Sequence[int] = (16, 100, 500),
+    dimension: int = config.LOCAL_EMBEDDING_DIM
+) -> Dict[str, Any]:
+    """
+    Chunks/sec through embed_chunks_batched with the offline hashing embedder, so the numbers
+    measure our batching overhead rather than a provider's network latency
+    """
+    from app.providers import HashingEmbeddings
+    from app.rag_pipeline import embed_chunks_batched
+
+    chunks = synthetic_chunks(chunk_count, seed=1)
+    embeddings = HashingEmbeddings(dimension=dimension)
+    results = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        embed_chunks_batched(chunks, embeddings=embeddings, batch_size=batch_size)
+        seconds = time.perf_counter() - start
+        results[f"batch_{batch_size}"] = {
+            "chunks": chunk_count,
+            "seconds": round(seconds, 4),
+            "chunks_per_sec": rate(chunk_count, seconds),
+            "batches_per_sec": rate(-(-chunk_count // batch_size), seconds)
+        }
+    return results
+
+
+def _open_collection(persist_dir: str, name: str, embeddings):
+    from app.rag_pipeline import Chroma
+    return Chroma(collection_name=name, embedding_function=embeddings, persist_directory=persist_dir)
+
+
+def _fill_collection(store, chunks: List[str], vectors: List[List[float]], batch_size: int) -> float:
+    from app.rag_pipeline import index_embedded_chunks
+
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), batch_size):
+        end = offset + batch_size
+        index_embedded_chunks(
+            store,
+            chunks[offset:end],
+            vectors[offset:end],
+            ids=[f"chunk-{i}" for i in range(offset, min(end, len(chunks)))],
+            metadatas=[{"source": "benchmark", "chunk": i} for i in range(offset, min(end, len(chunks)))]
+        )
+    return time.perf_counter() - start
+
+
+def bench_index_insert(
+    persist_dir: str,
+    chunk_count: int = 10000,
+    batch_size: int = 1000,
+    dimension: int = config.LOCAL_EMBEDDING_DIM
+) -> Dict[str, Any]:
+    """
+    Chunks/sec upserted into a persistent Chroma collection (embeddings precomputed)
+    """
+    from app.providers import HashingEmbeddings
+
+    embeddings = HashingEmbeddings(dimension=dimension)
+    chunks = synthetic_chunks(chunk_count, seed=2)
+    vectors = embeddings.embed_documents(chunks)
+    store = _open_collection(persist_dir, "bench-insert", embeddings)
+    seconds = _fill_collection(store, chunks, vectors, batch_size)
+    return {
+        "chunks": chunk_count,
+        "batch_size": batch_size,
+        "seconds": round(seconds, 4),
+        "chunks_per_sec": rate(chunk_count, seconds)
+    }
+
+
+def bench_retrieval(
+    persist_dir: str,
+    sizes: Sequence[int] = (1000, 10000, 100000),
+    queries: int = 200,
+    k: int = 4,
+    dimension: int = config.LOCAL_EMBEDDING_DIM
+) -> Dict[str, Any]:
+    """
+    Retrieval latency at several index sizes: the raw vector search, and the configured retriever
+    (query embedding plus similarity or MMR selection, as get_qa_chain builds it)
+    """
+    from app.providers import HashingEmbeddings
+    from app.mmr import get_mmr_retriever
+
+    embeddings = HashingEmbeddings(dimension=dimension)
+    rng = random.Random(3)
+    questions = [synthetic_sentence(rng, words=8) for _ in range(queries)]
+    query_vectors = embeddings.embed_documents(questions)
+
+    results = {}
+    for size in sizes:
+        chunks = synthetic_chunks(size, seed=4)
+        store = _open_collection(persist_dir, f"bench-retrieval-{size}", embeddings)
+        build_seconds = _fill_collection(store, chunks, embeddings.embed_documents(chunks), batch_size=5000)
+
+        if config.RETRIEVAL_MODE == "mmr":
+            retriever = get_mmr_retriever(store, max_k=k)
+        else:
+            retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": k})
+
+        # One untimed query per path so lazy index loading is not counted
+        store.similarity_search_by_vector(query_vectors[0], k=k)
+        retriever.invoke(questions[0])
+
+        vector_search = [_time_once(lambda v=v: store.similarity_search_by_vector(v, k=k)) for v in query_vectors]
+        retriever_latency = [_time_once(lambda q=q: retriever.invoke(q)) for q in questions]
+        results[f"chunks_{size}"] = {
+            "chunks": size,
+            "build_seconds": round(build_seconds, 3),
+            "vector_search": latency_summary(vector_search),
+            "retriever": latency_summary(retriever_latency),
+            "retrieval_mode": config.RETRIEVAL_MODE
+        }
+    return results
+
+
+def _time_once(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+# --- END TO END ---
+@contextmanager
+def offline_app_config(workdir: str):
+    """
+    Point the app at local providers with zero model latency, in-memory state and no AWS,
+    so /ask timings are the service's own overhead
+    """
+    overrides = {
+        "EMBEDDINGS_PROVIDER": "local",
+        "LLM_PROVIDER": "local",
+        "LOCAL_LLM_FIRST_TOKEN_MS": 0.0,
+        "LOCAL_LLM_TOKEN_MS": 0.0,
+        "AWS_AVAILABLE": False,
+    }
+    from chromadb.api.client import SharedSystemClient
+
+    saved = {name: getattr(config, name) for name in overrides}
+    cwd = os.getcwd()
+    try:
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        os.chdir(workdir)
+        # app.main creates its upload directory at import, relative to the cwd at that time
+        os.makedirs("data", exist_ok=True)
+        # Chroma caches clients by (relative) path; those from another directory must not be reused
+        SharedSystemClient.clear_system_cache()
+        yield
+    finally:
+        SharedSystemClient.clear_system_cache()
+        os.chdir(cwd)
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def bench_ask(pdf_path: str, workdir: str, requests: int = 50) -> Dict[str, Any]:
+    """
+    End-to-end /upload-pdf/ and /ask through the ASGI stack, against the bare chain call,
+    with a zero-latency fake model: the difference is the API's own overhead
+    """
+    from fastapi.testclient import TestClient
+    from app.clients import clear_registry
+    from app.state import MemoryStateStore, set_state_store
+
+    with offline_app_config(workdir):
+        clear_registry()
+        set_state_store(MemoryStateStore())
+        import app.main as main
+        main.qa_chains.clear()
+        limiter_enabled = main.limiter.enabled
+        main.limiter.enabled = False
+        try:
+            client = TestClient(main.app)
+            with open(pdf_path, "rb") as f:
+                start = time.perf_counter()
+                upload = client.post("/upload-pdf/", files={"file": (os.path.basename(pdf_path), f, "application/pdf")})
+                upload_seconds = time.perf_counter() - start
+            upload.raise_for_status()
+
+            rng = random.Random(5)
+            questions = [synthetic_sentence(rng, words=8) for _ in range(requests)]
+            client.post("/ask", data={"question": questions[0]}).raise_for_status()
+
+            ask_latency = []
+            for question in questions:
+                start = time.perf_counter()
+                client.post("/ask", data={"question": question}).raise_for_status()
+                ask_latency.append(time.perf_counter() - start)
+
+            from app.state import get_state_store
+            chain = main.get_chain_for(get_state_store().get_current_document())
+            chain_latency = [_time_once(lambda q=q: chain.invoke({"query": q})) for q in questions]
+        finally:
+            main.limiter.enabled = limiter_enabled
+            set_state_store(None)
+            clear_registry()
+
+    ask = latency_summary(ask_latency)
+    chain_only = latency_summary(chain_latency)
+    return {
+        "upload_seconds": round(upload_seconds, 4),
+        "ask": ask,
+        "chain_only": chain_only,
+        "api_overhead_p50_ms": round(ask["p50_ms"] - chain_only["p50_ms"], 4)
+    }
@@ -0,0 +1,384 @@
+#benchmarks/workload.py
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+from benchmarks.corpus import SAMPLE_PDF
+from benchmarks.loadtest import RESULTS_DIR, percentiles, spawn_server
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_FORMAT = "rag-workload"
+WORKLOAD_VERSION = 1
+
+REPLAY_ENDPOINTS = ("ask", "ask-all")
+
+
+class WorkloadRecord:
+    """
+    One recorded question: seconds since the first record, the question, its document and
+    the server-side response time that was recorded for it
+    """
+
+    __slots__ = ("offset", "query", "pdf_name", "response_time")
+
+    def __init__(self, offset: float, query: str, pdf_name: Optional[str], response_time: Optional[float]):
+        self.offset = offset
+        self.query = query
+        self.pdf_name = pdf_name
+        self.response_time = response_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Short keys keep workload files small; absent fields are omitted
+        row: Dict[str, Any] = {"t": round(self.offset, 3), "q": self.query}
+        if self.pdf_name:
+            row["pdf"] = self.pdf_name
+        if self.response_time is not None:
+            row["rt"] = self.response_time
+        return row
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "WorkloadRecord":
+        return cls(float(row["t"]), row["q"], row.get("pdf"), row.get("rt"))
+
+
+def records_from_metrics(items: Iterable[Dict[str, Any]]) -> List[WorkloadRecord]:
+    """
+    LLMMetrics items -> records ordered by arrival, with offsets relative to the first
+    """
+    rows = []
+    for item in items:
+        try:
+            arrived = datetime.fromisoformat(item["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping metrics item without a valid timestamp: {item.get('query_id')}")
+            continue
+        if not item.get("query"):
+            continue
+        response_time = item.get("response_time")
+        rows.append((arrived, item["query"], item.get("pdf_name"), float(response_time) if response_time else None))
+
+    rows.sort(key=lambda row: row[0])
+    if not rows:
+        return []
+    first = rows[0][0]
+    return [WorkloadRecord(arrived - first, query, pdf, rt) for arrived, query, pdf, rt in rows]
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_workload(path: str, records: Sequence[WorkloadRecord], source: Dict[str, Any]) -> None:
+    """
+    JSON Lines (gzipped when the path ends in .gz): a header line, then one record per line
+    """
+    header = {
+        "format": WORKLOAD_FORMAT,
+        "version": WORKLOAD_VERSION,
+        "records": len(records),
+        "duration_seconds": round(records[-1].offset, 3) if records else 0.0,
+        "source": source
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with _open(path, "w") as f:
+        f.write(json.dumps(header) + "\n")
+        for record in records:
+            f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+
+
+def read_workload(path: str) -> List[WorkloadRecord]:
+    with _open(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != WORKLOAD_FORMAT:
+            raise ValueError(f"{path} is not a workload file")
+        if header.get("version") != WORKLOAD_VERSION:
+            raise ValueError(f"Unsupported workload version {header.get('version')}")
+        return [WorkloadRecord.from_dict(json.loads(line)) for line in f if line.strip()]
+
+
+def export_workload(path: str, since: Optional[str] = None, until: Optional[str] = None, limit: Optional[int] = None) -> int:
+    """
+    Capture LLMMetrics history (optionally a time window) into a workload file
+    """
+    from aws_service.dynamo_handler import scan_llm_metrics
+
+    records = records_from_metrics(scan_llm_metrics(since=since, until=until, limit=limit))
+    write_workload(path, records, {"table": "LLMMetrics", "since": since, "until": until})
+    logger.info(f"Exported {len(records)} queries to {path}")
+    return len(records)
+
+
+def schedule(records: Sequence[WorkloadRecord], speedup: float = 1.0, max_gap: Optional[float] = None) -> List[float]:
+    """
+    Send times (seconds from replay start): recorded inter-arrival gaps, each capped at max_gap,
+    divided by speedup
+    """
+    if speedup <= 0:
+        raise ValueError("speedup must be positive")
+    times: List[float] = []
+    previous_offset = 0.0
+    current = 0.0
+    for record in records:
+        gap = record.offset - previous_offset
+        if max_gap is not None:
+            gap = min(gap, max_gap)
+        current += gap / speedup
+        times.append(current)
+        previous_offset = record.offset
+    return times
+
+
+def ks_statistic(a: Sequence[float], b: Sequence[float]) -> Optional[float]:
+    """
+    Two-sample Kolmogorov-Smirnov statistic: the largest gap between the empirical CDFs (0 = same shape)
+    """
+    if not a or not b:
+        return None
+    a_sorted, b_sorted = np.sort(a), np.sort(b)
+    points = np.concatenate([a_sorted, b_sorted])
+    cdf_a = np.searchsorted(a_sorted, points, side="right") / len(a_sorted)
+    cdf_b = np.searchsorted(b_sorted, points, side="right") / len(b_sorted)
+    return round(float(np.max(np.abs(cdf_a - cdf_b))), 4)
+
+
+def compare_distributions(recorded: Sequence[float], replayed: Sequence[float]) -> Dict[str, Any]:
+    """
+    Percentiles of both runs, the replay/recorded ratio at each, and the KS statistic
+    """
+    before, after = percentiles(recorded), percentiles(replayed)
+    ratios = {
+        key.replace("_ms", "_ratio"): round(after[key] / before[key], 3) if before[key] and after[key] is not None else None
+        for key in before
+    }
+    return {
+        "recorded": {"count": len(recorded), **before},
+        "replayed": {"count": len(replayed), **after},
+        "ratios": ratios,
+        "ks_statistic": ks_statistic(recorded, replayed)
+    }
+
+
+class Replayer:
+    """
+    Open-loop replay: requests go out at their scheduled times whether or not earlier ones have
+    answered, and latency is measured from the scheduled time, so a slow server cannot hide its
+    queueing by slowing the load down
+    """
+
+    def __init__(self, client: httpx.AsyncClient, endpoint: str = "ask", max_in_flight: int = 256):
+        if endpoint not in REPLAY_ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {endpoint!r}; use one of {REPLAY_ENDPOINTS}")
+        self.client = client
+        self.endpoint = endpoint
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.client_latency: List[float] = []
+        self.server_latency: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+        self.max_lag = 0.0
+
+    async def send(self, record: WorkloadRecord) -> httpx.Response:
+        if self.endpoint == "ask-all":
+            data = {"question": record.query}
+            if record.pdf_name:
+                data["filenames"] = record.pdf_name
+            return await self.client.post("/ask-all", data=data)
+        return await self.client.post("/ask", data={"question": record.query})
+
+    async def _one(self, record: WorkloadRecord, scheduled: float) -> None:
+        async with self._slots:
+            try:
+                response = await self.send(record)
+                status: Optional[int] = response.status_code
+            except httpx.HTTPError as e:
+                logger.debug(f"Replay request failed: {e}")
+                response, status = None, None
+            self.client_latency.append(time.perf_counter() - scheduled)
+
+        key = str(status) if status is not None else "transport_error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if response is None or response.status_code >= 400:
+            self.errors += 1
+            return
+        server_time = response.json().get("response_time")
+        if server_time is not None:
+            self.server_latency.append(float(server_time))
+
+    async def run(self, records: Sequence[WorkloadRecord], send_times: Sequence[float]) -> float:
+        start = time.perf_counter()
+        tasks = []
+        for record, at in zip(records, send_times):
+            scheduled = start + at
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_lag = max(self.max_lag, -delay)
+            tasks.append(asyncio.create_task(self._one(record, scheduled)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+async def _upload(client: httpx.AsyncClient, path: str) -> None:
+    with open(path, "rb") as f:
+        response = await client.post(
+            "/upload-pdf/", files={"file": (os.path.basename(path), f.read(), "application/pdf")}
+        )
+    if response.status_code >= 400:
+        raise RuntimeError(f"Uploading {path} failed with {response.status_code}: {response.text[:200]}")
+
+
+def documents_to_upload(records: Sequence[WorkloadRecord], pdf_dir: Optional[str], fallback_pdf: Optional[str]) -> List[str]:
+    """
+    The recorded documents found in pdf_dir, or the fallback PDF when none of them are available
+    """
+    paths = []
+    if pdf_dir:
+        for name in sorted({record.pdf_name for record in records if record.pdf_name}):
+            path = os.path.join(pdf_dir, name)
+            if os.path.isfile(path):
+                paths.append(path)
+            else:
+                logger.warning(f"Recorded document {name} is not in {pdf_dir}")
+    if not paths and fallback_pdf:
+        paths.append(fallback_pdf)
+    return paths
+
+
+async def replay_workload(
+    records: Sequence[WorkloadRecord],
+    base_url: str = "http://127.0.0.1:8000",
+    speedup: float = 1.0,
+    max_gap: Optional[float] = None,
+    endpoint: str = "ask",
+    pdf_dir: Optional[str] = None,
+    fallback_pdf: Optional[str] = SAMPLE_PDF,
+    max_in_flight: int = 256,
+    timeout: float = 120.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict[str, Any]:
+    """
+    Upload the workload's documents, replay its questions on the recorded timeline
+    (accelerated by speedup) and compare the latency distributions
+    """
+    send_times = schedule(records, speedup=speedup, max_gap=max_gap)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as client:
+        uploaded = documents_to_upload(records, pdf_dir, fallback_pdf)
+        for path in uploaded:
+            await _upload(client, path)
+        replayer = Replayer(client, endpoint=endpoint, max_in_flight=max_in_flight)
+        elapsed = await replayer.run(records, send_times)
+
+    recorded = [record.response_time for record in records if record.response_time is not None]
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "base_url": base_url,
+            "endpoint": endpoint,
+            "records": len(records),
+            "speedup": speedup,
+            "max_gap_seconds": max_gap,
+            "uploaded": [os.path.basename(path) for path in uploaded]
+        },
+        "replay": {
+            "seconds": round(elapsed, 3),
+            "scheduled_seconds": round(send_times[-1], 3) if send_times else 0.0,
+            "throughput_rps": round(len(records) / elapsed, 2) if elapsed > 0 else 0.0,
+            "errors": replayer.errors,
+            "error_rate": round(replayer.errors / len(records), 4) if records else 0.0,
+            "status_codes": dict(sorted(replayer.status_codes.items())),
+            "max_send_lag_ms": round(replayer.max_lag * 1000, 3),
+            "client_latency": percentiles(replayer.client_latency)
+        },
+        # Recorded and replayed response_time are both measured by the server around the chain call
+        "server_latency": compare_distributions(recorded, replayer.server_latency)
+    }
+
+
+def print_comparison(report: Dict[str, Any]) -> None:
+    comparison = report["server_latency"]
+    print(f"{'':>10} {'count':>7} {'p50ms':>10} {'p95ms':>10} {'p99ms':>10} {'maxms':>10}")
+    for run in ("recorded", "replayed"):
+        row = comparison[run]
+        print(f"{run:>10} {row['count']:>7} {row['p50_ms']!s:>10} {row['p95_ms']!s:>10} {row['p99_ms']!s:>10} {row['max_ms']!s:>10}")
+    ratios = comparison["ratios"]
+    print(f"{'ratio':>10} {'':>7} {ratios['p50_ratio']!s:>10} {ratios['p95_ratio']!s:>10} {ratios['p99_ratio']!s:>10} {ratios['max_ratio']!s:>10}")
+    print(f"KS statistic: {comparison['ks_statistic']}  errors: {report['replay']['errors']}  "
+          f"client p99: {report['replay']['client_latency']['p99_ms']} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Capture LLMMetrics history as a workload and replay it")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write LLMMetrics records to a workload file")
+    export.add_argument("--out", required=True, help="Workload file (.jsonl or .jsonl.gz)")
+    export.add_argument("--since", default=None, help="ISO timestamp (UTC) of the first query to include")
+    export.add_argument("--until", default=None, help="ISO timestamp (UTC) of the last query to include")
+    export.add_argument("--limit", type=int, default=None)
+
+    replay = commands.add_parser("replay", help="Replay a workload file and compare latencies")
+    replay.add_argument("workload", help="Workload file written by export")
+    replay.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of a running app")
+    replay.add_argument("--spawn", action="store_true", help="Start the app locally with stand-in models instead")
+    replay.add_argument("--port", type=int, default=8766, help="Port for --spawn")
+    replay.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    replay.add_argument("--speedup", type=float, default=1.0, help="Replay this many times faster than recorded")
+    replay.add_argument("--max-gap", type=float, default=None, help="Cap idle gaps between queries (recorded seconds)")
+    replay.add_argument("--endpoint", choices=REPLAY_ENDPOINTS, default="ask",
+                        help="ask: every query against one document; ask-all: each query filtered to its recorded document")
+    replay.add_argument("--pdf-dir", default=None, help="Directory holding the recorded documents, uploaded first")
+    replay.add_argument("--pdf", default=SAMPLE_PDF, help="Uploaded when none of the recorded documents are available")
+    replay.add_argument("--max-in-flight", type=int, default=256)
+    replay.add_argument("--out", default=None, help="Result file (default: benchmarks/results/replay-<time>.json)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "export":
+        export_workload(args.out, since=args.since, until=args.until, limit=args.limit)
+        return 0
+
+    records = read_workload(args.workload)
+    if not records:
+        print("Workload is empty")
+        return 1
+    options = {
+        "speedup": args.speedup,
+        "max_gap": args.max_gap,
+        "endpoint": args.endpoint,
+        "pdf_dir": args.pdf_dir,
+        "fallback_pdf": args.pdf,
+        "max_in_flight": args.max_in_flight
+    }
+    if args.spawn:
+        with spawn_server(args.port, workers=args.workers) as base_url:
+            report = asyncio.run(replay_workload(records, base_url, **options))
+    else:
+        report = asyncio.run(replay_workload(records, args.url, **options))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"replay-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_comparison(report)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
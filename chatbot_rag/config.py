@@ -23,8 +23,113 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "pdf-storage-bucket")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "52428800"))  # 50MB in bytes
 
-# Check if AWS services are available
-AWS_AVAILABLE = True
+# Extraction artifact store (per-page PDF text keyed by file SHA-256)
+EXTRACTION_STORE_DIR = os.getenv("EXTRACTION_STORE_DIR", "extraction_store")
+EXTRACTION_STORE_ENABLED = os.getenv("EXTRACTION_STORE_ENABLED", "true").lower() == "true"
+
+# Context packing between the retriever and the LLM
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Retrieval: "mmr" over-fetches and diversifies with an adaptive k, "similarity" is plain top-k
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "mmr")
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+RETRIEVAL_MIN_K = int(os.getenv("RETRIEVAL_MIN_K", "1"))
+RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0.0"))
+RETRIEVAL_ELBOW_GAP = float(os.getenv("RETRIEVAL_ELBOW_GAP", "0.08"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Conversational sessions
+CONVERSATION_HISTORY_TOKENS = int(os.getenv("CONVERSATION_HISTORY_TOKENS", "800"))
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+# Lease that serializes turns of one session across workers; outlives the longest request
+SESSION_LOCK_TTL_SECONDS = float(os.getenv("SESSION_LOCK_TTL_SECONDS", "130"))
+SESSION_LOCK_WAIT_SECONDS = float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "130"))
+
+# Shared state across workers/nodes: "sqlite" (one node), "dynamodb" (many nodes) or "memory"
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "vectorstore")
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state/rag_state.db")
+STATE_TABLE_NAME = os.getenv("STATE_TABLE_NAME", "RAG_State")
+
+# Startup: DynamoDB table bootstrap runs in the background with a per-attempt timeout
+AWS_BOOTSTRAP_TIMEOUT_SECONDS = float(os.getenv("AWS_BOOTSTRAP_TIMEOUT_SECONDS", "10"))
+AWS_BOOTSTRAP_ATTEMPTS = int(os.getenv("AWS_BOOTSTRAP_ATTEMPTS", "5"))
+
+# LLM tail latency: hedge a second attempt after the learned p95, and trip a breaker on error spikes
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", "4.0"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.5"))
+HEDGE_MAX_DELAY_SECONDS = float(os.getenv("HEDGE_MAX_DELAY_SECONDS", "10.0"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "10"))
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "15"))
+
+# Model routing: models ordered fastest first; the full model is used for complex questions
+# when the caller's latency budget allows it
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_MODELS = os.getenv("ROUTER_MODELS", "gemini-1.5-flash-8b,gemini-1.5-flash")
+ROUTER_PRIOR_SECONDS = os.getenv("ROUTER_PRIOR_SECONDS", "1.5,3.0")
+ROUTER_COMPLEX_QUESTION_TOKENS = int(os.getenv("ROUTER_COMPLEX_QUESTION_TOKENS", "40"))
+ROUTER_MODEL_CONCURRENCY = int(os.getenv("ROUTER_MODEL_CONCURRENCY", "8"))
+
+# Request deadlines: default/maximum budget per request, and the time an optional stage
+# (context packing, MMR re-ranking, metrics persistence) needs left to still run
+DEADLINE_DEFAULT_SECONDS = float(os.getenv("DEADLINE_DEFAULT_SECONDS", "30"))
+DEADLINE_MAX_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "120"))
+DEADLINE_OPTIONAL_STAGE_SECONDS = float(os.getenv("DEADLINE_OPTIONAL_STAGE_SECONDS", "1.0"))
+
+# Tracing: a sampled share of requests (or any request whose traceparent header is sampled)
+# is exported as OpenTelemetry spans to a JSONL file or an OTLP collector
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")  # file, otlp or none
+TRACE_FILE = os.getenv("TRACE_FILE", "traces/spans.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4317")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "chatbot-rag")
+
+# Admin-only profiling: requests with X-Admin-Token can ask to be profiled (disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.005"))
+
+# Model providers: "google" (Gemini APIs) or "local" (offline hashing embedder and fake
+# streaming chat model, for benchmarks and load tests; GOOGLE_API_KEY is then not needed)
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "google")
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "384"))
+LOCAL_LLM_FIRST_TOKEN_MS = float(os.getenv("LOCAL_LLM_FIRST_TOKEN_MS", "300"))
+LOCAL_LLM_TOKEN_MS = float(os.getenv("LOCAL_LLM_TOKEN_MS", "15"))
+LOCAL_LLM_LATENCY_SIGMA = float(os.getenv("LOCAL_LLM_LATENCY_SIGMA", "0.4"))
+LOCAL_LLM_RESPONSE_TOKENS = int(os.getenv("LOCAL_LLM_RESPONSE_TOKENS", "48"))
+LOCAL_LLM_SEED = int(os.environ["LOCAL_LLM_SEED"]) if os.getenv("LOCAL_LLM_SEED") else None
+
+# Document catalog: S3/DynamoDB listings are merged in the background, requests read memory only
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "300"))
+CATALOG_RESPONSE_LIMIT = int(os.getenv("CATALOG_RESPONSE_LIMIT", "1000"))
+
+# Document storage: data/ is a size-bounded LRU cache of the S3 bucket; copies already in S3 are
+# evicted when it is full and fetched back with parallel ranged GETs when needed again
+STORAGE_CACHE_MAX_BYTES = int(os.getenv("STORAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+STORAGE_PART_SIZE_BYTES = int(os.getenv("STORAGE_PART_SIZE_BYTES", str(8 * 1024 ** 2)))
+STORAGE_DOWNLOAD_WORKERS = int(os.getenv("STORAGE_DOWNLOAD_WORKERS", "8"))
+
+# Index snapshots in S3: a node with an empty vector store imports the latest snapshot on startup
+# instead of re-embedding every document. Parts hold SNAPSHOT_PART_ROWS chunks each.
+SNAPSHOT_PREFIX = os.getenv("SNAPSHOT_PREFIX", "index-snapshots")
+SNAPSHOT_IMPORT_ON_STARTUP = os.getenv("SNAPSHOT_IMPORT_ON_STARTUP", "true").lower() == "true"
+SNAPSHOT_PART_ROWS = int(os.getenv("SNAPSHOT_PART_ROWS", "10000"))
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "8"))
+SNAPSHOT_COMPRESSION_LEVEL = int(os.getenv("SNAPSHOT_COMPRESSION_LEVEL", "6"))
+
+# Per-IP rate limits on /upload-pdf/ and /ask; load tests from one client address turn them off
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# Check if AWS services are available (AWS_AVAILABLE=false runs without LocalStack)
+AWS_AVAILABLE = os.getenv("AWS_AVAILABLE", "true").lower() == "true"
 
 # print(f"Using LocalStack endpoint: {ENDPOINT_URL}")
 # print(f"S3 Bucket: {S3_BUCKET_NAME}")
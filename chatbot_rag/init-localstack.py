@@ -66,6 +66,38 @@ def create_s3_bucket():
     except Exception as e:
         print(f"❌ Error creating S3 bucket: {e}")
 
+# Secondary indexes: a user's documents by upload time, and a PDF's queries by time
+PDF_METADATA_USER_INDEX = {
+    'IndexName': 'user_id-upload_timestamp-index',
+    'KeySchema': [
+        {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+        {'AttributeName': 'upload_timestamp', 'KeyType': 'RANGE'}
+    ],
+    'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['status']}
+}
+LLM_METRICS_PDF_INDEX = {
+    'IndexName': 'pdf_name-timestamp-index',
+    'KeySchema': [
+        {'AttributeName': 'pdf_name', 'KeyType': 'HASH'},
+        {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+    ],
+    'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['query', 'response_time', 'response_length']}
+}
+
+def add_index_if_missing(client, table_name, index):
+    """Add a global secondary index to a table created before the index existed"""
+    table = client.describe_table(TableName=table_name)['Table']
+    if any(existing['IndexName'] == index['IndexName'] for existing in table.get('GlobalSecondaryIndexes', [])):
+        return
+    client.update_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {'AttributeName': key['AttributeName'], 'AttributeType': 'S'} for key in index['KeySchema']
+        ],
+        GlobalSecondaryIndexUpdates=[{'Create': index}]
+    )
+    print(f"✅ Added index {index['IndexName']} to {table_name}")
+
 def create_dynamodb_tables():
     """Create DynamoDB tables"""
     try:
@@ -87,14 +119,17 @@ def create_dynamodb_tables():
                 ],
                 AttributeDefinitions=[
                     {'AttributeName': 'filename', 'AttributeType': 'S'},
-                    {'AttributeName': 'user_id', 'AttributeType': 'S'}
+                    {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                    {'AttributeName': 'upload_timestamp', 'AttributeType': 'S'}
                 ],
+                GlobalSecondaryIndexes=[PDF_METADATA_USER_INDEX],
                 BillingMode='PAY_PER_REQUEST'
             )
             print("✅ Created PDF_Metadata table")
         except Exception as e:
             if "Table already exists" in str(e):
                 print("✅ PDF_Metadata table already exists")
+                add_index_if_missing(dynamodb.meta.client, 'PDF_Metadata', PDF_METADATA_USER_INDEX)
             else:
                 print(f"❌ Error creating PDF_Metadata table: {e}")
         
@@ -108,17 +143,68 @@ def create_dynamodb_tables():
                 ],
                 AttributeDefinitions=[
                     {'AttributeName': 'query_id', 'AttributeType': 'S'},
-                    {'AttributeName': 'timestamp', 'AttributeType': 'S'}
+                    {'AttributeName': 'timestamp', 'AttributeType': 'S'},
+                    {'AttributeName': 'pdf_name', 'AttributeType': 'S'}
                 ],
+                GlobalSecondaryIndexes=[LLM_METRICS_PDF_INDEX],
                 BillingMode='PAY_PER_REQUEST'
             )
             print("✅ Created LLMMetrics table")
         except Exception as e:
             if "Table already exists" in str(e):
                 print("✅ LLMMetrics table already exists")
+                add_index_if_missing(dynamodb.meta.client, 'LLMMetrics', LLM_METRICS_PDF_INDEX)
             else:
                 print(f"❌ Error creating LLMMetrics table: {e}")
                 
+        # Create RAG_State table (shared state for multi-worker deployments)
+        try:
+            dynamodb.create_table(
+                TableName='RAG_State',
+                KeySchema=[
+                    {'AttributeName': 'key', 'KeyType': 'HASH'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'key', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            dynamodb.meta.client.update_time_to_live(
+                TableName='RAG_State',
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+            )
+            print("✅ Created RAG_State table")
+        except Exception as e:
+            if "Table already exists" in str(e):
+                print("✅ RAG_State table already exists")
+            else:
+                print(f"❌ Error creating RAG_State table: {e}")
+                
+        # Create LLMMetricsRollups table (per-minute/per-hour latency rollups kept by the metrics Lambda)
+        try:
+            dynamodb.create_table(
+                TableName='LLMMetricsRollups',
+                KeySchema=[
+                    {'AttributeName': 'bucket', 'KeyType': 'HASH'},
+                    {'AttributeName': 'series', 'KeyType': 'RANGE'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'bucket', 'AttributeType': 'S'},
+                    {'AttributeName': 'series', 'AttributeType': 'S'}
+                ],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            dynamodb.meta.client.update_time_to_live(
+                TableName='LLMMetricsRollups',
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+            )
+            print("✅ Created LLMMetricsRollups table")
+        except Exception as e:
+            if "Table already exists" in str(e):
+                print("✅ LLMMetricsRollups table already exists")
+            else:
+                print(f"❌ Error creating LLMMetricsRollups table: {e}")
+                
     except Exception as e:
         print(f"❌ Error creating DynamoDB tables: {e}")
 
@@ -1,27 +1,440 @@
 #metrics_lambda/lambda_function.py
 import json
-import boto3
+import math
 import os
-from datetime import datetime
+import time
+import uuid
+import random
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 
-def lambda_handler(event, context):
-    try:
-        dynamodb = boto3.resource(
-            'dynamodb',
-            endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566"),
-            region_name=os.getenv("AWS_REGION", "us-east-1"),
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
+RAW_TABLE = "LLMMetrics"
+ROLLUP_TABLE = os.getenv("ROLLUP_TABLE", "LLMMetricsRollups")
+
+# Quantiles read from a rollup are within this relative error of a recorded response time
+SKETCH_ACCURACY = float(os.getenv("SKETCH_ACCURACY", "0.01"))
+SKETCH_MAX_BINS = int(os.getenv("SKETCH_MAX_BINS", "2048"))
+SKETCH_MIN_VALUE = 1e-6
+
+# Minute rollups feed recent dashboards; hour rollups are kept for long-range trends
+MINUTE_TTL_DAYS = int(os.getenv("ROLLUP_MINUTE_TTL_DAYS", "14"))
+HOUR_TTL_DAYS = int(os.getenv("ROLLUP_HOUR_TTL_DAYS", "400"))
+
+MAX_WRITE_ATTEMPTS = 8
+MAX_QUERY_BUCKETS = 1500
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+# Built once per container and reused across warm invocations
+_dynamodb = None
+_tables = {}
+
+def get_table(name=RAW_TABLE):
+    global _dynamodb
+    if name not in _tables:
+        if _dynamodb is None:
+            _dynamodb = boto3.resource(
+                'dynamodb',
+                endpoint_url=os.getenv("ENDPOINT_URL", "http://localhost:4566"),
+                region_name=os.getenv("AWS_REGION", "us-east-1"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
+                config=Config(
+                    connect_timeout=2,
+                    read_timeout=5,
+                    max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "10")),
+                    tcp_keepalive=True
+                )
+            )
+        _tables[name] = _dynamodb.Table(name)
+    return _tables[name]
+
+
+# --- QUANTILE SKETCH ---
+class LatencySketch:
+    """
+    Mergeable quantile sketch (DDSketch-style). Values fall into logarithmic bins whose width is a
+    fixed fraction of their value, so merging two sketches is adding their bin counts, and every
+    quantile is accurate to the sketch's relative accuracy however many sketches were merged.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, bins=None, zeros=0):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = dict(bins or {})
+        self.zeros = zeros
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        if value <= SKETCH_MIN_VALUE:
+            self.zeros += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+            self._collapse()
+
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.zeros += other.zeros
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self._collapse()
+
+    def _collapse(self):
+        # Past the bin limit the lowest bins are folded together: fast answers lose precision, the tail never does
+        if len(self.bins) <= SKETCH_MAX_BINS:
+            return
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - SKETCH_MAX_BINS + 1]
+        target = excess[-1]
+        self.bins[target] = sum(self.bins.pop(index) for index in excess[:-1]) + self.bins[target]
+
+    def quantile(self, q):
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_json(self):
+        return json.dumps(
+            {"a": self.accuracy, "z": self.zeros, "b": {str(k): v for k, v in self.bins.items()}},
+            separators=(",", ":")
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data["a"], {int(k): v for k, v in data["b"].items()}, data["z"])
+
+
+# --- ROLLUPS ---
+class Rollup:
+    """
+    Count, sum, min, max and a quantile sketch of response times for one series in one time bucket
+    """
+
+    def __init__(self, count=0, total=0.0, minimum=None, maximum=None, sketch=None):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        self.sketch = sketch or LatencySketch()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.merge(other.sketch)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        result = {
+            "count": self.count,
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "min": self.minimum,
+            "max": self.maximum
+        }
+        for q in quantiles:
+            value = self.sketch.quantile(q)
+            # The exact extremes are known, so estimates never fall outside them
+            if value is not None:
+                value = round(min(max(value, self.minimum), self.maximum), 6)
+            result[f"p{q * 100:g}"] = value
+        return result
+
+    def to_attributes(self):
+        return {
+            "count": self.count,
+            "sum": Decimal(str(round(self.total, 6))),
+            "min": Decimal(str(round(self.minimum, 6))),
+            "max": Decimal(str(round(self.maximum, 6))),
+            "sketch": self.sketch.to_json()
+        }
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(
+            int(item["count"]), float(item["sum"]), float(item["min"]), float(item["max"]),
+            LatencySketch.from_json(item["sketch"])
         )
-        table = dynamodb.Table("LLMMetrics")
+
+
+def parse_time(value):
+    """
+    ISO timestamp (naive = UTC, or with an offset / Z) -> naive UTC datetime
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def minute_bucket(moment):
+    return "m#" + moment.strftime("%Y-%m-%dT%H:%M")
+
+def hour_bucket(moment):
+    return "h#" + moment.strftime("%Y-%m-%dT%H")
+
+def series_key(pdf_name, model):
+    return f"{pdf_name}#{model}"
+
+def _expires_at(moment, days):
+    return int((moment.replace(tzinfo=timezone.utc) + timedelta(days=days)).timestamp())
+
+
+def extract_events(event):
+    """
+    A single metrics event, {"events": [...]}, or an SQS batch ({"Records": [{"body": json}]})
+    """
+    if "Records" in event:
+        return [json.loads(record["body"]) for record in event["Records"]]
+    if "events" in event:
+        return list(event["events"])
+    return [event]
+
+def event_id(event):
+    """
+    The event's query_id, or one derived from its content so a redelivered event keeps its id
+    """
+    if event.get("query_id"):
+        return event["query_id"]
+    return f"query_{uuid.uuid5(uuid.NAMESPACE_URL, json.dumps(event, sort_keys=True, default=str)).hex}"
+
+def raw_item(event, received):
+    return {
+        "query_id": event_id(event),
+        "timestamp": event.get("timestamp") or received.isoformat(),
+        "query": event.get("query", ""),
+        "response_time": str(event.get("response_time", "")),
+        "response": event.get("response", "")[:1000],
+        "pdf_name": event.get("pdf_name") or "unknown",
+        "model": event.get("model") or "unknown"
+    }
+
+def aggregate(items):
+    """
+    Pre-aggregate a batch in memory: one rollup per (bucket, series), so each is written once
+    """
+    rollups = {}
+    for item in items:
+        try:
+            value = float(item["response_time"])
+            moment = parse_time(item["timestamp"])
+        except (TypeError, ValueError):
+            continue
+        for bucket, ttl_days in ((minute_bucket(moment), MINUTE_TTL_DAYS), (hour_bucket(moment), HOUR_TTL_DAYS)):
+            key = (bucket, series_key(item["pdf_name"], item["model"]))
+            if key not in rollups:
+                rollups[key] = {
+                    "rollup": Rollup(),
+                    "pdf_name": item["pdf_name"],
+                    "model": item["model"],
+                    "expires_at": _expires_at(moment, ttl_days)
+                }
+            rollups[key]["rollup"].add(value)
+    return rollups
+
+def write_rollup(table, bucket, series, entry):
+    """
+    Merge a rollup into its stored item with optimistic concurrency: read the item and its version,
+    merge, and write only if nobody else wrote in between (otherwise re-read and retry).
+    Returns the number of attempts it took.
+    """
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        current = table.get_item(Key={"bucket": bucket, "series": series}, ConsistentRead=True).get("Item")
+        merged = Rollup()
+        if current:
+            merged.merge(Rollup.from_item(current))
+        merged.merge(entry["rollup"])
+
         item = {
-            "query_id": event.get("query_id", str(datetime.utcnow().timestamp())),
-            "timestamp": datetime.utcnow().isoformat(),
-            "query": event.get("query", ""),
-            "response_time": str(event.get("response_time", "")),
-            "response": event.get("response", "")[:1000]
+            "bucket": bucket,
+            "series": series,
+            "pdf_name": entry["pdf_name"],
+            "model": entry["model"],
+            "expires_at": entry["expires_at"],
+            "version": int(current["version"]) + 1 if current else 1,
+            **merged.to_attributes()
         }
-        table.put_item(Item=item)
-        return {"status": "success", "item": item}
+        if current:
+            condition = {
+                "ConditionExpression": "#version = :version",
+                "ExpressionAttributeNames": {"#version": "version"},
+                "ExpressionAttributeValues": {":version": current["version"]}
+            }
+        else:
+            condition = {
+                "ConditionExpression": "attribute_not_exists(#bucket)",
+                "ExpressionAttributeNames": {"#bucket": "bucket"}
+            }
+        try:
+            table.put_item(Item=item, **condition)
+            return attempt
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            time.sleep(random.uniform(0, 0.01 * attempt))
+    raise RuntimeError(f"Gave up updating rollup {bucket} {series} after {MAX_WRITE_ATTEMPTS} conflicting writes")
+
+def store_raw(table, item):
+    """
+    Write a raw event unless its query_id is already stored; returns whether it was new
+    """
+    try:
+        table.put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(#query_id)",
+            ExpressionAttributeNames={"#query_id": "query_id"}
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+
+def record_events(events):
+    """
+    Store raw events and fold them into the rollups. Deliveries are at-least-once (SQS retries a
+    failed batch, a client may resend), so an event counts only the first time its query_id is
+    stored; duplicates within a batch or from a redelivery are skipped. If the rollup merge fails
+    after the raw write, the retried batch leaves those events out of the rollups rather than
+    counting them twice.
+    """
+    received = datetime.utcnow()
+    items, seen = [], set()
+    for event in events:
+        item = raw_item(event, received)
+        if item["query_id"] not in seen:
+            seen.add(item["query_id"])
+            items.append(item)
+
+    # Conditional writes cannot go through batch_writer, which also rejects duplicate keys
+    raw_table = get_table(RAW_TABLE)
+    new_items = [item for item in items if store_raw(raw_table, item)]
+
+    rollup_table = get_table(ROLLUP_TABLE)
+    attempts = 0
+    rollups = aggregate(new_items)
+    for (bucket, series), entry in rollups.items():
+        attempts += write_rollup(rollup_table, bucket, series, entry)
+    return {
+        "stored": len(new_items),
+        "duplicates": len(events) - len(new_items),
+        "rollups_written": len(rollups),
+        "conflicts": attempts - len(rollups),
+        "items": items
+    }
+
+
+# --- QUERIES ---
+def plan_buckets(start, end):
+    """
+    Rollup buckets covering [start, end): hour rollups for whole hours, minute rollups for the ragged edges
+    """
+    moment = start.replace(second=0, microsecond=0)
+    buckets = []
+    while moment < end:
+        if moment.minute == 0 and moment + timedelta(hours=1) <= end:
+            buckets.append(hour_bucket(moment))
+            moment += timedelta(hours=1)
+        else:
+            buckets.append(minute_bucket(moment))
+            moment += timedelta(minutes=1)
+        if len(buckets) > MAX_QUERY_BUCKETS:
+            raise ValueError(f"Time range needs more than {MAX_QUERY_BUCKETS} rollup reads; narrow it")
+    return buckets
+
+def _read_bucket(table, bucket, pdf_name):
+    condition = Key("bucket").eq(bucket)
+    if pdf_name:
+        condition = condition & Key("series").begins_with(f"{pdf_name}#")
+    kwargs = {"KeyConditionExpression": condition}
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def query_rollups(start=None, end=None, pdf_name=None, model=None, group_by=("pdf_name", "model"), quantiles=DEFAULT_QUANTILES):
+    """
+    Latency summary per group over a time range, merged from rollups without touching raw items
+    """
+    end = parse_time(end) if end else datetime.utcnow()
+    start = parse_time(start) if start else end - timedelta(hours=1)
+    if start >= end:
+        raise ValueError("start must be before end")
+    unknown = set(group_by) - {"pdf_name", "model"}
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(sorted(unknown))}")
+
+    table = get_table(ROLLUP_TABLE)
+    buckets = plan_buckets(start, end)
+    groups = {}
+    for bucket in buckets:
+        for item in _read_bucket(table, bucket, pdf_name):
+            # Series keys are prefix-matched; names containing "#" are checked exactly here
+            if (pdf_name and item["pdf_name"] != pdf_name) or (model and item["model"] != model):
+                continue
+            key = tuple(item[field] for field in group_by)
+            groups.setdefault(key, Rollup()).merge(Rollup.from_item(item))
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets_read": len(buckets),
+        "groups": [
+            {**dict(zip(group_by, key)), **rollup.summary(quantiles)}
+            for key, rollup in sorted(groups.items())
+        ]
+    }
+
+
+def lambda_handler(event, context):
+    try:
+        if event.get("action") == "query":
+            result = query_rollups(
+                start=event.get("start"),
+                end=event.get("end"),
+                pdf_name=event.get("pdf_name"),
+                model=event.get("model"),
+                group_by=tuple(event.get("group_by", ("pdf_name", "model"))),
+                quantiles=tuple(event.get("quantiles", DEFAULT_QUANTILES))
+            )
+            return {"status": "success", **result}
+
+        events = extract_events(event)
+        result = record_events(events)
+        items = result.pop("items")
+        if len(events) == 1 and "Records" not in event and "events" not in event:
+            result["item"] = items[0]
+        return {"status": "success", **result}
     except Exception as e:
         return {"status": "error", "message": str(e)}
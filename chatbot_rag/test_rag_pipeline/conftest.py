@@ -8,6 +8,9 @@ from unittest.mock import Mock, patch
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Keep test runs from writing sampled spans to traces/
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
 
 @pytest.fixture(scope="session")
 def test_data_dir():
@@ -105,4 +108,23 @@ def setup_logging():
 def setup_environment():
     """Setup environment variables for tests"""
     with patch.dict(os.environ, {"GOOGLE_API_KEY": "test_api_key"}):
-        yield 
\ No newline at end of file
+        yield 
+
+
+@pytest.fixture(autouse=True)
+def isolated_extraction_store():
+    """Keep extraction artifacts in a temporary directory instead of ./extraction_store"""
+    import app.extraction_store as extraction_store
+    store_dir = tempfile.mkdtemp()
+    with patch("config.EXTRACTION_STORE_DIR", store_dir), patch.object(extraction_store, "_default_store", None):
+        yield store_dir
+    shutil.rmtree(store_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_client_registry():
+    """Start every test without cached clients, so patched constructors take effect"""
+    from app.clients import clear_registry
+    clear_registry()
+    yield
+    clear_registry()
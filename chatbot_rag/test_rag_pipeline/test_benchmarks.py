@@ -0,0 +1,69 @@
+import pytest
+import os
+import sys
+import json
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.compare import compare, main as compare_main
+from benchmarks.corpus import generate_pdf, synthetic_chunks
+from benchmarks.run import STAGES, run_benchmarks
+
+
+def test_generated_pdf_is_cached_and_deterministic(temp_dir):
+    from app.utils import extract_pages_from_pdf
+
+    path = generate_pdf(3, directory=temp_dir)
+    mtime = os.path.getmtime(path)
+    assert generate_pdf(3, directory=temp_dir) == path
+    assert os.path.getmtime(path) == mtime
+    assert len(extract_pages_from_pdf(path)) == 3
+    assert synthetic_chunks(5, seed=1) == synthetic_chunks(5, seed=1)
+
+
+def test_suite_runs_every_stage_and_reports_json():
+    """Test a miniature run of the whole suite"""
+    report = run_benchmarks(
+        large_pages=0,
+        retrieval_sizes=[200],
+        embed_chunks=200,
+        insert_chunks=200,
+        queries=10,
+        ask_requests=3,
+        repeat=1
+    )
+
+    assert set(report["results"]) == set(STAGES)
+    assert report["results"]["extraction"]["Machine learning.pdf"]["pages_per_sec"] > 0
+    assert report["results"]["retrieval"]["chunks_200"]["vector_search"]["count"] == 10
+    assert report["results"]["ask"]["ask"]["p99_ms"] >= report["results"]["ask"]["ask"]["p50_ms"]
+    assert report["meta"]["parameters"]["retrieval_sizes"] == [200]
+    json.dumps(report)
+
+    with pytest.raises(ValueError):
+        run_benchmarks(only=["nonexistent"])
+
+
+def test_compare_flags_regressions_by_direction(temp_dir):
+    baseline = {"meta": {"git": {"commit": "a"}}, "results": {
+        "splitting": {"doc": {"mb_per_sec": 100.0, "chunks": 10}},
+        "retrieval": {"chunks_1000": {"vector_search": {"p99_ms": 2.0}}}
+    }}
+    current = {"meta": {"git": {"commit": "b"}}, "results": {
+        "splitting": {"doc": {"mb_per_sec": 80.0, "chunks": 12}},
+        "retrieval": {"chunks_1000": {"vector_search": {"p99_ms": 1.0}}}
+    }}
+
+    rows = {row["metric"]: row for row in compare(baseline, current, threshold=0.1)}
+    assert set(rows) == {"splitting.doc.mb_per_sec", "retrieval.chunks_1000.vector_search.p99_ms"}
+    assert rows["splitting.doc.mb_per_sec"]["regression"]
+    assert not rows["retrieval.chunks_1000.vector_search.p99_ms"]["regression"]
+
+    paths = []
+    for name, report in (("base.json", baseline), ("new.json", current)):
+        paths.append(os.path.join(temp_dir, name))
+        with open(paths[-1], "w") as f:
+            json.dump(report, f)
+    assert compare_main(paths) == 1
+    assert compare_main(paths + ["--threshold", "25"]) == 0
@@ -0,0 +1,141 @@
+import pytest
+import os
+import json
+import shutil
+from unittest.mock import patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.bulk_ingest import (
+    IngestCheckpoint,
+    discover_local_sources,
+    discover_s3_sources,
+    document_name,
+    parse_s3_uri,
+    run_bulk_ingest
+)
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record batch sizes"""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.0]
+
+
+def test_parse_s3_uri():
+    """Test splitting S3 URIs"""
+    assert parse_s3_uri("s3://bucket/papers/") == ("bucket", "papers/")
+    assert parse_s3_uri("s3://bucket") == ("bucket", "")
+    with pytest.raises(ValueError):
+        parse_s3_uri("/local/path")
+
+
+def test_discover_s3_sources_fails_without_a_client():
+    """An unavailable S3 client is an error, not an empty prefix"""
+    with patch("aws_service.s3_handler.get_s3_client", return_value=None):
+        with pytest.raises(RuntimeError):
+            discover_s3_sources("s3://bucket/papers/")
+
+
+def test_document_name():
+    """Test document names for local and S3 sources"""
+    assert document_name("s3://bucket/a/b.pdf") == "a/b.pdf"
+    assert document_name("/corpus/sub/b.pdf", root="/corpus") == os.path.join("sub", "b.pdf")
+    assert document_name("/corpus/b.pdf") == "b.pdf"
+
+
+def test_checkpoint_resumes_and_ignores_torn_lines(temp_dir):
+    """Test that finished sources survive a restart and a torn final line is ignored"""
+    path = os.path.join(temp_dir, "checkpoint.jsonl")
+    checkpoint = IngestCheckpoint(path)
+    checkpoint.mark("a.pdf", "done", chunks=3)
+    checkpoint.mark("b.pdf", "failed", error="boom")
+    with open(path, "a") as f:
+        f.write('{"source": "c.pdf", "sta')
+
+    reloaded = IngestCheckpoint(path)
+    assert reloaded.is_done("a.pdf")
+    assert not reloaded.is_done("b.pdf")
+    assert not reloaded.is_done("c.pdf")
+
+
+def test_run_bulk_ingest_resumes(sample_pdf_path, temp_dir):
+    """Test end-to-end ingestion of a directory and that a second run skips finished files"""
+    corpus = os.path.join(temp_dir, "corpus")
+    os.makedirs(corpus)
+    shutil.copy(sample_pdf_path, os.path.join(corpus, "ml.pdf"))
+    checkpoint = os.path.join(temp_dir, "checkpoint.jsonl")
+    persist_dir = os.path.join(temp_dir, "vectorstore")
+    embeddings = FakeEmbeddings()
+
+    with patch("app.rag_pipeline.get_embeddings", return_value=embeddings), \
+         patch("app.extraction_store.config.EXTRACTION_STORE_ENABLED", False):
+        sources = discover_local_sources(corpus)
+        summary = run_bulk_ingest(
+            sources, persist_dir=persist_dir, checkpoint_path=checkpoint,
+            workers=1, batch_size=8, root=corpus
+        )
+        assert summary["ingested"] == 1
+        assert summary["chunks_indexed"] > 0
+        assert summary["docs_per_sec"] > 0
+        assert max(embeddings.batches) <= 8
+
+        second = run_bulk_ingest(
+            sources, persist_dir=persist_dir, checkpoint_path=checkpoint,
+            workers=1, batch_size=8, root=corpus
+        )
+        assert second["already_done"] == 1
+        assert second["ingested"] == 0
+
+    with open(checkpoint) as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]["status"] == "done"
+    assert records[0]["chunks"] == summary["chunks_indexed"]
+
+
+def test_reupload_replaces_bulk_ingested_chunks(sample_pdf_path, temp_dir):
+    """Test that uploads and bulk ingestion share chunk ids and a re-index leaves no stale chunks"""
+    from chromadb.api.client import SharedSystemClient
+    from app.rag_pipeline import Chroma, chunk_ids, collection_name_for, get_vectorstore
+
+    corpus = os.path.join(temp_dir, "corpus")
+    os.makedirs(corpus)
+    shutil.copy(sample_pdf_path, os.path.join(corpus, "ml.pdf"))
+    persist_dir = os.path.join(temp_dir, "vectorstore")
+    collection_name = collection_name_for("ml.pdf")
+
+    def stored_ids():
+        store = Chroma(collection_name=collection_name, persist_directory=persist_dir)
+        return sorted(store._collection.get(include=[])["ids"])
+
+    long_text = " ".join(f"Sentence {i} about supervised learning and labelled data." for i in range(200))
+
+    with patch("app.rag_pipeline.get_embeddings", return_value=FakeEmbeddings()), \
+         patch("app.extraction_store.config.EXTRACTION_STORE_ENABLED", False):
+        get_vectorstore(long_text, persist_dir=persist_dir, source="ml.pdf")
+        uploaded = stored_ids()
+        assert len(uploaded) > 1 and uploaded == sorted(chunk_ids(collection_name, len(uploaded)))
+
+        # Bulk ingestion of the same document replaces the upload's chunks, with the same ids
+        summary = run_bulk_ingest(
+            discover_local_sources(corpus), persist_dir=persist_dir,
+            checkpoint_path=os.path.join(temp_dir, "checkpoint.jsonl"), workers=1, batch_size=8, root=corpus
+        )
+        assert summary["chunks_indexed"] < len(uploaded)
+        assert stored_ids() == sorted(chunk_ids(collection_name, summary["chunks_indexed"]))
+
+        # So does a later, shorter re-upload
+        get_vectorstore(long_text, persist_dir=persist_dir, source="ml.pdf")
+        get_vectorstore("A single short chunk.", persist_dir=persist_dir, source="ml.pdf")
+        assert stored_ids() == chunk_ids(collection_name, 1)
+    SharedSystemClient.clear_system_cache()
@@ -0,0 +1,148 @@
+import pytest
+import os
+import sys
+from datetime import datetime
+
+import boto3
+from botocore.stub import Stubber
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.catalog import DocumentCatalog
+
+
+def test_updates_keep_names_sorted_and_the_preview_cached():
+    catalog = DocumentCatalog(response_limit=2)
+    for name in ("c.pdf", "a.pdf", "b.pdf"):
+        catalog.record_local(name, size=10)
+
+    preview = catalog.available_pdfs()
+    assert preview == ["a.pdf", "b.pdf"] and len(catalog) == 3
+    assert catalog.available_pdfs() is preview
+
+    # A change past the preview keeps it; one inside it rebuilds it
+    catalog.record_local("d.pdf")
+    assert catalog.available_pdfs() is preview
+    catalog.record_s3("a.pdf", size=10, last_modified="2024-05-01T00:00:00")
+    assert catalog.available_pdfs() is preview
+    catalog.record_local("0.pdf")
+    assert catalog.available_pdfs() == ["0.pdf", "a.pdf"]
+
+    assert catalog.get("a.pdf") == {
+        "filename": "a.pdf", "local": True, "s3": True, "metadata": False,
+        "size": 10, "last_modified": "2024-05-01T00:00:00"
+    }
+    catalog.remove_local("0.pdf")
+    assert "0.pdf" not in catalog and catalog.available_pdfs() == ["a.pdf", "b.pdf"]
+
+
+def test_pages_follow_the_cursor():
+    catalog = DocumentCatalog()
+    for i in range(5):
+        catalog.record_local(f"doc-{i}.pdf")
+
+    first = catalog.page(limit=2)
+    assert [item["filename"] for item in first["items"]] == ["doc-0.pdf", "doc-1.pdf"]
+    assert first["next_cursor"] == "doc-1.pdf" and first["total"] == 5
+    last = catalog.page(limit=3, after="doc-1.pdf")
+    assert [item["filename"] for item in last["items"]] == ["doc-2.pdf", "doc-3.pdf", "doc-4.pdf"]
+    assert last["next_cursor"] is None
+    with pytest.raises(ValueError):
+        catalog.page(limit=0)
+
+
+def test_refresh_merges_local_s3_and_metadata(temp_dir):
+    data_dir = os.path.join(temp_dir, "data")
+    os.makedirs(data_dir)
+    for name in ("local.pdf", "both.pdf", "notes.txt"):
+        with open(os.path.join(data_dir, name), "wb") as f:
+            f.write(b"%PDF")
+
+    catalog = DocumentCatalog(data_dir)
+    catalog.record_s3("deleted-from-s3.pdf")
+    report = catalog.refresh(
+        s3_listing=lambda: iter([{"filename": "both.pdf", "size": 4}, {"filename": "remote.pdf", "size": 9}]),
+        metadata_listing=lambda: iter([{"filename": "remote.pdf", "user_id": "alice", "status": "processed"}])
+    )
+
+    assert report["local"] == 2 and report["s3"] == 2 and report["metadata"] == 1
+    assert catalog.available_pdfs() == ["both.pdf", "local.pdf", "remote.pdf"]
+    assert catalog.get("both.pdf")["local"] and catalog.get("both.pdf")["s3"]
+    assert catalog.get("remote.pdf")["user_id"] == "alice"
+
+
+def test_refresh_never_drops_entries_on_failure_or_newer_uploads():
+    catalog = DocumentCatalog("missing-dir")
+    catalog.record_s3("old.pdf")
+
+    def failing_listing():
+        yield {"filename": "first.pdf"}
+        raise RuntimeError("connection reset")
+
+    report = catalog.refresh(s3_listing=failing_listing)
+    assert report["s3"].startswith("error")
+    assert "old.pdf" in catalog and "first.pdf" in catalog
+
+    def listing_during_upload():
+        yield {"filename": "first.pdf"}
+        catalog.record_s3("uploaded-meanwhile.pdf")
+
+    catalog.refresh(s3_listing=listing_during_upload)
+    assert "uploaded-meanwhile.pdf" in catalog
+    assert "old.pdf" not in catalog
+
+
+def test_list_pdfs_in_s3_follows_every_page():
+    from aws_service import s3_handler
+
+    client = boto3.client(
+        "s3", region_name="us-east-1", aws_access_key_id="test",
+        aws_secret_access_key="test", endpoint_url="http://localhost:4566"
+    )
+    modified = datetime(2024, 5, 1)
+    with Stubber(client) as stubber, patch.object(s3_handler, "s3", client):
+        stubber.add_response("list_objects_v2", {
+            "Contents": [{"Key": "a.pdf", "Size": 1, "LastModified": modified}, {"Key": "a.txt", "Size": 1, "LastModified": modified}],
+            "IsTruncated": True, "NextContinuationToken": "page-2"
+        }, {"Bucket": "docs", "Prefix": ""})
+        stubber.add_response("list_objects_v2", {
+            "Contents": [{"Key": "b.pdf", "Size": 2, "LastModified": modified}], "IsTruncated": False
+        }, {"Bucket": "docs", "Prefix": "", "ContinuationToken": "page-2"})
+
+        assert [item["filename"] for item in s3_handler.list_pdfs_in_s3("docs")] == ["a.pdf", "b.pdf"]
+
+
+def test_upload_reports_documents_from_the_catalog(temp_dir, sample_pdf_path):
+    """Test /upload-pdf/ and /documents with the offline stand-ins"""
+    from fastapi.testclient import TestClient
+    from app.clients import clear_registry
+    from app.state import MemoryStateStore, set_state_store
+    from benchmarks.stages import offline_app_config
+
+    with offline_app_config(temp_dir):
+        clear_registry()
+        set_state_store(MemoryStateStore())
+        import app.main as main
+        limiter_enabled = main.limiter.enabled
+        main.limiter.enabled = False
+        try:
+            client = TestClient(main.app)
+            for name in ("b.pdf", "a.pdf"):
+                with open(sample_pdf_path, "rb") as f:
+                    response = client.post("/upload-pdf/", files={"file": (name, f, "application/pdf")})
+                assert response.status_code == 200
+            body = response.json()
+            first = client.get("/documents", params={"limit": 1}).json()
+            second = client.get("/documents", params={"limit": 1, "cursor": first["next_cursor"]}).json()
+            bad_limit = client.get("/documents", params={"limit": 0})
+        finally:
+            main.limiter.enabled = limiter_enabled
+            set_state_store(None)
+            clear_registry()
+
+    assert body["available_pdfs"] == ["a.pdf", "b.pdf"] and body["available_pdf_count"] == 2
+    assert [item["filename"] for item in first["items"]] == ["a.pdf"] and first["total"] == 2
+    assert [item["filename"] for item in second["items"]] == ["b.pdf"] and second["next_cursor"] is None
+    assert bad_limit.status_code == 400
@@ -0,0 +1,81 @@
+import pytest
+import os
+import threading
+from unittest.mock import Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.clients import ClientRegistry, get_client, registry_summary
+from app.rag_pipeline import get_embeddings, get_llm, get_vectorstore_info
+from app.index_manifest import IndexManifest
+
+
+def test_registry_builds_each_client_once():
+    """Test that concurrent callers share one client per key"""
+    registry = ClientRegistry()
+    factory = Mock(side_effect=lambda: object())
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get("pool", factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert factory.call_count == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_embeddings_and_llm_are_reused():
+    """Test that model clients are built once per configuration"""
+    with patch("app.rag_pipeline.GoogleGenerativeAIEmbeddings") as mock_embeddings, \
+            patch("app.rag_pipeline.ChatGoogleGenerativeAI") as mock_llm:
+        mock_embeddings.side_effect = lambda **kwargs: Mock()
+        mock_llm.side_effect = lambda **kwargs: Mock()
+
+        assert get_embeddings() is get_embeddings()
+        assert get_embeddings(task_type="retrieval_query") is not get_embeddings()
+        assert get_llm() is get_llm()
+        assert get_llm(max_output_tokens=512) is not get_llm()
+
+        assert mock_embeddings.call_count == 2
+        assert mock_llm.call_count == 2
+        assert registry_summary() == {"embeddings": 2, "llm": 2}
+
+
+def test_vectorstore_info_reuses_counts_until_the_index_changes(temp_dir):
+    """Test that status checks do not reopen the store on every call"""
+    open(os.path.join(temp_dir, "chroma.sqlite3"), "w").close()
+    with patch("chromadb.PersistentClient") as mock_client:
+        collection = Mock()
+        collection.name = "doc-a"
+        collection.count.return_value = 3
+        mock_client.return_value.list_collections.return_value = [collection]
+
+        assert get_vectorstore_info(temp_dir)["count"] == 3
+        assert get_vectorstore_info(temp_dir)["count"] == 3
+        mock_client.assert_called_once()
+
+        IndexManifest(temp_dir).record_document("a.pdf", "doc-a", 3)
+        assert get_vectorstore_info(temp_dir)["documents"] == 1
+        assert mock_client.call_count == 2
+
+
+def test_boto_clients_share_pooled_config():
+    """Test that AWS clients are created with the shared pool configuration"""
+    from aws_service import dynamo_handler
+    from aws_service.boto_config import client_config
+
+    assert client_config.max_pool_connections >= 10
+    with patch.object(dynamo_handler, "dynamodb", None), \
+            patch.object(dynamo_handler, "dynamodb_client", None), \
+            patch("aws_service.dynamo_handler.boto3.resource") as mock_resource:
+        dynamo_handler.get_dynamodb()
+        assert mock_resource.call_args.kwargs["config"] is client_config
@@ -0,0 +1,98 @@
+import pytest
+import os
+from unittest.mock import Mock
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.context_packing import dedupe_chunks, estimate_tokens, pack_context, PackingStats
+from app.rag_pipeline import split_text
+
+
+def test_estimate_tokens():
+    """Test the rough token estimate"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_dedupe_removes_splitter_overlap(sample_text):
+    """Test that the overlap between consecutive splitter chunks is removed"""
+    # Single-line text forces the splitter to cut on spaces, which produces overlapping chunks
+    chunks = split_text(" ".join(sample_text.split()), chunk_size=200, chunk_overlap=60)
+    deduped = dedupe_chunks(chunks)
+    assert sum(len(c) for c in deduped) < sum(len(c) for c in chunks)
+    # Nothing is lost: every word of the source still appears once packed back together
+    joined = " ".join(deduped)
+    for word in ("supervised", "reinforcement", "observations"):
+        assert word in joined
+
+
+def test_dedupe_drops_contained_chunks():
+    """Test that a chunk fully contained in an earlier one is emptied"""
+    chunks = ["Gradient descent updates weights iteratively.", "updates weights"]
+    assert dedupe_chunks(chunks) == [chunks[0], ""]
+
+
+def test_dedupe_handles_reverse_order_overlap():
+    """Test trimming when a later chunk precedes an earlier one in the document"""
+    shared = "shared overlap text that is long enough to count"
+    later_in_doc = shared + " and then the second half."
+    earlier_in_doc = "The first half of the passage, " + shared
+    deduped = dedupe_chunks([later_in_doc, earlier_in_doc])
+    assert deduped[0] == later_in_doc
+    assert shared not in deduped[1]
+
+
+def test_pack_context_respects_budget_and_prefers_relevant_sentences():
+    """Test that packing fits the budget and keeps the sentences matching the question"""
+    chunks = [
+        "Overfitting happens when a model memorizes noise. The weather was nice. Lunch was late.",
+        "Regularization reduces overfitting by penalizing weights. Unrelated filler sentence here.",
+    ]
+    packed, stats = pack_context("What is overfitting?", chunks, token_budget=30)
+
+    assert stats["packed_tokens"] <= 30
+    assert stats["packed_tokens"] < stats["original_tokens"]
+    assert "memorizes noise" in packed[0]
+    assert "weather" not in packed[0]
+    assert stats["packing_ms"] >= 0
+
+
+def test_pack_context_large_budget_keeps_everything():
+    """Test that nothing is trimmed when the budget is generous"""
+    chunks = ["One sentence. Two sentence.", "Three sentence."]
+    packed, stats = pack_context("sentence", chunks, token_budget=10000)
+    assert packed == ["One sentence. Two sentence.", "Three sentence."]
+    assert stats["chunks_out"] == 2
+
+
+def test_packing_stats_summary():
+    """Test running totals of prompt-size reduction"""
+    stats = PackingStats()
+    assert stats.summary()["requests"] == 0
+    stats.record({"original_tokens": 1000, "packed_tokens": 400, "packing_ms": 0.5})
+    stats.record({"original_tokens": 1000, "packed_tokens": 600, "packing_ms": 1.5})
+    summary = stats.summary()
+    assert summary["requests"] == 2
+    assert summary["token_reduction"] == pytest.approx(0.5)
+    assert summary["avg_packing_ms"] == pytest.approx(1.0)
+
+
+def test_packed_retriever_trims_documents():
+    """Test the retriever wrapper used by get_qa_chain"""
+    from langchain.schema import Document
+    from app.rag_pipeline import PackedRetriever
+
+    base = Mock()
+    base.invoke.return_value = [
+        Document(page_content="Neural networks learn features. Cats are cute.", metadata={"source": "a.pdf"}),
+        Document(page_content="Neural networks learn features.", metadata={"source": "a.pdf"}),
+    ]
+    retriever = PackedRetriever(base_retriever=base, token_budget=100)
+    documents = retriever.invoke("neural networks")
+
+    assert len(documents) == 1
+    assert documents[0].metadata["source"] == "a.pdf"
+    assert documents[0].metadata["packed_tokens"] <= documents[0].metadata["original_tokens"]
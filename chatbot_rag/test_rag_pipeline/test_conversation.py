@@ -0,0 +1,110 @@
+import pytest
+import os
+from unittest.mock import Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.conversation import ConversationManager, Session, SessionStore
+
+
+@pytest.fixture
+def llm():
+    """LLM stub that answers rewrite prompts and summary prompts differently"""
+    mock = Mock()
+
+    def invoke(prompt):
+        if "Standalone question:" in prompt:
+            return Mock(content="What is gradient descent used for in neural networks?")
+        return Mock(content="User asked about neural networks and gradient descent.")
+
+    mock.invoke.side_effect = invoke
+    return mock
+
+
+def test_first_question_is_not_rewritten(llm):
+    """Test that no LLM call is made when there is no history"""
+    manager = ConversationManager(llm)
+    response = manager.ask("s1", "What is a neural network?", lambda q: {"result": "A model."})
+
+    assert response["standalone_question"] == "What is a neural network?"
+    llm.invoke.assert_not_called()
+
+
+def test_follow_up_is_rewritten_with_history(llm):
+    """Test that follow-ups are condensed using the session history"""
+    manager = ConversationManager(llm)
+    manager.ask("s1", "What is a neural network?", lambda q: {"result": "A model."})
+    answer_fn = Mock(return_value={"result": "To minimize loss."})
+    response = manager.ask("s1", "And what is it used for?", answer_fn)
+
+    answer_fn.assert_called_once_with("What is gradient descent used for in neural networks?")
+    prompt = llm.invoke.call_args[0][0]
+    assert "Human: What is a neural network?" in prompt
+    assert response["standalone_question"].startswith("What is gradient descent")
+
+
+def test_history_is_summarized_under_budget(llm):
+    """Test that old turns are folded into the rolling summary once over budget"""
+    manager = ConversationManager(llm, history_tokens=100)
+    long_answer = "word " * 60
+    for i in range(5):
+        manager.ask("s1", f"Question number {i}?", lambda q: {"result": long_answer})
+
+    session = manager.store.get("s1")
+    assert session.summary == "User asked about neural networks and gradient descent."
+    assert len(session.turns) >= 1
+    assert session.turns[-1][0] == "Question number 4?"
+    assert session.history_tokens() <= 100
+
+
+def test_summary_cap_keeps_the_most_recent_turns():
+    """Test that a failing summarizer keeps the newest folded lines, not the oldest"""
+    llm = Mock()
+
+    def invoke(prompt):
+        if "Standalone question:" in prompt:
+            return Mock(content="A standalone question?")
+        raise RuntimeError("summarizer unavailable")
+
+    llm.invoke.side_effect = invoke
+    manager = ConversationManager(llm, history_tokens=100)
+    for i in range(6):
+        manager.ask("s1", f"Question number {i}?", lambda q, i=i: {"result": f"answer{i} " * 60})
+
+    session = manager.store.get("s1")
+    assert 0 < len(session.summary) <= 200
+    assert "answer0" not in session.summary
+    assert session.summary.endswith(f"answer{5 - len(session.turns)}")
+
+
+def test_session_store_idle_expiry():
+    """Test that idle sessions are dropped"""
+    store = SessionStore(idle_ttl=10, max_sessions=100)
+    with patch("app.conversation.time.monotonic", return_value=1000.0):
+        store.get("a").summary = "kept?"
+    with patch("app.conversation.time.monotonic", return_value=1011.0):
+        assert store.get("a").summary == ""
+
+
+def test_session_store_caps_sessions():
+    """Test that the least recently used session is evicted at the cap"""
+    store = SessionStore(idle_ttl=3600, max_sessions=2)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert len(store) == 2
+    assert store.delete("b") is False
+    assert store.delete("a") is True
+
+
+def test_session_roundtrip():
+    """Test the compact serialized form"""
+    session = Session("s1")
+    session.summary = "summary"
+    session.turns.append(("q", "a"))
+    restored = Session.from_dict("s1", session.to_dict())
+    assert restored.summary == "summary"
+    assert list(restored.turns) == [("q", "a")]
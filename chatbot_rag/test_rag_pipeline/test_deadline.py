@@ -0,0 +1,161 @@
+import pytest
+import os
+import time
+from unittest.mock import Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.schema import Document
+
+from app.deadline import (
+    Deadline, DeadlineExceeded, current_deadline, deadline_scope, parse_deadline_seconds, stage_allowed
+)
+from app.providers import FakeStreamingChatModel, LatencyDistribution
+from app.resilience import CircuitBreaker, HedgedChatModel, LatencyTracker, ResilienceStats, hedged_call
+from app.rag_pipeline import PackedRetriever
+
+
+def test_deadline_budget_and_optional_stages():
+    deadline = Deadline(0.5)
+    assert 0 < deadline.remaining() <= 0.5
+    assert deadline.allows("metrics_persistence", min_seconds=0.1)
+    assert not deadline.allows("context_packing", min_seconds=5.0)
+    assert deadline.skipped == ["context_packing"]
+    assert deadline.timeout(10.0) <= 0.5
+
+
+def test_parse_deadline_seconds():
+    """Test header precedence, capping and the server default"""
+    with patch("config.DEADLINE_DEFAULT_SECONDS", 30.0), patch("config.DEADLINE_MAX_SECONDS", 60.0):
+        assert parse_deadline_seconds(None, None) == 30.0
+        assert parse_deadline_seconds(None, 2500) == 2.5
+        assert parse_deadline_seconds("1500", 2500) == 1.5
+        assert parse_deadline_seconds("not-a-number", 2500) == 2.5
+        assert parse_deadline_seconds(None, 600000) == 60.0
+
+
+def test_no_deadline_allows_everything():
+    assert current_deadline() is None
+    assert stage_allowed("context_packing")
+
+
+def test_hedged_call_stops_at_deadline():
+    """Test that a hung LLM call returns control when the deadline passes"""
+    def hung():
+        time.sleep(2.0)
+        return "late"
+
+    start = time.perf_counter()
+    with deadline_scope(0.2):
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            hedged_call(hung, delay=0.05, stats=ResilienceStats())
+    assert excinfo.value.stage == "llm"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_deadline_follows_hedged_attempts_into_threads():
+    """Test that attempts running on the hedge pool see the request deadline"""
+    with deadline_scope(5.0) as deadline:
+        seen = hedged_call(current_deadline, delay=1.0, stats=ResilienceStats())
+    assert seen is deadline
+
+
+def test_unhedged_llm_call_is_cut_off_at_deadline():
+    """Test that the provider request itself is given the remaining time as its timeout"""
+    slow = FakeStreamingChatModel(first_token=LatencyDistribution(2.0, sigma=0))
+    breaker = CircuitBreaker("deadline-test")
+    llm = HedgedChatModel(model=slow, tracker=LatencyTracker(), breaker=breaker, stats=ResilienceStats(), hedging=False)
+
+    start = time.perf_counter()
+    with deadline_scope(0.2):
+        with pytest.raises(DeadlineExceeded):
+            llm.invoke("question")
+    assert time.perf_counter() - start < 1.0
+    assert breaker.state == "closed"
+
+
+def test_boto_calls_get_the_remaining_time_as_read_timeout():
+    import boto3
+    from aws_service.boto_config import bind_to_request_deadline
+
+    client = boto3.client(
+        "s3", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    bind_to_request_deadline(client)
+    seen = []
+
+    class Sent(Exception):
+        pass
+
+    def capture(request, **kwargs):
+        seen.append(request.context.get("read_timeout"))
+        raise Sent()
+
+    client.meta.events.register("before-send", capture)
+    with pytest.raises(Sent):
+        client.list_buckets()
+    with deadline_scope(0.5):
+        with pytest.raises(Sent):
+            client.list_buckets()
+    with deadline_scope(0.0):
+        with pytest.raises(DeadlineExceeded):
+            client.list_buckets()
+
+    assert seen[0] is None
+    assert 0 < seen[1] <= 0.5
+    assert len(seen) == 2
+
+
+def test_packing_skipped_when_short_on_time():
+    """Test that the packer keeps whole chunks within budget instead of compressing"""
+    chunks = [Document(page_content="word " * 100, metadata={"i": i}) for i in range(5)]
+    base = Mock()
+    base.invoke.return_value = chunks
+    retriever = PackedRetriever(base_retriever=base, token_budget=300)
+
+    with patch("config.DEADLINE_OPTIONAL_STAGE_SECONDS", 1.0), deadline_scope(0.5) as deadline:
+        with patch("app.rag_pipeline.pack_context") as mock_pack:
+            documents = retriever.invoke("question")
+            mock_pack.assert_not_called()
+
+    assert [doc.metadata["i"] for doc in documents] == [0, 1]
+    assert deadline.skipped == ["context_packing"]
+    assert len(deadline.partial["sources"]) == 5
+
+
+def test_ask_returns_partial_response_on_deadline(temp_dir, monkeypatch):
+    """Test that /ask answers 504 with retrieved sources instead of hanging"""
+    from fastapi.testclient import TestClient
+    from app.state import MemoryStateStore, set_state_store
+    from app.deadline import record_partial
+
+    monkeypatch.chdir(temp_dir)
+    import app.main as main
+
+    store = MemoryStateStore()
+    store.set_current_document("ml.pdf", "doc-ml", "vectorstore")
+    set_state_store(store)
+
+    def slow_invoke(inputs):
+        record_partial("sources", ["Machine learning is..."])
+        time.sleep(2.0)
+        return {"result": "too late"}
+
+    chain = Mock()
+    chain.invoke.side_effect = slow_invoke
+    try:
+        with patch.object(main, "get_chain_for", return_value=chain), \
+                patch.object(main.limiter, "enabled", False), \
+                patch("config.AWS_AVAILABLE", False):
+            response = TestClient(main.app).post(
+                "/ask", data={"question": "What is ML?"}, headers={"X-Request-Deadline-Ms": "300"}
+            )
+    finally:
+        set_state_store(None)
+
+    assert response.status_code == 504
+    body = response.json()
+    assert body["timed_out_stage"] == "llm"
+    assert body["partial"]["sources"] == ["Machine learning is..."]
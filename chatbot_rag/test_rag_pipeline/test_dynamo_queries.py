@@ -0,0 +1,126 @@
+import pytest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from botocore.stub import ANY, Stubber
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws_service import dynamo_handler
+
+
+def _table(name):
+    resource = boto3.resource(
+        "dynamodb", region_name="us-east-1", aws_access_key_id="test",
+        aws_secret_access_key="test", endpoint_url="http://localhost:4566"
+    )
+    return resource.Table(name)
+
+
+def test_tables_are_created_with_their_indexes():
+    client = MagicMock()
+    with patch.object(dynamo_handler, "dynamodb", MagicMock()), \
+            patch.object(dynamo_handler, "dynamodb_client", client):
+        assert dynamo_handler.create_dynamodb_table(
+            "LLMMetrics", "query_id", "timestamp", global_secondary_indexes=dynamo_handler.LLM_METRICS_INDEXES
+        )
+
+    kwargs = client.create_table.call_args.kwargs
+    assert [a["AttributeName"] for a in kwargs["AttributeDefinitions"]] == ["query_id", "timestamp", "pdf_name"]
+    (index,) = kwargs["GlobalSecondaryIndexes"]
+    assert index["IndexName"] == dynamo_handler.LLM_METRICS_PDF_INDEX
+    assert index["KeySchema"] == [
+        {"AttributeName": "pdf_name", "KeyType": "HASH"}, {"AttributeName": "timestamp", "KeyType": "RANGE"}
+    ]
+    assert index["Projection"]["ProjectionType"] == "INCLUDE"
+
+
+def test_missing_indexes_are_added_to_existing_tables():
+    client = MagicMock()
+    client.create_table.side_effect = ClientError({"Error": {"Code": "ResourceInUseException"}}, "CreateTable")
+    client.describe_table.return_value = {"Table": {"TableName": "PDF_Metadata"}}
+    with patch.object(dynamo_handler, "dynamodb", MagicMock()), \
+            patch.object(dynamo_handler, "dynamodb_client", client):
+        assert dynamo_handler.create_dynamodb_table(
+            "PDF_Metadata", "filename", "user_id", global_secondary_indexes=dynamo_handler.PDF_METADATA_INDEXES
+        )
+        (update,) = client.update_table.call_args.kwargs["GlobalSecondaryIndexUpdates"]
+        assert update["Create"]["IndexName"] == dynamo_handler.PDF_METADATA_USER_INDEX
+
+        # Already there: nothing to do
+        client.update_table.reset_mock()
+        client.describe_table.return_value = {"Table": {"GlobalSecondaryIndexes": [
+            {"IndexName": dynamo_handler.PDF_METADATA_USER_INDEX}
+        ]}}
+        assert dynamo_handler.create_dynamodb_table(
+            "PDF_Metadata", "filename", "user_id", global_secondary_indexes=dynamo_handler.PDF_METADATA_INDEXES
+        )
+        client.update_table.assert_not_called()
+
+
+def test_user_pdfs_are_listed_page_by_page_from_the_index():
+    table = _table("PDF_Metadata")
+    last_key = {"filename": {"S": "a.pdf"}, "user_id": {"S": "alice"}, "upload_timestamp": {"S": "2024-05-02"}}
+    expected = {
+        "TableName": "PDF_Metadata",
+        "IndexName": dynamo_handler.PDF_METADATA_USER_INDEX,
+        "KeyConditionExpression": Key("user_id").eq("alice"),
+        "ProjectionExpression": "#a0, #a1, #a2, #a3",
+        "ExpressionAttributeNames": ANY,
+        "ScanIndexForward": False,
+        "Limit": 1
+    }
+    with Stubber(table.meta.client) as stubber, patch.object(dynamo_handler, "pdf_metadata_table", table):
+        stubber.add_response("query", {
+            "Items": [{"filename": {"S": "a.pdf"}, "user_id": {"S": "alice"}}], "LastEvaluatedKey": last_key
+        }, expected)
+        stubber.add_response("query", {"Items": [{"filename": {"S": "b.pdf"}, "user_id": {"S": "alice"}}]}, {
+            **expected, "ExclusiveStartKey": {"filename": "a.pdf", "user_id": "alice", "upload_timestamp": "2024-05-02"}
+        })
+
+        first = dynamo_handler.list_user_pdfs_page("alice", limit=1)
+        second = dynamo_handler.list_user_pdfs_page("alice", limit=1, next_token=first["next_token"])
+
+    assert [item["filename"] for item in first["items"]] == ["a.pdf"]
+    assert first["next_token"] is not None
+    assert second == {"items": [{"filename": "b.pdf", "user_id": "alice"}], "next_token": None}
+
+    with pytest.raises(ValueError):
+        dynamo_handler.decode_page_token("not-a-token")
+
+
+def test_list_user_pdfs_follows_every_page():
+    pages = [
+        {"items": [{"filename": "a.pdf"}], "next_token": "t1"},
+        {"items": [{"filename": "b.pdf"}], "next_token": None},
+    ]
+    with patch.object(dynamo_handler, "list_user_pdfs_page", side_effect=pages) as page:
+        assert [item["filename"] for item in dynamo_handler.list_user_pdfs("alice")] == ["a.pdf", "b.pdf"]
+    assert page.call_args_list[1].kwargs["next_token"] == "t1"
+
+
+def test_pdf_queries_since_a_timestamp():
+    table = _table("LLMMetrics")
+    with Stubber(table.meta.client) as stubber, patch.object(dynamo_handler, "llm_metrics_table", table):
+        stubber.add_response("query", {"Items": [
+            {"query_id": {"S": "q2"}, "timestamp": {"S": "2024-05-01T10:05:00"}, "query": {"S": "Why?"}}
+        ]}, {
+            "TableName": "LLMMetrics",
+            "IndexName": dynamo_handler.LLM_METRICS_PDF_INDEX,
+            "KeyConditionExpression": Key("pdf_name").eq("ml.pdf") & Key("timestamp").gte("2024-05-01T10:00:00"),
+            "ProjectionExpression": "#a0, #a1",
+            "ExpressionAttributeNames": {"#a0": "timestamp", "#a1": "query"},
+            "ScanIndexForward": False,
+            "Limit": 20
+        })
+        page = dynamo_handler.list_pdf_queries(
+            "ml.pdf", limit=20, since="2024-05-01T10:00:00", attributes=["timestamp", "query"]
+        )
+
+    assert page["items"][0]["query"] == "Why?"
+    assert page["next_token"] is None
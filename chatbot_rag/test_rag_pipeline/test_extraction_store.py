@@ -0,0 +1,64 @@
+import pytest
+import os
+from unittest.mock import patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.extraction_store import ExtractionStore, extract_pages_cached, extract_text_cached, file_sha256
+
+
+@pytest.fixture
+def store(temp_dir):
+    """Extraction store rooted in a temporary directory"""
+    return ExtractionStore(root_dir=os.path.join(temp_dir, "store"))
+
+
+def test_put_and_get_pages_roundtrip(store):
+    """Test that stored pages are returned unchanged"""
+    pages = ["first page", "", "third page with ünïcode"]
+    store.put_pages("ab" * 32, pages)
+    assert store.contains("ab" * 32)
+    assert store.get_pages("ab" * 32) == pages
+
+
+def test_get_single_page_uses_offset_index(store):
+    """Test random access to a single page"""
+    store.put_pages("cd" * 32, ["one", "two", "three"])
+    assert store.get_page("cd" * 32, 2) == "two"
+    with pytest.raises(IndexError):
+        store.get_page("cd" * 32, 4)
+
+
+def test_missing_artifact_returns_none(store):
+    """Test lookups for unknown hashes"""
+    assert store.get_pages("ef" * 32) is None
+    assert store.get_page("ef" * 32, 1) is None
+
+
+def test_version_change_invalidates_artifacts(temp_dir):
+    """Test that artifacts are keyed by extractor version"""
+    root = os.path.join(temp_dir, "store")
+    ExtractionStore(root_dir=root, version="v1").put_pages("12" * 32, ["text"])
+    assert ExtractionStore(root_dir=root, version="v2").get_pages("12" * 32) is None
+
+
+def test_extract_pages_cached_skips_parsing_on_hit(store, temp_dir):
+    """Test that a second extraction of the same content does not parse the PDF"""
+    pdf_path = os.path.join(temp_dir, "doc.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF-1.4 fake content")
+
+    with patch("app.extraction_store.extract_pages_from_pdf", return_value=["page one", "page two"]) as mock_extract:
+        assert extract_pages_cached(pdf_path, store=store) == ["page one", "page two"]
+        assert extract_text_cached(pdf_path, store=store) == "page one\npage two"
+        mock_extract.assert_called_once_with(pdf_path)
+
+    assert store.contains(file_sha256(pdf_path))
+
+
+def test_extract_pages_cached_file_not_found(store):
+    """Test cached extraction with non-existent file"""
+    with pytest.raises(FileNotFoundError):
+        extract_pages_cached("nonexistent.pdf", store=store)
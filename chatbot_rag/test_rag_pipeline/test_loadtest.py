@@ -0,0 +1,87 @@
+import pytest
+import os
+import sys
+import asyncio
+
+import httpx
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import EndpointStats, parse_mix, run_load_test
+from benchmarks.stages import offline_app_config
+
+
+def test_parse_mix_normalises_weights():
+    assert parse_mix("ask=3,status=1") == {"upload": 0.0, "ask": 0.75, "status": 0.25}
+    with pytest.raises(ValueError):
+        parse_mix("search=1")
+    with pytest.raises(ValueError):
+        parse_mix("ask=0")
+
+
+def test_endpoint_stats_count_errors_and_transport_failures():
+    stats = EndpointStats()
+    stats.record(0.010, 200)
+    stats.record(0.020, 429)
+    stats.record(0.030, None)
+
+    summary = stats.summary(elapsed=1.5)
+    assert summary["requests"] == 3
+    assert summary["errors"] == 2
+    assert summary["error_rate"] == pytest.approx(0.6667)
+    assert summary["throughput_rps"] == 2.0
+    assert summary["status_codes"] == {"200": 1, "429": 1, "transport_error": 1}
+    assert summary["p50_ms"] == pytest.approx(20.0)
+
+
+def test_load_test_ramps_against_the_app(temp_dir):
+    """Test a short ramp through the ASGI app with the offline stand-ins"""
+    from app.clients import clear_registry
+    from app.state import MemoryStateStore, set_state_store
+
+    with offline_app_config(temp_dir):
+        clear_registry()
+        set_state_store(MemoryStateStore())
+        import app.main as main
+        main.qa_chains.clear()
+        limiter_enabled = main.limiter.enabled
+        main.limiter.enabled = False
+        try:
+            report = asyncio.run(run_load_test(
+                base_url="http://loadtest",
+                concurrency=[1, 3],
+                stage_seconds=0.3,
+                mix=parse_mix("ask=1,status=1"),
+                transport=httpx.ASGITransport(app=main.app)
+            ))
+        finally:
+            main.limiter.enabled = limiter_enabled
+            set_state_store(None)
+            clear_registry()
+
+    assert [stage["concurrency"] for stage in report["stages"]] == [1, 3]
+    for stage in report["stages"]:
+        assert stage["overall"]["error_rate"] == 0.0
+        assert set(stage["endpoints"]) <= {"ask", "status"}
+        for row in stage["endpoints"].values():
+            assert row["p99_ms"] >= row["p95_ms"] >= row["p50_ms"] > 0
+    assert [point["concurrency"] for point in report["curve"]] == [1, 3]
+    assert report["curve"][0]["throughput_rps"] > 0
+
+
+def test_spawned_workers_share_the_uploaded_document(sample_pdf_path):
+    """Test that every worker of a spawned multi-worker server can answer after one upload"""
+    import socket
+    from benchmarks.loadtest import spawn_server
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    with spawn_server(port, workers=2) as base_url:
+        with open(sample_pdf_path, "rb") as f:
+            httpx.post(f"{base_url}/upload-pdf/", files={"file": ("ml.pdf", f, "application/pdf")}, timeout=60).raise_for_status()
+        # Fresh connections are spread over both workers
+        statuses = [httpx.post(f"{base_url}/ask", data={"question": "What is ML?"}, timeout=30).status_code for _ in range(12)]
+    assert statuses == [200] * 12
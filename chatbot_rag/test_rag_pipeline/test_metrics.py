@@ -0,0 +1,87 @@
+import pytest
+import os
+import time
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, instrument_boto_client, registry, render_metrics, stage_timer
+)
+
+
+@pytest.fixture
+def local_registry():
+    return MetricsRegistry()
+
+
+def test_histogram_renders_cumulative_buckets(local_registry):
+    histogram = local_registry.register(Histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.labels("split").observe(value)
+
+    text = local_registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{stage="split",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="split",le="1.0"} 3' in text
+    assert 'test_seconds_bucket{stage="split",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="split"} 4' in text
+    assert 'test_seconds_sum{stage="split"} 4.25' in text
+
+
+def test_counter_gauge_and_duplicate_registration(local_registry):
+    counter = local_registry.register(Counter("test_hits_total", "Hits", ["cache", "result"]))
+    counter.labels("chain", "hit").inc()
+    counter.labels("chain", "hit").inc()
+    local_registry.register(Gauge("test_depth", "Depth", ["queue"], collect=lambda: {("pool",): 3}))
+
+    text = local_registry.render()
+    assert 'test_hits_total{cache="chain",result="hit"} 2.0' in text
+    assert 'test_depth{queue="pool"} 3' in text
+    with pytest.raises(ValueError):
+        local_registry.register(Counter("test_hits_total", "Again"))
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+
+
+def test_stage_timer_overhead_is_microseconds():
+    """Test that timing a stage stays within a few microseconds"""
+    iterations = 20000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with stage_timer("overhead_check"):
+            pass
+    per_stage = (time.perf_counter() - start) / iterations
+    assert per_stage < 10e-6
+    assert 'rag_stage_seconds_count{stage="overhead_check"}' in render_metrics()
+
+
+def test_boto_client_calls_are_observed():
+    """Test that S3/DynamoDB clients report per-operation latency"""
+    import boto3
+    from botocore.stub import Stubber
+
+    client = boto3.client(
+        "s3", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    instrument_boto_client(client, "s3")
+    with Stubber(client) as stubber:
+        stubber.add_response("list_buckets", {"Buckets": []})
+        client.list_buckets()
+
+    text = registry.render()
+    assert 'rag_aws_call_seconds_count{service="s3",operation="ListBuckets"}' in text
+
+
+def test_metrics_endpoint(temp_dir, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(temp_dir)
+    import app.main as main
+
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE rag_stage_seconds histogram" in response.text
+    assert "rag_queue_depth" in response.text
@@ -0,0 +1,208 @@
+import pytest
+import os
+import sys
+import json
+import random
+import importlib.util
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+LAMBDA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics_lambda", "lambda_function.py"
+)
+
+
+@pytest.fixture(scope="module")
+def lam():
+    """The Lambda is deployed as a single file, so load it by path"""
+    spec = importlib.util.spec_from_file_location("metrics_lambda_function", LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _matches(condition, item):
+    expression = condition.get_expression()
+    if expression["operator"] == "AND":
+        return all(_matches(value, item) for value in expression["values"])
+    key, value = expression["values"]
+    if expression["operator"] == "=":
+        return item[key.name] == value
+    return item[key.name].startswith(value)
+
+
+class FakeRollupTable:
+    """In-memory stand-in that enforces the conditional writes"""
+
+    def __init__(self):
+        self.items = {}
+        self.before_put = None
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get((Key["bucket"], Key["series"]))
+        return {"Item": dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues=None):
+        if self.before_put:
+            hook, self.before_put = self.before_put, None
+            hook()
+        key = (Item["bucket"], Item["series"])
+        current = self.items.get(key)
+        if ConditionExpression.startswith("attribute_not_exists"):
+            ok = current is None
+        else:
+            ok = current is not None and current["version"] == ExpressionAttributeValues[":version"]
+        if not ok:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[key] = dict(Item)
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=None):
+        return {"Items": [item for item in self.items.values() if _matches(KeyConditionExpression, item)]}
+
+
+class FakeRawTable:
+    """In-memory raw events table that enforces attribute_not_exists on the key"""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeNames):
+        if Item["query_id"] in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[Item["query_id"]] = dict(Item)
+
+
+@pytest.fixture
+def tables(lam):
+    raw, rollups = FakeRawTable(), FakeRollupTable()
+    with patch.object(lam, "_tables", {lam.RAW_TABLE: raw, lam.ROLLUP_TABLE: rollups}):
+        yield raw, rollups
+
+
+def test_sketch_quantiles_are_relatively_accurate_and_mergeable(lam):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-0.5, 0.8) for _ in range(5000)]
+    whole, first, second = lam.LatencySketch(), lam.LatencySketch(), lam.LatencySketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (first if i % 2 else second).add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = float(np.quantile(values, q, method="lower"))
+        assert abs(whole.quantile(q) - exact) / exact <= whole.accuracy + 1e-9
+
+    first.merge(second)
+    assert first.bins == whole.bins and first.count == len(values)
+    assert lam.LatencySketch.from_json(whole.to_json()).bins == whole.bins
+
+
+def test_batch_builds_minute_and_hour_rollups(lam, tables):
+    raw, rollups = tables
+    events = [
+        {"query": "q", "response_time": 1.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:00:10"},
+        {"query": "q", "response_time": 3.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:00:50"},
+        {"query": "q", "response_time": 2.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:01:30"},
+        {"query": "q", "response_time": 0.5, "pdf_name": "b.pdf", "model": "m1", "timestamp": "2024-05-01T10:01:40"},
+    ]
+    result = lam.lambda_handler({"events": events}, None)
+
+    assert result["status"] == "success"
+    assert result["stored"] == 4 and result["conflicts"] == 0
+    # 10:00 and 10:01 for a.pdf, 10:01 for b.pdf, plus hour 10 for each
+    assert result["rollups_written"] == 5
+    assert len(raw.items) == 4
+
+    hour = rollups.items[("h#2024-05-01T10", "a.pdf#m1")]
+    assert (hour["count"], float(hour["sum"]), float(hour["min"]), float(hour["max"])) == (3, 6.0, 1.0, 3.0)
+    assert rollups.items[("m#2024-05-01T10:00", "a.pdf#m1")]["count"] == 2
+    assert hour["expires_at"] > rollups.items[("m#2024-05-01T10:00", "a.pdf#m1")]["expires_at"]
+
+    # A second batch merges into the same rollups
+    lam.lambda_handler({"Records": [{"body": json.dumps({**events[0], "query_id": "later"})}]}, None)
+    assert rollups.items[("h#2024-05-01T10", "a.pdf#m1")]["count"] == 4
+    assert rollups.items[("h#2024-05-01T10", "a.pdf#m1")]["version"] == 2
+
+
+def test_conflicting_writers_retry_instead_of_losing_counts(lam, tables):
+    _, rollups = tables
+    event = {"query": "q", "response_time": 1.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:00:10"}
+    lam.lambda_handler({**event, "query_id": "q1"}, None)
+
+    # Another invocation writes between our read and our conditional put
+    rollups.before_put = lambda: lam.lambda_handler({**event, "query_id": "q2"}, None)
+    with patch.object(lam.time, "sleep"):
+        result = lam.lambda_handler({**event, "query_id": "q3"}, None)
+
+    assert result["conflicts"] == 1
+    assert rollups.items[("m#2024-05-01T10:00", "a.pdf#m1")]["count"] == 3
+    assert rollups.items[("h#2024-05-01T10", "a.pdf#m1")]["count"] == 3
+
+
+def test_redelivered_and_duplicate_events_count_once(lam, tables):
+    raw, rollups = tables
+    first = {"query_id": "q1", "response_time": 1.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:00:10"}
+    anonymous = {"response_time": 2.0, "pdf_name": "a.pdf", "model": "m1", "timestamp": "2024-05-01T10:00:20"}
+    batch = {"Records": [{"body": json.dumps(first)}, {"body": json.dumps(first)}, {"body": json.dumps(anonymous)}]}
+
+    result = lam.lambda_handler(batch, None)
+    assert (result["stored"], result["duplicates"]) == (2, 1)
+
+    # SQS redelivers the whole batch, e.g. after a timeout
+    result = lam.lambda_handler(batch, None)
+    assert (result["stored"], result["duplicates"], result["rollups_written"]) == (0, 3, 0)
+    assert len(raw.items) == 2
+    assert rollups.items[("m#2024-05-01T10:00", "a.pdf#m1")]["count"] == 2
+
+
+def test_plan_buckets_uses_hours_inside_and_minutes_at_the_edges(lam):
+    buckets = lam.plan_buckets(datetime(2024, 5, 1, 9, 58), datetime(2024, 5, 1, 12, 2))
+    assert buckets == [
+        "m#2024-05-01T09:58", "m#2024-05-01T09:59",
+        "h#2024-05-01T10", "h#2024-05-01T11",
+        "m#2024-05-01T12:00", "m#2024-05-01T12:01",
+    ]
+    with pytest.raises(ValueError):
+        lam.plan_buckets(datetime(2024, 1, 1), datetime(2024, 12, 1))
+
+
+def test_query_action_reads_dashboards_from_rollups(lam, tables):
+    events = [
+        {"query": "q", "response_time": t, "pdf_name": pdf, "model": "m1", "timestamp": f"2024-05-01T10:{minute:02d}:00"}
+        for minute in range(0, 60, 5)
+        for pdf, t in (("a.pdf", 1.0 + minute / 10), ("b.pdf", 0.2))
+    ]
+    lam.lambda_handler({"events": events}, None)
+
+    result = lam.lambda_handler({
+        "action": "query", "start": "2024-05-01T10:00:00Z", "end": "2024-05-01T11:00:00Z", "group_by": ["pdf_name"]
+    }, None)
+    assert result["status"] == "success"
+    assert result["buckets_read"] == 1
+    groups = {group["pdf_name"]: group for group in result["groups"]}
+    assert groups["a.pdf"]["count"] == 12 and groups["b.pdf"]["count"] == 12
+    assert groups["a.pdf"]["p95"] == pytest.approx(6.0, rel=0.011)
+    assert groups["b.pdf"]["p50"] == groups["b.pdf"]["max"] == 0.2
+
+    # Half an hour: minute rollups only, filtered to one document
+    result = lam.lambda_handler({
+        "action": "query", "start": "2024-05-01T10:30:00", "end": "2024-05-01T11:00:00", "pdf_name": "a.pdf"
+    }, None)
+    assert result["buckets_read"] == 30
+    assert [(group["pdf_name"], group["model"], group["count"]) for group in result["groups"]] == [("a.pdf", "m1", 6)]
+
+    assert lam.lambda_handler({"action": "query", "group_by": ["user"]}, None)["status"] == "error"
+
+
+def test_get_llm_metrics_looks_up_by_query_id():
+    from aws_service import dynamo_handler
+
+    table = MagicMock()
+    table.query.return_value = {"Items": [{"query_id": "query_1", "timestamp": "2024-05-01T10:00:00"}]}
+    with patch.object(dynamo_handler, "llm_metrics_table", table):
+        assert dynamo_handler.get_llm_metrics("query_1")["timestamp"] == "2024-05-01T10:00:00"
+        table.query.return_value = {"Items": []}
+        assert dynamo_handler.get_llm_metrics("query_2") is None
+    table.get_item.assert_not_called()
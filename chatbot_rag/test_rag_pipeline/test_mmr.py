@@ -0,0 +1,111 @@
+import pytest
+import os
+import sys
+from unittest.mock import Mock
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mmr import adaptive_k, mmr_select, MMRRetriever
+from app.rag_pipeline import Chroma
+
+
+def test_mmr_skips_near_duplicates():
+    """Test that MMR prefers a diverse candidate over a near-duplicate of the first pick"""
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [0.95, 0.30, 0.0],   # most relevant
+        [0.94, 0.31, 0.0],   # near-duplicate of the first
+        [0.80, 0.0, 0.60],   # relevant and different
+    ])
+    selected, relevance = mmr_select(query, candidates, k=2, lambda_mult=0.5)
+    assert selected == [0, 2]
+    assert relevance.shape == (3,)
+
+
+def test_mmr_lambda_one_is_plain_similarity():
+    """Test that lambda=1 reduces to ranking by relevance"""
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=16)
+    candidates = rng.normal(size=(10, 16))
+    selected, relevance = mmr_select(query, candidates, k=4, lambda_mult=1.0)
+    assert selected == list(np.argsort(-relevance)[:4])
+
+
+def test_mmr_k_larger_than_candidates():
+    """Test that k is clipped to the number of candidates"""
+    selected, _ = mmr_select(np.ones(3), np.eye(3), k=10)
+    assert sorted(selected) == [0, 1, 2]
+
+
+def test_adaptive_k_cuts_at_elbow():
+    """Test that a clear drop in similarity shrinks k"""
+    assert adaptive_k(np.array([0.91, 0.90, 0.55, 0.54, 0.53]), max_k=4) == 2
+
+
+def test_adaptive_k_threshold_and_bounds():
+    """Test threshold filtering and the min/max bounds"""
+    flat = np.array([0.80, 0.79, 0.78, 0.77, 0.76])
+    assert adaptive_k(flat, max_k=4) == 4
+    assert adaptive_k(flat, max_k=4, score_threshold=0.785) == 2
+    assert adaptive_k(flat, min_k=3, max_k=4, score_threshold=0.9) == 3
+    assert adaptive_k(np.array([])) == 0
+
+
+def test_mmr_stage_reuses_fetched_embeddings():
+    """Test that reranking a typical over-fetch costs one query embedding and one vector search"""
+    rng = np.random.default_rng(1)
+    candidates = rng.normal(size=(20, 768))
+    vectordb = Mock()
+    vectordb._embedding_function.embed_query.return_value = list(rng.normal(size=768))
+    vectordb._collection.query.return_value = {
+        "documents": [[f"chunk {i}" for i in range(20)]],
+        "metadatas": [[{"chunk": i} for i in range(20)]],
+        "embeddings": [candidates.tolist()],
+    }
+
+    documents = MMRRetriever(vectordb=vectordb, fetch_k=20, max_k=4, score_threshold=-1.0).invoke("q")
+
+    # Candidate vectors come back with the search; nothing is re-embedded or fetched per candidate
+    vectordb._embedding_function.embed_query.assert_called_once_with("q")
+    vectordb._embedding_function.embed_documents.assert_not_called()
+    vectordb._collection.query.assert_called_once()
+    assert "embeddings" in vectordb._collection.query.call_args.kwargs["include"]
+    assert 1 <= len(documents) <= 4
+    assert len({doc.metadata["chunk"] for doc in documents}) == len(documents)
+
+
+def test_mmr_retriever_with_chroma(temp_dir):
+    """Test the retriever end to end against a real Chroma collection"""
+
+    class AxisEmbeddings:
+        VECTORS = {
+            "gradient descent": [1.0, 0.0, 0.0],
+            "gradient descent steps": [0.999, 0.045, 0.0],
+            "learning rate schedule": [0.8, 0.0, 0.6],
+            "cooking pasta": [0.0, 1.0, 0.0],
+        }
+
+        def embed_documents(self, texts):
+            return [self.VECTORS[t] for t in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0, 0.0]
+
+    vectordb = Chroma.from_texts(
+        texts=list(AxisEmbeddings.VECTORS),
+        embedding=AxisEmbeddings(),
+        persist_directory=temp_dir,
+        collection_name="mmr-test"
+    )
+    retriever = MMRRetriever(
+        vectordb=vectordb, fetch_k=4, max_k=2, lambda_mult=0.4, score_threshold=0.5
+    )
+    documents = retriever.invoke("gradient")
+    contents = [doc.page_content for doc in documents]
+
+    # The near-duplicate loses to the diverse chunk; the irrelevant one never qualifies
+    assert contents == ["gradient descent", "learning rate schedule"]
+    assert "similarity" in documents[0].metadata
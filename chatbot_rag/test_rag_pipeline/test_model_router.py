@@ -0,0 +1,86 @@
+import pytest
+import os
+import time
+from unittest.mock import patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from app.context_packing import estimate_tokens, pack_context
+from app.model_router import ModelProfile, ModelRouter
+from app.resilience import get_circuit_breaker, get_latency_tracker
+
+
+@pytest.fixture
+def router():
+    """Fast and full model with fresh latency trackers and breakers"""
+    with patch.dict("app.resilience._trackers", clear=True), patch.dict("app.resilience._breakers", clear=True):
+        yield ModelRouter([
+            ModelProfile("fast", prior_seconds=1.0, concurrency=2),
+            ModelProfile("full", prior_seconds=3.0, concurrency=2)
+        ])
+
+
+def test_simple_question_goes_to_fast_model(router):
+    decision = router.route("What is the learning rate?", context_tokens=1000)
+    assert decision.model == "fast"
+    assert decision.reason == "simple_question"
+
+
+def test_complex_question_goes_to_full_model(router):
+    decision = router.route("Compare supervised and unsupervised learning", context_tokens=1000)
+    assert decision.model == "full"
+    assert decision.reason == "complex_question"
+
+
+def test_budget_falls_back_to_faster_model(router):
+    """Test that the full model is skipped when it would miss the latency budget"""
+    decision = router.route("Explain why dropout helps", context_tokens=1000, latency_budget=2.0)
+    assert decision.model == "fast"
+    assert decision.reason == "budget_fallback"
+
+    decision = router.route("Explain why dropout helps", context_tokens=1000, latency_budget=0.1)
+    assert decision.model == "fast"
+    assert decision.reason == "budget_at_risk"
+
+
+def test_queue_depth_and_learned_latency(router):
+    """Test that in-flight requests and observed latencies change the estimate"""
+    for _ in range(50):
+        get_latency_tracker("full").record(1.2)
+    assert router.route("Explain dropout", context_tokens=0, latency_budget=1.5).model == "full"
+
+    with router.track("full"), router.track("full"):
+        decision = router.route("Explain dropout", context_tokens=0, latency_budget=1.5)
+    assert decision.model == "fast"
+    assert router.in_flight("full") == 0
+
+
+def test_open_circuit_is_avoided(router):
+    breaker = get_circuit_breaker("full")
+    breaker._open(time.monotonic())
+    decision = router.route("Summarize the paper", context_tokens=1000)
+    assert decision.model == "fast"
+    assert decision.reason == "unavailable_fallback"
+    assert router.summary()["served"]["fast"]["unavailable_fallback"] == 1
+
+
+def test_routing_before_retrieval_assumes_a_full_context(router):
+    """Test that the pre-retrieval estimate is an upper bound on the packed prompt"""
+    question = "What is the learning rate?"
+    decision = router.route(question)
+    assert decision.prompt_tokens == estimate_tokens(question) + config.CONTEXT_TOKEN_BUDGET
+
+    chunks = [f"The learning rate controls step size in experiment {i}. " * 20 for i in range(12)]
+    packed, _ = pack_context(question, chunks, token_budget=config.CONTEXT_TOKEN_BUDGET)
+    assert estimate_tokens(question) + sum(estimate_tokens(c) for c in packed) <= decision.prompt_tokens
+
+    # A model too small for the worst case is skipped even though the real context may be short
+    small = ModelRouter([
+        ModelProfile("tiny", prior_seconds=0.5, max_tokens=config.CONTEXT_TOKEN_BUDGET),
+        ModelProfile("fast", prior_seconds=1.0)
+    ])
+    assert small.route(question).model == "fast"
+    assert small.route(question, context_tokens=200).model == "tiny"
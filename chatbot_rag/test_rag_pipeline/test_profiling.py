@@ -0,0 +1,131 @@
+import pytest
+import os
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.profiling import (
+    ProfilerBusy, is_admin, profile_path, profile_scope, start_tracemalloc, stop_tracemalloc,
+    take_tracemalloc_snapshot
+)
+
+
+def busy_split(n: int = 200000) -> int:
+    total = 0
+    for i in range(n):
+        total += i % 7
+    return total
+
+
+@pytest.fixture
+def in_temp_dir(temp_dir, monkeypatch):
+    monkeypatch.chdir(temp_dir)
+    return temp_dir
+
+
+def test_admin_token_required():
+    with patch("config.ADMIN_TOKEN", ""):
+        assert not is_admin("anything")
+    with patch("config.ADMIN_TOKEN", "s3cret"):
+        assert is_admin("s3cret")
+        assert not is_admin("wrong")
+        assert not is_admin(None)
+        assert not is_admin("s3crét")
+
+
+def test_sampling_profile_writes_folded_stacks(in_temp_dir):
+    with profile_scope("sampling", "test") as session:
+        for _ in range(20):
+            busy_split()
+        report = session.report()
+
+    assert report["samples"] > 0
+    assert any("busy_split" in row["frame"] for row in report["top_frames"])
+    with open(os.path.join("profiles", report["file"])) as f:
+        line = f.readline()
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith("MainThread;")
+    assert int(count) > 0
+
+
+def test_cprofile_covers_worker_threads(in_temp_dir):
+    """Test that work handed to another thread via session.run is profiled"""
+    with profile_scope("cprofile", "test") as session:
+        worker = threading.Thread(target=lambda: session.run(busy_split))
+        worker.start()
+        worker.join()
+        report = session.report()
+
+    assert report["file"].endswith(".prof")
+    assert any("busy_split" in row["function"] for row in report["top_functions"])
+
+
+def test_one_profile_at_a_time(in_temp_dir):
+    with profile_scope("sampling", "first"):
+        with pytest.raises(ProfilerBusy):
+            with profile_scope("sampling", "second"):
+                pass
+    with profile_scope(None, "unprofiled") as session:
+        assert session is None
+
+
+def test_profile_path_stays_in_profile_dir(in_temp_dir):
+    os.makedirs("profiles")
+    open(os.path.join("profiles", "a.folded"), "w").close()
+    assert profile_path("a.folded") == os.path.join("profiles", "a.folded")
+    assert profile_path("../a.folded") is None
+    assert profile_path("missing.folded") is None
+
+
+def test_tracemalloc_snapshots_report_growth(in_temp_dir):
+    start_tracemalloc(frames=5)
+    try:
+        first = take_tracemalloc_snapshot(limit=5)
+        retained = [bytearray(1024) for _ in range(1000)]
+        second = take_tracemalloc_snapshot(limit=5)
+    finally:
+        stop_tracemalloc()
+
+    assert first["growth"] is None
+    assert second["growth"][0]["size_diff_bytes"] > 500 * 1024
+    assert os.path.exists(os.path.join("profiles", second["file"]))
+    assert len(retained) == 1000
+    with pytest.raises(RuntimeError):
+        take_tracemalloc_snapshot()
+
+
+def test_ask_profile_flag_is_admin_only(in_temp_dir):
+    from fastapi.testclient import TestClient
+    from app.state import MemoryStateStore, set_state_store
+    import app.main as main
+
+    store = MemoryStateStore()
+    store.set_current_document("ml.pdf", "doc-ml", "vectorstore")
+    set_state_store(store)
+
+    chain = Mock()
+    chain.invoke.side_effect = lambda inputs: {"result": str(busy_split()), "source_documents": []}
+    try:
+        with patch.object(main, "get_chain_for", return_value=chain), \
+                patch.object(main.limiter, "enabled", False), \
+                patch("config.AWS_AVAILABLE", False), \
+                patch("config.ADMIN_TOKEN", "s3cret"):
+            client = TestClient(main.app)
+            denied = client.post("/ask?profile=cprofile", data={"question": "What is ML?"})
+            allowed = client.post(
+                "/ask?profile=cprofile",
+                data={"question": "What is ML?"},
+                headers={"X-Admin-Token": "s3cret"}
+            )
+            name = allowed.json()["profile"]["file"]
+            download = client.get(f"/admin/profiles/{name}", headers={"X-Admin-Token": "s3cret"})
+    finally:
+        set_state_store(None)
+
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
+    assert any("busy_split" in row["function"] for row in allowed.json()["profile"]["top_functions"])
+    assert download.status_code == 200
@@ -0,0 +1,111 @@
+import pytest
+import os
+import sys
+import json
+import time
+import subprocess
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from app.providers import FakeStreamingChatModel, HashingEmbeddings, LatencyDistribution, local_chat_model
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_hashing_embeddings_are_deterministic_and_normalised():
+    embeddings = HashingEmbeddings(dimension=64)
+    first, second = embeddings.embed_documents(["Machine learning models", "Machine learning models"])
+    assert len(first) == 64
+    assert first == second
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert HashingEmbeddings(dimension=64).embed_query("Machine learning models") == first
+
+
+def test_hashing_embeddings_rank_related_text_higher():
+    embeddings = HashingEmbeddings(dimension=256)
+    query = np.array(embeddings.embed_query("what is supervised learning"))
+    related, unrelated = (np.array(v) for v in embeddings.embed_documents([
+        "Supervised learning trains a model on labeled examples",
+        "The weather in Lisbon is mild in winter"
+    ]))
+    assert query @ related > query @ unrelated
+
+
+def test_fake_model_streams_tokens_with_configured_latency():
+    model = FakeStreamingChatModel(
+        response_tokens=5,
+        first_token=LatencyDistribution(0.05, sigma=0),
+        inter_token=LatencyDistribution(0.01, sigma=0)
+    )
+    start = time.perf_counter()
+    stream = model.stream([HumanMessage(content="one two three four five six seven")])
+    first = next(stream)
+    first_token_seconds = time.perf_counter() - start
+    rest = list(stream)
+
+    assert first.content == "one "
+    assert len(rest) == 4
+    assert 0.05 <= first_token_seconds < 0.5
+    assert model.invoke([HumanMessage(content="one two three")]).content == "one two three"
+
+
+def test_latency_distribution_is_reproducible_with_seed():
+    a = LatencyDistribution(0.2, sigma=0.5, seed=7)
+    b = LatencyDistribution(0.2, sigma=0.5, seed=7)
+    samples = [a.sample() for _ in range(5)]
+    assert samples == [b.sample() for _ in range(5)]
+    assert len(set(samples)) > 1
+
+
+def test_providers_selected_by_config():
+    from app.rag_pipeline import get_embeddings, get_llm
+
+    with patch("config.EMBEDDINGS_PROVIDER", "local"), patch("config.LLM_PROVIDER", "local"), \
+            patch("config.LOCAL_EMBEDDING_DIM", 32):
+        embeddings = get_embeddings()
+        llm = get_llm(model_name="gemini-1.5-flash", max_output_tokens=10)
+
+    assert isinstance(embeddings, HashingEmbeddings)
+    assert embeddings.dimension == 32
+    assert isinstance(llm, FakeStreamingChatModel)
+    assert llm.model_name == "gemini-1.5-flash"
+    assert llm.response_tokens == 10
+
+    with patch("config.LLM_PROVIDER", "openai"):
+        with pytest.raises(ValueError):
+            get_llm()
+
+
+def test_local_pipeline_runs_without_google_api_key(temp_dir):
+    """Test indexing and answering end to end with no network and no API key"""
+    script = """
+import json
+from app.rag_pipeline import get_vectorstore, get_qa_chain
+store = get_vectorstore(
+    "Supervised learning uses labeled data. Unsupervised learning finds structure in unlabeled data.",
+    persist_dir=%r, source="ml.pdf"
+)
+result = get_qa_chain(store).invoke({"query": "What does supervised learning use?"})
+print(json.dumps({"answer": result["result"], "sources": len(result["source_documents"])}))
+""" % os.path.join(temp_dir, "vectorstore")
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_API_KEY": "",
+        "EMBEDDINGS_PROVIDER": "local",
+        "LLM_PROVIDER": "local",
+        "LOCAL_LLM_FIRST_TOKEN_MS": "1",
+        "LOCAL_LLM_TOKEN_MS": "0",
+        "ROUTER_ENABLED": "false",
+    })
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert result["answer"]
+    assert result["sources"] >= 1
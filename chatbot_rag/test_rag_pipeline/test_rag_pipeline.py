@@ -17,6 +17,7 @@ from app.rag_pipeline import (
     get_vectorstore_info
 )
 from app.utils import extract_text_from_pdf, validate_pdf_file, get_pdf_info
+from app.index_manifest import IndexManifest
 
 
 class TestRAGPipeline:
@@ -157,35 +158,38 @@ class TestRAGPipeline:
         with open(os.path.join(temp_dir, "test.txt"), "w") as f:
             f.write("test")
         
+        generation = IndexManifest(temp_dir).record_document("a.pdf", "doc-a", 1)
+        
         clear_vectorstore(temp_dir)
-        assert not os.path.exists(temp_dir)
+        assert sorted(os.listdir(temp_dir)) == ["manifest.json", "manifest.json.lock"]
+        manifest = IndexManifest(temp_dir).read()
+        assert manifest["documents"] == {} and manifest["generation"] == generation + 1
     
     def test_clear_vectorstore_nonexistent(self):
         """Test clearing non-existent vector store"""
         # Should not raise an error
         clear_vectorstore("nonexistent_dir")
     
-    @patch('app.rag_pipeline.GoogleGenerativeAIEmbeddings')
-    @patch('app.rag_pipeline.Chroma')
-    def test_get_vectorstore_info_exists(self, mock_chroma, mock_embeddings, temp_dir):
-        """Test getting vector store info when it exists"""
-        # Create temp_dir to simulate existing vector store
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        mock_embeddings_instance = Mock()
-        mock_embeddings.return_value = mock_embeddings_instance
-        
-        mock_chroma_instance = Mock()
-        mock_collection = Mock()
-        mock_collection.count.return_value = 10
-        mock_chroma_instance._collection = mock_collection
-        mock_chroma.return_value = mock_chroma_instance
+    def test_get_vectorstore_info_exists(self, temp_dir):
+        """Test that info totals every collection without creating the default one"""
+        import chromadb
+        from chromadb.api.client import SharedSystemClient
+
+        client = chromadb.PersistentClient(path=temp_dir)
+        for name, rows in (("doc-a", 6), ("doc-b", 4)):
+            client.create_collection(name).add(
+                ids=[f"{name}-{i}" for i in range(rows)], embeddings=[[float(i), 1.0] for i in range(rows)]
+            )
+        IndexManifest(temp_dir).record_document("a.pdf", "doc-a", 6)
         
         result = get_vectorstore_info(temp_dir)
         
         assert result["exists"] is True
         assert result["count"] == 10
+        assert result["collections"] == 2 and result["documents"] == 1
         assert result["directory"] == temp_dir
+        assert sorted(c.name for c in client.list_collections()) == ["doc-a", "doc-b"]
+        SharedSystemClient.clear_system_cache()
     
     def test_get_vectorstore_info_nonexistent(self):
         """Test getting vector store info when it doesn't exist"""
@@ -0,0 +1,177 @@
+import pytest
+import os
+import time
+import asyncio
+import threading
+from unittest.mock import Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessageChunk
+
+from app.metrics import LLM_SECONDS
+from app.providers import FakeStreamingChatModel, LatencyDistribution
+from app.resilience import (
+    CircuitBreaker, CircuitOpenError, HedgedChatModel, LatencyTracker, ResilienceStats,
+    ahedged_call, hedged_call
+)
+
+
+def slow_then_fast(slow_seconds: float = 1.0):
+    """Callable whose first call is slow and later calls return immediately"""
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(time.perf_counter())
+            attempt = len(calls)
+        if attempt == 1:
+            time.sleep(slow_seconds)
+        return f"attempt-{attempt}"
+
+    return fn, calls
+
+
+def test_hedge_fires_after_delay_and_fast_attempt_wins():
+    """Test that a slow first attempt is hedged and the hedge's result is used"""
+    stats = ResilienceStats()
+    fn, calls = slow_then_fast()
+    start = time.perf_counter()
+    result = hedged_call(fn, delay=0.05, stats=stats)
+
+    assert result == "attempt-2"
+    assert time.perf_counter() - start < 0.5
+    assert len(calls) == 2
+    assert stats.summary()["hedged"] == 1
+    assert stats.summary()["hedge_wins"] == 1
+    # The slow first attempt was already running, so it could only be abandoned
+    assert stats.summary()["cancelled_attempts"] == 0
+    assert stats.summary()["abandoned_attempts"] == 1
+
+
+def test_fast_call_is_not_hedged():
+    """Test that calls finishing within the delay run once"""
+    stats = ResilienceStats()
+    fn = Mock(return_value="ok")
+    assert hedged_call(fn, delay=1.0, stats=stats) == "ok"
+    fn.assert_called_once()
+    assert stats.summary()["hedged"] == 0
+
+
+def test_hedge_survives_a_failed_attempt():
+    """Test that a failing attempt falls back to the other one"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise RuntimeError("provider error")
+        time.sleep(0.2)
+        return "second"
+
+    assert hedged_call(fn, delay=0.01, stats=ResilienceStats()) == "second"
+
+
+def test_async_hedge_cancels_loser():
+    """Test that the losing async attempt is cancelled"""
+    cancelled = []
+    attempts = []
+
+    async def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return len(attempts)
+
+    async def scenario():
+        result = await ahedged_call(fn, delay=0.05, stats=stats)
+        await asyncio.sleep(0)
+        return result
+
+    stats = ResilienceStats()
+    assert asyncio.run(scenario()) == 2
+    assert cancelled == [True]
+    assert stats.summary()["cancelled_attempts"] == 1
+
+
+def test_latency_tracker_learns_hedge_delay():
+    """Test the warm-up delay, learned percentile and clamping"""
+    tracker = LatencyTracker(initial_delay=3.0, min_delay=0.2, max_delay=2.0, min_samples=10)
+    assert tracker.hedge_delay() == 3.0
+
+    for i in range(100):
+        tracker.record(0.5 if i < 95 else 1.5)
+    assert tracker.hedge_delay() == pytest.approx(0.5)
+
+    for _ in range(100):
+        tracker.record(9.0)
+    assert tracker.hedge_delay() == 2.0
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test closed -> open -> half-open -> closed"""
+    breaker = CircuitBreaker("gemini", error_rate=0.5, min_requests=4, window_seconds=60, cooldown_seconds=10)
+    with patch("app.resilience.time.monotonic", return_value=100.0):
+        for ok in (True, False, False, False):
+            breaker.before_call()
+            breaker.record(ok)
+        assert breaker.state == "open"
+        assert not breaker.accepting()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    with patch("app.resilience.time.monotonic", return_value=111.0):
+        assert breaker.accepting()
+        breaker.before_call()
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(True)
+        assert breaker.state == "closed"
+
+
+def test_hedged_chat_model_invoke_and_breaker():
+    """Test the chat model wrapper end to end"""
+    model = Mock()
+    model.stream.side_effect = lambda *args, **kwargs: iter([AIMessageChunk(content="ans"), AIMessageChunk(content="wer")])
+    breaker = CircuitBreaker("m", min_requests=3, error_rate=0.5)
+    stats = ResilienceStats()
+    llm = HedgedChatModel(model=model, tracker=LatencyTracker(), breaker=breaker, stats=stats)
+
+    assert llm.invoke("question").content == "answer"
+    assert stats.summary()["requests"] == 1
+
+    model.stream.side_effect = RuntimeError("503")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            llm.invoke("question")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        llm.invoke("question")
+    assert stats.summary()["rejected_by_breaker"] == 1
+
+
+def test_hedged_chat_model_measures_first_token_separately():
+    """The first-token series comes from the first streamed chunk, not the whole answer"""
+    model = FakeStreamingChatModel(
+        response_tokens=5,
+        first_token=LatencyDistribution(0.01, sigma=0),
+        inter_token=LatencyDistribution(0.05, sigma=0)
+    )
+    llm = HedgedChatModel(
+        model=model, tracker=LatencyTracker(), breaker=CircuitBreaker("ttft"),
+        stats=ResilienceStats(), hedging=False, model_name="ttft-test"
+    )
+    assert len(llm.invoke("one two three four five").content.split()) == 5
+    first_token = LLM_SECONDS.labels("ttft-test", "first_token")
+    total = LLM_SECONDS.labels("ttft-test", "total")
+    assert first_token.sum < 0.1
+    assert total.sum >= 0.2
@@ -0,0 +1,156 @@
+import pytest
+import os
+from unittest.mock import patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.deadline import DeadlineExceeded, deadline_scope
+from app.index_manifest import IndexManifest
+from app.rag_pipeline import Chroma, collection_name_for
+from app.retrieval import (
+    MultiCollectionRetriever,
+    OwnerLookupError,
+    list_document_collections,
+    reset_store_cache,
+    resolve_collections,
+    search_collections
+)
+
+
+class KeywordEmbeddings:
+    """Embeds text by counting a few fixed keywords"""
+
+    KEYWORDS = ["neural", "tree", "cluster"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+
+
+@pytest.fixture
+def corpus_dir(temp_dir):
+    """Vector store with one collection per document"""
+    embeddings = KeywordEmbeddings()
+    documents = {
+        "nets.pdf": ["neural networks learn weights", "deep neural neural models"],
+        "trees.pdf": ["a decision tree splits data", "tree ensembles and tree boosting"],
+        "clusters.pdf": ["cluster analysis groups points"],
+    }
+    for source, chunks in documents.items():
+        Chroma.from_texts(
+            texts=chunks,
+            embedding=embeddings,
+            persist_directory=temp_dir,
+            collection_name=collection_name_for(source),
+            collection_metadata={"source": source},
+            metadatas=[{"source": source, "chunk": i} for i in range(len(chunks))]
+        )
+        IndexManifest(temp_dir).record_document(source, collection_name_for(source), len(chunks))
+    reset_store_cache()
+    with patch("app.retrieval.get_embeddings", return_value=embeddings):
+        yield temp_dir
+    reset_store_cache()
+
+
+def test_list_document_collections(corpus_dir):
+    """Test discovery of per-document collections from the manifest, without opening the index"""
+    with patch("chromadb.PersistentClient", side_effect=AssertionError("opened the index")):
+        documents = list_document_collections(corpus_dir)
+    assert set(documents) == {"nets.pdf", "trees.pdf", "clusters.pdf"}
+    assert documents["nets.pdf"] == collection_name_for("nets.pdf")
+
+
+def test_search_collections_merges_global_top_k(corpus_dir):
+    """Test that results from all collections are merged by distance"""
+    collections = resolve_collections(corpus_dir)
+    results = search_collections("tree tree", collections, persist_dir=corpus_dir, k=3)
+
+    assert len(results) == 3
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert results[0][0].metadata["source"] == "trees.pdf"
+
+
+def test_resolve_collections_user_filter(corpus_dir):
+    """Test that the owner filter uses the user_id index and fails loudly when it cannot"""
+    with patch("config.AWS_AVAILABLE", True), \
+            patch("aws_service.dynamo_handler.list_user_pdfs", return_value=[{"filename": "trees.pdf"}]) as owned:
+        assert resolve_collections(corpus_dir, user_id="alice") == [collection_name_for("trees.pdf")]
+    owned.assert_called_once_with("alice", raise_errors=True)
+
+    with patch("config.AWS_AVAILABLE", True), \
+            patch("aws_service.dynamo_handler.list_user_pdfs", side_effect=RuntimeError("no index")):
+        with pytest.raises(OwnerLookupError):
+            resolve_collections(corpus_dir, user_id="alice")
+
+    with patch("config.AWS_AVAILABLE", False), pytest.raises(OwnerLookupError):
+        resolve_collections(corpus_dir, user_id="alice")
+
+
+def test_resolve_collections_filename_filter(corpus_dir):
+    """Test narrowing the search to named documents"""
+    collections = resolve_collections(corpus_dir, filenames=["nets.pdf", "missing.pdf"])
+    assert collections == [collection_name_for("nets.pdf")]
+
+
+def test_multi_collection_retriever(corpus_dir):
+    """Test the retriever wrapper annotates documents with their distance"""
+    retriever = MultiCollectionRetriever(
+        collection_names=resolve_collections(corpus_dir), persist_dir=corpus_dir, k=2
+    )
+    documents = retriever.invoke("neural")
+    assert len(documents) == 2
+    assert all(doc.metadata["source"] == "nets.pdf" for doc in documents)
+    assert "distance" in documents[0].metadata
+
+
+def test_queued_searches_do_not_run_after_the_deadline(corpus_dir):
+    """Test that searches still queued when the deadline passes are dropped, not run"""
+    import time
+    from app import retrieval
+
+    searched = []
+    original = retrieval._get_store
+
+    def slow_store(persist_dir, collection_name):
+        searched.append(collection_name)
+        time.sleep(0.3)
+        return original(persist_dir, collection_name)
+
+    with patch.object(retrieval, "_search_pool", retrieval.ThreadPoolExecutor(max_workers=1)), \
+            patch.object(retrieval, "_get_store", side_effect=slow_store):
+        with deadline_scope(0.1), pytest.raises(DeadlineExceeded):
+            search_collections("tree", resolve_collections(corpus_dir), persist_dir=corpus_dir)
+        retrieval._search_pool.shutdown(wait=True)
+    assert len(searched) == 1
+
+
+def test_search_collections_empty():
+    """Test searching with no collections"""
+    assert search_collections("anything", []) == []
+
+
+def test_legacy_collection_is_searchable_once_registered(corpus_dir):
+    """Test that cross-document search includes the default collection the manifest recovered"""
+    from app.warm_start import LEGACY_DOCUMENT, recover_manifest
+
+    Chroma.from_texts(
+        texts=["neural nets from the old single-collection index"],
+        embedding=KeywordEmbeddings(),
+        persist_directory=corpus_dir
+    )
+    # An index persisted before the manifest existed
+    os.remove(os.path.join(corpus_dir, "manifest.json"))
+    assert list_document_collections(corpus_dir) == {}
+
+    recover_manifest(corpus_dir)
+    documents = list_document_collections(corpus_dir)
+    assert documents[LEGACY_DOCUMENT] == "langchain"
+    assert documents["nets.pdf"] == collection_name_for("nets.pdf")
+    assert "langchain" in resolve_collections(corpus_dir)
+    assert IndexManifest(corpus_dir).read()["documents"][LEGACY_DOCUMENT]["chunks"] == 1
@@ -0,0 +1,199 @@
+import pytest
+import io
+import os
+import sys
+import json
+import threading
+from unittest.mock import Mock, patch
+
+from botocore.exceptions import ClientError
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+
+from aws_service import s3_handler
+from app.index_manifest import IndexManifest
+from app.state import MemoryStateStore
+from app.warm_start import WarmupState, rehydrate
+from app.snapshots import (
+    SnapshotConflict, bootstrap_from_snapshot, export_snapshot, import_snapshot, read_snapshot
+)
+
+
+class FakeBucketS3:
+    """In-memory S3 client with the calls snapshots make"""
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        with self._lock:
+            self.objects[Key] = Body
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.objects.pop(Key, None)
+
+
+@pytest.fixture
+def fake_s3():
+    client = FakeBucketS3()
+    with patch.object(s3_handler, "s3", client), \
+            patch("config.EMBEDDINGS_PROVIDER", "local"), patch("config.LOCAL_EMBEDDING_DIM", 32):
+        yield client
+    SharedSystemClient.clear_system_cache()
+
+
+def build_index(persist_dir, documents):
+    """Index documents with the offline embedder, as uploads do"""
+    from app.clients import clear_registry
+    from app.rag_pipeline import get_vectorstore
+
+    clear_registry()
+    for filename, text in documents.items():
+        get_vectorstore(text, persist_dir=persist_dir, source=filename)
+    SharedSystemClient.clear_system_cache()
+
+
+def collection_contents(persist_dir):
+    client = chromadb.PersistentClient(path=persist_dir)
+    contents = {}
+    for collection in client.list_collections():
+        rows = collection.get(include=["embeddings", "documents", "metadatas"])
+        contents[collection.name] = {
+            "metadata": collection.metadata,
+            "rows": sorted(zip(rows["ids"], rows["documents"], [json.dumps(m, sort_keys=True) for m in rows["metadatas"]])),
+            "embeddings": {i: [round(x, 5) for x in e] for i, e in zip(rows["ids"], rows["embeddings"])}
+        }
+    SharedSystemClient.clear_system_cache()
+    return contents
+
+
+DOCUMENTS = {
+    "a.pdf": " ".join(f"Alpha sentence number {i} about gradient descent." for i in range(120)),
+    "b.pdf": " ".join(f"Beta sentence number {i} about decision trees." for i in range(60))
+}
+
+
+def test_export_then_import_restores_the_index(temp_dir, fake_s3):
+    source_dir = os.path.join(temp_dir, "source")
+    build_index(source_dir, DOCUMENTS)
+
+    snapshot = export_snapshot(source_dir, "docs", "snaps", part_rows=3, workers=4)
+    assert snapshot["rows"] == sum(doc["chunks"] for doc in IndexManifest(source_dir).read()["documents"].values())
+    assert len(snapshot["collections"]) == 2 and all(len(c["parts"]) > 1 for c in snapshot["collections"])
+    assert read_snapshot("docs", "snaps")["snapshot_id"] == snapshot["snapshot_id"]
+
+    target_dir = os.path.join(temp_dir, "target")
+    report = import_snapshot(target_dir, "docs", "snaps", workers=4)
+
+    assert report["status"] == "imported" and report["documents"] == 2
+    assert collection_contents(target_dir) == collection_contents(source_dir)
+    imported = IndexManifest(target_dir).read()
+    assert imported["documents"] == IndexManifest(source_dir).read()["documents"]
+    assert imported["generation"] > snapshot["generation"]
+    assert not [name for name in os.listdir(temp_dir) if ".import-" in name or ".replaced-" in name]
+
+
+def test_import_skips_a_non_empty_index_unless_forced(temp_dir, fake_s3):
+    build_index(os.path.join(temp_dir, "source"), {"a.pdf": DOCUMENTS["a.pdf"]})
+    export_snapshot(os.path.join(temp_dir, "source"), "docs", "snaps")
+
+    target_dir = os.path.join(temp_dir, "target")
+    build_index(target_dir, {"b.pdf": DOCUMENTS["b.pdf"]})
+    assert import_snapshot(target_dir, "docs", "snaps")["status"] == "skipped"
+
+    assert import_snapshot(target_dir, "docs", "snaps", force=True)["status"] == "imported"
+    assert list(IndexManifest(target_dir).read()["documents"]) == ["a.pdf"]
+
+
+def test_export_retries_when_the_generation_moves(temp_dir, fake_s3):
+    source_dir = os.path.join(temp_dir, "source")
+    build_index(source_dir, {"a.pdf": DOCUMENTS["a.pdf"]})
+    manifest = IndexManifest(source_dir)
+    generations = iter([manifest.generation() + 1, manifest.generation(), manifest.generation()])
+
+    with patch.object(IndexManifest, "generation", lambda self: next(generations)):
+        snapshot = export_snapshot(source_dir, "docs", "snaps")
+    # Parts of the abandoned attempt are removed; only the committed snapshot remains
+    prefixes = {key.split("/")[1] for key in fake_s3.objects if key != "snaps/latest.json"}
+    assert prefixes == {snapshot["snapshot_id"]}
+
+    with patch.object(IndexManifest, "generation", lambda self: -1):
+        with pytest.raises(SnapshotConflict):
+            export_snapshot(source_dir, "docs", "snaps", attempts=2)
+
+
+def test_upload_during_import_survives(temp_dir, fake_s3):
+    """Test that a document recorded while the snapshot downloads is not swapped away"""
+    from app import snapshots
+
+    build_index(os.path.join(temp_dir, "source"), {"a.pdf": DOCUMENTS["a.pdf"]})
+    export_snapshot(os.path.join(temp_dir, "source"), "docs", "snaps")
+    target_dir = os.path.join(temp_dir, "target")
+    load_collections = snapshots._load_collections
+
+    def load_then_upload(*args, **kwargs):
+        load_collections(*args, **kwargs)
+        build_index(target_dir, {"b.pdf": DOCUMENTS["b.pdf"]})
+
+    with patch.object(snapshots, "_load_collections", load_then_upload):
+        with pytest.raises(SnapshotConflict):
+            import_snapshot(target_dir, "docs", "snaps")
+
+    assert list(IndexManifest(target_dir).read()["documents"]) == ["b.pdf"]
+    assert set(collection_contents(target_dir)) == {IndexManifest(target_dir).read()["documents"]["b.pdf"]["collection"]}
+    assert not [name for name in os.listdir(temp_dir) if ".import-" in name or ".replaced-" in name]
+
+
+def test_import_rejects_corrupt_or_incompatible_snapshots(temp_dir, fake_s3):
+    build_index(os.path.join(temp_dir, "source"), {"a.pdf": DOCUMENTS["a.pdf"]})
+    export_snapshot(os.path.join(temp_dir, "source"), "docs", "snaps")
+    target_dir = os.path.join(temp_dir, "target")
+
+    with patch("config.LOCAL_EMBEDDING_DIM", 64), pytest.raises(ValueError):
+        import_snapshot(target_dir, "docs", "snaps")
+
+    part_key = next(key for key in fake_s3.objects if key.endswith(".npy.gz"))
+    fake_s3.objects[part_key] = b"corrupted"
+    with pytest.raises(IOError):
+        import_snapshot(target_dir, "docs", "snaps")
+    assert not os.path.exists(target_dir)
+
+
+def test_startup_bootstrap_imports_before_rehydrating(temp_dir, fake_s3):
+    target_dir = os.path.join(temp_dir, "target")
+    assert bootstrap_from_snapshot(target_dir) == {"status": "none"}
+
+    build_index(os.path.join(temp_dir, "source"), DOCUMENTS)
+    export_snapshot(os.path.join(temp_dir, "source"), "docs", "snaps")
+
+    store = MemoryStateStore()
+    state = WarmupState()
+    with patch("config.SNAPSHOT_PREFIX", "snaps"), patch("config.S3_BUCKET_NAME", "docs"), \
+            patch("app.rag_pipeline.Chroma"):
+        rehydrate(target_dir, store, Mock, state, bootstrap=lambda: bootstrap_from_snapshot(target_dir))
+
+    assert state.ready and state.to_dict()["snapshot"]["status"] == "imported"
+    assert state.documents == 2 and store.get_current_document() is not None
+
+
+def test_failed_bootstrap_falls_back_to_the_local_index(temp_dir):
+    def failing():
+        raise RuntimeError("S3 unreachable")
+
+    state = WarmupState()
+    rehydrate(temp_dir, MemoryStateStore(), Mock, state, bootstrap=failing)
+    assert state.ready and state.snapshot == {"status": "failed", "error": "S3 unreachable"}
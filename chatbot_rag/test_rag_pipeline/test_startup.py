@@ -0,0 +1,79 @@
+import pytest
+import os
+import sys
+import json
+import subprocess
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import plus lifespan startup must stay under this, even with AWS unreachable
+STARTUP_BUDGET_SECONDS = 8.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as client:
+    elapsed = time.perf_counter() - started
+    status = client.get("/status").json()
+print(json.dumps({
+    "elapsed": elapsed,
+    "startup": status["startup"],
+    "heavy_modules": [m for m in ("langchain_google_genai", "chromadb") if m in sys.modules],
+}))
+"""
+
+
+@pytest.fixture
+def unreachable_aws_env(temp_dir):
+    """Environment pointing AWS at a closed port, with state kept in memory"""
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_API_KEY": "test",
+        "ENDPOINT_URL": "http://127.0.0.1:9",
+        "STATE_BACKEND": "memory",
+        "VECTORSTORE_DIR": os.path.join(temp_dir, "vectorstore"),
+    })
+    return env
+
+
+def test_import_does_not_touch_aws():
+    """Test that importing the AWS handlers creates no clients; they are built on first use"""
+    import importlib
+    from aws_service import dynamo_handler, s3_handler
+
+    with patch("boto3.resource") as mock_resource, patch("boto3.client") as mock_client:
+        importlib.reload(dynamo_handler)
+        importlib.reload(s3_handler)
+        mock_resource.assert_not_called()
+        mock_client.assert_not_called()
+
+        assert dynamo_handler.get_dynamodb() is mock_resource.return_value
+        assert dynamo_handler.get_dynamodb() is mock_resource.return_value
+        mock_resource.assert_called_once()
+
+    importlib.reload(dynamo_handler)
+    importlib.reload(s3_handler)
+
+
+def test_startup_within_budget(unreachable_aws_env, temp_dir):
+    """Benchmark cold startup with AWS down: must stay within budget and defer heavy imports"""
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=temp_dir,
+        env={**unreachable_aws_env, "PYTHONPATH": PROJECT_DIR},
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["elapsed"] < STARTUP_BUDGET_SECONDS
+    assert report["startup"]["startup_seconds"] < STARTUP_BUDGET_SECONDS
+    assert "langchain_google_genai" not in report["heavy_modules"]
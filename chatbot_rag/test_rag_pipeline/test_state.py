@@ -0,0 +1,195 @@
+import pytest
+import os
+import json
+import threading
+from unittest.mock import Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.state import MemoryStateStore, SQLiteStateStore
+from app.conversation import ConversationManager, SessionBusy, SharedSessionStore
+from app.index_manifest import IndexManifest, IndexReader
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state_store(request, temp_dir):
+    """Each local state store implementation"""
+    if request.param == "memory":
+        return MemoryStateStore()
+    return SQLiteStateStore(os.path.join(temp_dir, "state", "rag_state.db"))
+
+
+def test_state_store_put_get_delete(state_store):
+    """Test the basic key/value contract"""
+    assert state_store.get("missing") is None
+    state_store.put("k", {"a": 1})
+    assert state_store.get("k") == {"a": 1}
+    state_store.put("k", {"a": 2})
+    assert state_store.get("k") == {"a": 2}
+    assert state_store.delete("k") is True
+    assert state_store.delete("k") is False
+
+
+def test_state_store_ttl(state_store):
+    """Test that expired values are not returned"""
+    with patch("app.state.time.time", return_value=1000.0):
+        state_store.put("session:1", {"x": 1}, ttl=10)
+    with patch("app.state.time.time", return_value=1005.0):
+        assert state_store.get("session:1") == {"x": 1}
+    with patch("app.state.time.time", return_value=1011.0):
+        assert state_store.get("session:1") is None
+
+
+def test_current_document_registry(state_store):
+    """Test the shared current-document record"""
+    assert state_store.get_current_document() is None
+    state_store.set_current_document("ml.pdf", "doc-ml-1234", "vectorstore")
+    document = state_store.get_current_document()
+    assert document["filename"] == "ml.pdf"
+    assert document["collection"] == "doc-ml-1234"
+    state_store.clear_current_document()
+    assert state_store.get_current_document() is None
+
+
+def test_sqlite_store_is_shared_between_instances(temp_dir):
+    """Test that two workers opening the same file see each other's writes"""
+    path = os.path.join(temp_dir, "shared.db")
+    worker_a = SQLiteStateStore(path)
+    worker_b = SQLiteStateStore(path)
+    worker_a.set_current_document("a.pdf", "doc-a", "vectorstore")
+    assert worker_b.get_current_document()["filename"] == "a.pdf"
+
+
+def test_shared_session_store_roundtrip():
+    """Test that sessions survive being loaded by another worker"""
+    backend = MemoryStateStore()
+    sessions = SharedSessionStore(backend, idle_ttl=60)
+    session = sessions.get("s1")
+    session.turns.append(("q", "a"))
+    sessions.save(session)
+
+    other_worker = SharedSessionStore(backend, idle_ttl=60)
+    assert list(other_worker.get("s1").turns) == [("q", "a")]
+    assert other_worker.delete("s1") is True
+
+
+def test_conditional_put_and_delete(state_store):
+    """Test the compare-and-set operations session leases are built on"""
+    assert state_store.put_if_absent("lease", {"owner": "a"}, ttl=60) is True
+    assert state_store.put_if_absent("lease", {"owner": "b"}, ttl=60) is False
+    assert state_store.delete_if_equal("lease", {"owner": "b"}) is False
+    assert state_store.delete_if_equal("lease", {"owner": "a"}) is True
+
+    # An expired lease can be taken over
+    state_store.put("lease", {"owner": "dead"}, ttl=60)
+    with patch("app.state.time.time", return_value=10 ** 12):
+        assert state_store.put_if_absent("lease", {"owner": "c"}, ttl=60) is True
+        assert state_store.get("lease") == {"owner": "c"}
+
+
+def test_concurrent_turns_in_one_session_keep_both(state_store):
+    """Test that two workers answering the same session at once both record their turn"""
+    llm = Mock()
+    llm.invoke.return_value = Mock(content="standalone")
+    workers = [ConversationManager(llm, SharedSessionStore(state_store, idle_ttl=60)) for _ in range(2)]
+    inside = threading.Event()
+    overlapped = []
+
+    def slow_answer(standalone):
+        # Without serialization both turns would read the empty history here
+        overlapped.append(inside.is_set())
+        inside.set()
+        threading.Event().wait(0.2)
+        inside.clear()
+        return {"result": f"answer {len(overlapped)}"}
+
+    threads = [
+        threading.Thread(target=worker.ask, args=("s1", f"question {i}", slow_answer))
+        for i, worker in enumerate(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    turns = SharedSessionStore(state_store).get("s1").turns
+    assert overlapped == [False, False]
+    assert sorted(q for q, _ in turns) == ["question 0", "question 1"]
+    assert state_store.get(SharedSessionStore.LOCK_PREFIX + "s1") is None
+
+
+def test_session_lock_times_out_while_held(state_store):
+    """Test that a turn gives up when another worker holds the session"""
+    state_store.put(SharedSessionStore.LOCK_PREFIX + "s1", {"owner": "other"}, ttl=60)
+    sessions = SharedSessionStore(state_store, lock_wait=0.1)
+    with pytest.raises(SessionBusy):
+        with sessions.lock("s1"):
+            pass
+
+
+def test_manifest_generations(temp_dir):
+    """Test that every recorded document bumps the generation"""
+    manifest = IndexManifest(temp_dir)
+    assert manifest.generation() == 0
+    assert manifest.record_document("a.pdf", "doc-a", 10) == 1
+    assert manifest.record_document("b.pdf", "doc-b", 5) == 2
+
+    with open(os.path.join(temp_dir, "manifest.json")) as f:
+        data = json.load(f)
+    assert set(data["documents"]) == {"a.pdf", "b.pdf"}
+    assert manifest.remove_document("a.pdf") == 3
+    assert set(IndexManifest(temp_dir).read()["documents"]) == {"b.pdf"}
+
+
+def test_index_reader_reopens_on_new_generation(temp_dir):
+    """Test that handles are reused within a generation and reopened after a write"""
+    reader = IndexReader(temp_dir)
+    writer = IndexManifest(temp_dir)
+    writer.record_document("a.pdf", "doc-a", 1)
+
+    with patch("app.rag_pipeline.Chroma") as mock_chroma:
+        mock_chroma.side_effect = lambda **kwargs: Mock()
+        first, generation = reader.get_store("doc-a", Mock)
+        again, _ = reader.get_store("doc-a", Mock)
+        assert first is again
+        assert generation == 1
+
+        writer.record_document("b.pdf", "doc-b", 1)
+        reopened, generation = reader.get_store("doc-a", Mock)
+        assert reopened is not first
+        assert generation == 2
+
+
+def test_clear_keeps_generations_increasing_for_other_workers(temp_dir):
+    """Test that a reader which cached a generation reopens after clear + re-upload"""
+    from app.rag_pipeline import clear_vectorstore
+
+    reader = IndexReader(temp_dir)
+    writer = IndexManifest(temp_dir)
+    writer.record_document("a.pdf", "doc-a", 1)
+
+    with patch("app.rag_pipeline.Chroma") as mock_chroma:
+        mock_chroma.side_effect = lambda **kwargs: Mock()
+        first, cached_generation = reader.get_store("doc-a", Mock)
+
+        # Another worker clears the index and the next upload lands
+        clear_vectorstore(temp_dir)
+        writer.record_document("a.pdf", "doc-a", 1)
+
+        reopened, generation = reader.get_store("doc-a", Mock)
+        assert reopened is not first
+        assert generation == cached_generation + 2
+
+
+def test_incomplete_backend_fails_at_construction():
+    """Test that a backend missing part of the interface cannot be instantiated"""
+    from app.state import StateStore
+
+    class GetOnly(StateStore):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
@@ -0,0 +1,179 @@
+import pytest
+import io
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws_service import s3_handler
+from app.storage import DocumentStorage
+
+
+class FakeS3:
+    """Minimal S3 client: HEAD and (ranged, ETag-pinned) GETs over in-memory objects"""
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+        self.gets = []
+        self._lock = threading.Lock()
+
+    def _missing(self, operation):
+        return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._missing("HeadObject")
+        body = self.objects[Key]
+        return {"ContentLength": len(body), "ETag": f'"{hash(body)}"'}
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        with self._lock:
+            self.gets.append((Key, Range))
+        body = self.objects[Key]
+        if IfMatch and IfMatch != f'"{hash(body)}"':
+            raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "changed"}}, "GetObject")
+        if Range:
+            first, last = (int(n) for n in Range[len("bytes="):].split("-"))
+            body = body[first:last + 1]
+        return {"Body": io.BytesIO(body)}
+
+
+@pytest.fixture
+def fake_s3():
+    client = FakeS3({"big.pdf": os.urandom(10_000), "small.pdf": b"%PDF-small"})
+    with patch.object(s3_handler, "s3", client), patch("config.AWS_AVAILABLE", True):
+        yield client
+
+
+def write_pdf(directory, name, size, mtime):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_ranged_download_reassembles_the_object(temp_dir, fake_s3):
+    target = os.path.join(temp_dir, "big.pdf")
+    result = s3_handler.download_object_ranged("docs", "big.pdf", target, part_size=3000, max_workers=4)
+
+    assert result["parts"] == 4 and result["size"] == 10_000
+    with open(target, "rb") as f:
+        assert f.read() == fake_s3.objects["big.pdf"]
+    assert sorted(r for _, r in fake_s3.gets) == ["bytes=0-2999", "bytes=3000-5999", "bytes=6000-8999", "bytes=9000-9999"]
+
+    fake_s3.gets.clear()
+    s3_handler.download_object_ranged("docs", "small.pdf", os.path.join(temp_dir, "small.pdf"), part_size=3000)
+    assert fake_s3.gets == [("small.pdf", None)]
+
+
+def test_changed_object_fails_without_leaving_a_partial_file(temp_dir, fake_s3):
+    original_head = fake_s3.head_object
+
+    def head_then_overwrite(Bucket, Key):
+        head = original_head(Bucket, Key)
+        fake_s3.objects[Key] = os.urandom(10_000)
+        return head
+
+    fake_s3.head_object = head_then_overwrite
+    with pytest.raises(ClientError):
+        s3_handler.download_object_ranged("docs", "big.pdf", os.path.join(temp_dir, "big.pdf"), part_size=3000)
+    assert os.listdir(temp_dir) == []
+
+
+def test_fetch_downloads_once_then_serves_the_local_copy(temp_dir, fake_s3):
+    storage = DocumentStorage(temp_dir, max_bytes=1_000_000, part_size=4096)
+    path = storage.fetch("big.pdf")
+    assert storage.fetch("big.pdf") == path
+    summary = storage.summary()
+    assert summary["misses"] == 1 and summary["hits"] == 1 and summary["bytes_downloaded"] == 10_000
+    assert len(fake_s3.gets) == 3
+
+    with pytest.raises(FileNotFoundError):
+        storage.fetch("missing.pdf")
+    with pytest.raises(ValueError):
+        storage.fetch("../secrets.pdf")
+
+
+def test_evicts_least_recently_used_copies_that_are_in_s3(temp_dir):
+    write_pdf(temp_dir, "old.pdf", 400, mtime=1000)
+    write_pdf(temp_dir, "local-only.pdf", 400, mtime=1500)
+    write_pdf(temp_dir, "recent.pdf", 400, mtime=2000)
+    evicted = []
+    in_s3 = {"old.pdf", "recent.pdf", "new.pdf"}
+    storage = DocumentStorage(temp_dir, max_bytes=1200, is_remote=in_s3.__contains__, on_evict=evicted.append)
+
+    write_pdf(temp_dir, "new.pdf", 400, mtime=3000)
+    storage.admit("new.pdf", remote=True)
+
+    # Over by 400 bytes: the oldest copy in S3 goes, the older local-only one is kept
+    assert evicted == ["old.pdf"]
+    assert sorted(os.listdir(temp_dir)) == ["local-only.pdf", "new.pdf", "recent.pdf"]
+    assert storage.summary()["bytes"] == 1200
+
+    # Once in S3 and least recently used, it can go too
+    in_s3.add("local-only.pdf")
+    storage.max_bytes = 800
+    storage.evict()
+    assert evicted == ["old.pdf", "local-only.pdf"] and storage.summary()["bytes"] == 800
+
+
+def test_checked_out_documents_are_not_evicted(temp_dir, fake_s3):
+    write_pdf(temp_dir, "a.pdf", 600, mtime=1000)
+    storage = DocumentStorage(temp_dir, max_bytes=600, is_remote=lambda name: True)
+
+    with storage.checkout("a.pdf") as path:
+        storage.fetch("small.pdf")
+        assert os.path.exists(path)
+    storage.evict()
+    assert not os.path.exists(path) and "small.pdf" in storage
+
+
+def test_restart_keeps_lru_order_and_drops_partial_downloads(temp_dir):
+    write_pdf(temp_dir, "b.pdf", 10, mtime=2000)
+    write_pdf(temp_dir, "a.pdf", 10, mtime=1000)
+    with open(os.path.join(temp_dir, ".download-123"), "wb") as f:
+        f.write(b"partial")
+
+    storage = DocumentStorage(temp_dir, max_bytes=15, is_remote=lambda name: True)
+    assert not os.path.exists(os.path.join(temp_dir, ".download-123"))
+    storage.evict()
+    assert "a.pdf" not in storage and "b.pdf" in storage
+
+
+def test_reindex_endpoint_uses_the_cached_copy(temp_dir, sample_pdf_path):
+    """Test /documents/{filename}/reindex with the offline stand-ins"""
+    from fastapi.testclient import TestClient
+    from app.clients import clear_registry
+    from app.state import MemoryStateStore, get_state_store, set_state_store
+    from benchmarks.stages import offline_app_config
+
+    with offline_app_config(temp_dir):
+        clear_registry()
+        set_state_store(MemoryStateStore())
+        import app.main as main
+        limiter_enabled = main.limiter.enabled
+        main.limiter.enabled = False
+        try:
+            client = TestClient(main.app)
+            with open(sample_pdf_path, "rb") as f:
+                client.post("/upload-pdf/", files={"file": ("a.pdf", f, "application/pdf")}).raise_for_status()
+            get_state_store().clear_current_document()
+
+            reindexed = client.post("/documents/a.pdf/reindex")
+            current = get_state_store().get_current_document()
+            missing = client.post("/documents/missing.pdf/reindex")
+            storage = client.get("/status").json()["storage"]
+        finally:
+            main.limiter.enabled = limiter_enabled
+            set_state_store(None)
+            clear_registry()
+
+    assert reindexed.status_code == 200 and current["filename"] == "a.pdf"
+    assert missing.status_code == 404
+    assert storage["files"] == 1 and storage["hits"] == 1
@@ -0,0 +1,115 @@
+import pytest
+import os
+import json
+import time
+import sys
+from unittest.mock import Mock, patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opentelemetry import context, propagate
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.tracing import JsonLinesSpanExporter, current_trace_id, setup_tracing, span, traced
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    memory = InMemorySpanExporter()
+    setup_tracing().add_span_processor(SimpleSpanProcessor(memory))
+    return memory
+
+
+@pytest.fixture
+def spans(exporter):
+    exporter.clear()
+    yield exporter
+    exporter.clear()
+
+
+def remote_parent(sampled: bool):
+    flags = "01" if sampled else "00"
+    return propagate.extract({"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-{flags}"})
+
+
+def test_sampled_request_records_nested_spans(spans):
+    """Test that spans join the caller's trace and nest under the current span"""
+    @traced()
+    def split_text_stub():
+        with span("embedding_batch", size=3):
+            return current_trace_id()
+
+    token = context.attach(remote_parent(sampled=True))
+    try:
+        trace_id = split_text_stub()
+    finally:
+        context.detach(token)
+
+    assert trace_id == TRACE_ID
+    finished = {s.name: s for s in spans.get_finished_spans()}
+    assert set(finished) == {"split_text_stub", "embedding_batch"}
+    assert finished["embedding_batch"].parent.span_id == finished["split_text_stub"].context.span_id
+    assert finished["embedding_batch"].attributes["size"] == 3
+
+
+def test_unsampled_request_records_nothing(spans):
+    token = context.attach(remote_parent(sampled=False))
+    try:
+        with span("retrieval"):
+            assert current_trace_id() is None
+    finally:
+        context.detach(token)
+    assert spans.get_finished_spans() == ()
+
+
+def test_jsonl_exporter_writes_one_span_per_line(temp_dir):
+    path = os.path.join(temp_dir, "traces", "spans.jsonl")
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(JsonLinesSpanExporter(path)))
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("llm"):
+        with tracer.start_as_current_span("llm_attempt"):
+            pass
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["name"] for line in lines] == ["llm_attempt", "llm"]
+    assert lines[0]["context"]["trace_id"] == lines[1]["context"]["trace_id"]
+
+
+def test_ask_returns_trace_id(spans, temp_dir, monkeypatch):
+    """Test that /ask echoes the trace id and records the request span"""
+    from fastapi.testclient import TestClient
+    from app.state import MemoryStateStore, set_state_store
+
+    monkeypatch.chdir(temp_dir)
+    import app.main as main
+
+    store = MemoryStateStore()
+    store.set_current_document("ml.pdf", "doc-ml", "vectorstore")
+    set_state_store(store)
+
+    chain = Mock()
+    chain.invoke.return_value = {"result": "An answer", "source_documents": []}
+    try:
+        with patch.object(main, "get_chain_for", return_value=chain), \
+                patch.object(main.limiter, "enabled", False), \
+                patch("config.AWS_AVAILABLE", False):
+            response = TestClient(main.app).post(
+                "/ask",
+                data={"question": "What is ML?"},
+                headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}
+            )
+    finally:
+        set_state_store(None)
+
+    assert response.status_code == 200
+    assert response.json()["trace_id"] == TRACE_ID
+    assert response.headers["X-Trace-Id"] == TRACE_ID
+    assert any(s.name.startswith("POST /ask") for s in spans.get_finished_spans())
@@ -0,0 +1,111 @@
+import pytest
+import os
+from unittest.mock import ANY, Mock, patch
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+
+from app.state import MemoryStateStore
+from app.index_manifest import IndexManifest
+from app.warm_start import LEGACY_DOCUMENT, WarmupState, recover_manifest, rehydrate
+
+
+@pytest.fixture
+def no_chroma():
+    """Keep the reader from opening real collections"""
+    with patch("app.rag_pipeline.Chroma") as mock:
+        yield mock
+
+
+def test_rehydrate_restores_newest_document(temp_dir, no_chroma):
+    """Test that a lost registry is rebuilt from the manifest"""
+    manifest = IndexManifest(temp_dir)
+    manifest.record_document("old.pdf", "doc-old", 3)
+    manifest.record_document("new.pdf", "doc-new", 5)
+    store = MemoryStateStore()
+    state = WarmupState()
+
+    rehydrate(temp_dir, store, Mock, state)
+
+    assert state.ready
+    assert state.to_dict()["documents"] == 2
+    assert store.get_current_document()["collection"] == "doc-new"
+    assert no_chroma.call_args.kwargs["collection_name"] == "doc-new"
+
+
+def test_rehydrate_keeps_existing_registry(temp_dir, no_chroma):
+    """Test that a surviving current document is not replaced"""
+    manifest = IndexManifest(temp_dir)
+    manifest.record_document("a.pdf", "doc-a", 1)
+    manifest.record_document("b.pdf", "doc-b", 1)
+    store = MemoryStateStore()
+    store.set_current_document("a.pdf", "doc-a", temp_dir)
+
+    state = WarmupState()
+    rehydrate(temp_dir, store, Mock, state)
+    assert state.current_document == "a.pdf"
+
+
+def test_rehydrate_empty_index(temp_dir, no_chroma):
+    """Test that an empty index is ready with nothing loaded"""
+    store = MemoryStateStore()
+    state = WarmupState()
+    rehydrate(temp_dir, store, Mock, state)
+
+    assert state.ready
+    assert store.get_current_document() is None
+    no_chroma.assert_not_called()
+
+
+def test_recover_manifest_from_collections(temp_dir):
+    """Test that indexes written before the manifest existed are rediscovered"""
+    client = chromadb.PersistentClient(path=temp_dir)
+    collection = client.create_collection("doc-ml-1234", metadata={"source": "ml.pdf"})
+    collection.add(ids=["a", "b"], embeddings=[[0.1, 0.2], [0.2, 0.1]], documents=["x", "y"])
+    client.create_collection("langchain")
+
+    documents = recover_manifest(temp_dir)["documents"]
+    assert set(documents) == {"ml.pdf"}
+    assert documents["ml.pdf"]["collection"] == "doc-ml-1234"
+    assert documents["ml.pdf"]["chunks"] == 2
+    assert IndexManifest(temp_dir).generation() == 1
+
+
+def test_recover_manifest_registers_the_legacy_collection(temp_dir):
+    """Test that a pre-per-document index in the default collection stays reachable"""
+    client = chromadb.PersistentClient(path=temp_dir)
+    client.create_collection("langchain").add(
+        ids=["a", "b", "c"], embeddings=[[0.1, 0.2], [0.2, 0.1], [0.3, 0.3]], documents=["x", "y", "z"]
+    )
+
+    documents = recover_manifest(temp_dir)["documents"]
+    assert documents == {LEGACY_DOCUMENT: {"collection": "langchain", "chunks": 3, "updated_at": ANY, "legacy": True}}
+
+    # With a registry entry pointing at the default collection, its filename is kept
+    IndexManifest(temp_dir).clear()
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.PersistentClient(path=temp_dir)
+    client.create_collection("langchain").add(ids=["a"], embeddings=[[0.1, 0.2]], documents=["x"])
+    store = MemoryStateStore()
+    store.set_current_document("notes.pdf", "langchain", temp_dir)
+    state = WarmupState()
+    with patch("app.rag_pipeline.Chroma"):
+        rehydrate(temp_dir, store, Mock, state)
+
+    assert set(IndexManifest(temp_dir).read()["documents"]) == {"notes.pdf"}
+    assert state.ready and state.documents == 1 and store.get_current_document()["filename"] == "notes.pdf"
+
+
+def test_failed_warmup_is_reported(temp_dir):
+    """Test that errors leave the worker not ready"""
+    store = Mock()
+    store.get_current_document.side_effect = RuntimeError("state unavailable")
+    state = WarmupState()
+    rehydrate(temp_dir, store, Mock, state)
+
+    assert state.status == "failed"
+    assert "state unavailable" in state.to_dict()["error"]
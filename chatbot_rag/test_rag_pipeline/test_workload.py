@@ -0,0 +1,126 @@
+import pytest
+import os
+import sys
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stages import offline_app_config
+from benchmarks.workload import (
+    WorkloadRecord, compare_distributions, ks_statistic, read_workload,
+    records_from_metrics, replay_workload, schedule, write_workload
+)
+
+
+METRICS_ITEMS = [
+    {"query_id": "query_3", "timestamp": "2024-05-01T10:00:05.500000", "query": "What is overfitting?",
+     "response_time": "0.8", "pdf_name": "ml.pdf"},
+    {"query_id": "query_1", "timestamp": "2024-05-01T10:00:00", "query": "What is machine learning?",
+     "response_time": "1.25", "pdf_name": "ml.pdf"},
+    {"query_id": "query_2", "timestamp": "2024-05-01T10:00:02", "query": "Define a neural network"},
+    {"query_id": "query_bad", "timestamp": "not a time", "query": "ignored"},
+]
+
+
+def test_records_are_ordered_with_relative_offsets():
+    records = records_from_metrics(METRICS_ITEMS)
+
+    assert [record.query for record in records] == [
+        "What is machine learning?", "Define a neural network", "What is overfitting?"
+    ]
+    assert [record.offset for record in records] == [0.0, 2.0, 5.5]
+    assert records[0].response_time == 1.25 and records[0].pdf_name == "ml.pdf"
+    assert records[1].response_time is None and records[1].pdf_name is None
+
+
+@pytest.mark.parametrize("name", ["workload.jsonl", "workload.jsonl.gz"])
+def test_workload_file_round_trip(temp_dir, name):
+    path = os.path.join(temp_dir, name)
+    records = records_from_metrics(METRICS_ITEMS)
+    write_workload(path, records, {"table": "LLMMetrics"})
+
+    loaded = read_workload(path)
+    assert [record.to_dict() for record in loaded] == [record.to_dict() for record in records]
+
+
+    other = os.path.join(temp_dir, "other.jsonl")
+    with open(other, "w") as f:
+        f.write('{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        read_workload(other)
+
+
+def test_schedule_accelerates_and_caps_gaps():
+    records = [WorkloadRecord(offset, "q", None, None) for offset in (0.0, 1.0, 3.0, 3603.0)]
+
+    assert schedule(records) == [0.0, 1.0, 3.0, 3603.0]
+    assert schedule(records, speedup=2) == [0.0, 0.5, 1.5, 1801.5]
+    assert schedule(records, max_gap=10) == [0.0, 1.0, 3.0, 13.0]
+    with pytest.raises(ValueError):
+        schedule(records, speedup=0)
+
+
+def test_distribution_comparison():
+    assert ks_statistic([1.0, 2.0, 3.0], [1.0, 2.0, 3.0]) == 0.0
+    assert ks_statistic([1.0, 2.0], [5.0, 6.0]) == 1.0
+    assert ks_statistic([], [1.0]) is None
+
+    comparison = compare_distributions([1.0, 1.0, 1.0], [2.0, 2.0, 2.0])
+    assert comparison["recorded"]["p50_ms"] == 1000.0
+    assert comparison["ratios"]["p50_ratio"] == 2.0
+    assert comparison["ks_statistic"] == 1.0
+
+
+def test_scan_llm_metrics_pages_through_the_table():
+    from aws_service import dynamo_handler
+
+    table = MagicMock()
+    table.scan.side_effect = [
+        {"Items": METRICS_ITEMS[:2], "LastEvaluatedKey": {"query_id": "query_1"}},
+        {"Items": METRICS_ITEMS[2:]},
+    ]
+    with patch.object(dynamo_handler, "llm_metrics_table", table):
+        items = dynamo_handler.scan_llm_metrics(since="2024-05-01T00:00:00")
+
+    assert items == METRICS_ITEMS
+    first, second = table.scan.call_args_list
+    assert "FilterExpression" in first.kwargs and "ExclusiveStartKey" not in first.kwargs
+    assert second.kwargs["ExclusiveStartKey"] == {"query_id": "query_1"}
+    assert "#q" in first.kwargs["ProjectionExpression"]
+
+
+def test_replay_against_the_app(temp_dir):
+    """Test an accelerated replay through the ASGI app with the offline stand-ins"""
+    from app.clients import clear_registry
+    from app.state import MemoryStateStore, set_state_store
+
+    records = records_from_metrics(METRICS_ITEMS)
+    with offline_app_config(temp_dir):
+        clear_registry()
+        set_state_store(MemoryStateStore())
+        import app.main as main
+        main.qa_chains.clear()
+        limiter_enabled = main.limiter.enabled
+        main.limiter.enabled = False
+        try:
+            report = asyncio.run(replay_workload(
+                records,
+                base_url="http://replay",
+                speedup=50,
+                transport=httpx.ASGITransport(app=main.app)
+            ))
+        finally:
+            main.limiter.enabled = limiter_enabled
+            set_state_store(None)
+            clear_registry()
+
+    assert report["meta"]["uploaded"] == ["Machine learning.pdf"]
+    assert report["replay"]["errors"] == 0
+    assert report["replay"]["scheduled_seconds"] == pytest.approx(0.11)
+    assert report["server_latency"]["recorded"]["count"] == 2
+    assert report["server_latency"]["replayed"]["count"] == 3
+    assert report["replay"]["client_latency"]["p50_ms"] > 0